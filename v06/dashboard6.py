@@ -4,6 +4,8 @@ SOC Pi v0 - Integrated Monitor.
 Run with: sudo python3 dashboard.py
 """
 
+import atexit
+import csv
 import psutil
 import shutil
 import json
@@ -12,12 +14,31 @@ import threading
 import subprocess
 import re
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import logging
 import os
+import queue
+from collections import Counter, deque
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Any, Dict, List
-from flask import Flask, jsonify, render_template_string
+from typing import Any, Dict, Iterator, List, Optional
+from xml.etree import ElementTree as ET
+from flask import Flask, Response, jsonify, render_template_string, request
+
+try:
+    import orjson  # fast C serializer; stdlib json is the fallback
+except ImportError:
+    orjson = None
+try:
+    from flask_compress import Compress  # gzip for API responses when installed
+except ImportError:
+    Compress = None
+try:
+    from waitress import serve  # threaded production WSGI server
+except ImportError:
+    serve = None
 
 # ----------------------
 # CONFIGURATION
@@ -28,6 +49,18 @@ SNAPSHOT_FILE = Path("scan_snapshot.json")
 HISTORY_FILE = Path("history.jsonl")
 LOG_FILE = Path("network_monitor.log")
 VENDOR_CACHE_FILE = Path("vendor_cache.json")
+VENDOR_JOURNAL_FILE = Path("vendor_cache.jsonl")
+OUI_FILE = Path("oui.csv")  # IEEE MA-L registry: https://standards-oui.ieee.org/oui/oui.csv
+VENDOR_ONLINE_LOOKUP = True  # fall back to api.macvendors.com for prefixes missing from OUI_FILE
+CHECKPOINT_EVERY = 50  # fold journals into the .json files after N appends
+DEBUG_JSON = False  # pretty-print the persisted .json files
+VENDOR_WORKERS = 4  # concurrent get_vendor fallbacks while nmap is still streaming
+HISTORY_FLUSH_EVERY = 10  # history.jsonl records buffered before a flush
+HISTORY_MAX_BYTES = 10 * 1024 * 1024  # trim history.jsonl once it grows past this...
+HISTORY_KEEP_BYTES = 1024 * 1024  # ...down to roughly its newest 1MB
+SSE_SYS_INFO_SEC = 5  # /api/stream pushes sys info (and keeps the connection alive) this often
+SSE_MAX_CLIENTS = int(os.getenv("SOCPI_SSE_MAX_CLIENTS", "4"))  # open /api/stream clients; extra tabs get a 503 and poll
+WSGI_THREADS = SSE_MAX_CLIENTS + 8  # each stream pins a thread for its lifetime; 8 stay free for ordinary requests
 
 TELEGRAM = {
     "ENABLED": False,
@@ -45,6 +78,12 @@ logging.basicConfig(
 )
 
 app = Flask(__name__)
+if Compress is not None:
+    Compress(app)
+
+# One keep-alive pool for macvendors + Telegram instead of a TLS handshake per call
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=16, max_retries=Retry(total=2)))
 
 # ----------------------
 # DASHBOARD UI (The "Face")
@@ -121,25 +160,24 @@ HTML = """
 </div>
 <script>
 let trendChart, vendorChart;
-async function refreshData() {
-    try {
-        const snap = await fetch("/api/snapshot").then(r => r.json());
-        const hist = await fetch("/api/history").then(r => r.json());
-        const logs = await fetch("/api/log_tail").then(r => r.json());
-        const sys = await fetch("/api/sys_info").then(r => r.json());
-
-        updateStats(snap, sys);
-        renderTable(snap.devices);
-        updateCharts(hist.records, snap.devices);
-        document.getElementById('log-output').textContent = logs.lines.join("\\n");
-        document.getElementById('last-update').innerText = "Last Scan: " + snap.timestamp;
-    } catch (e) { console.error("Sync Error:", e); }
+let lastSnap = null, lastHist = [], lastSys = null;
+function applyUpdate(u) {
+    if (u.history) lastHist = u.history;
+    if (u.sys) lastSys = u.sys;
+    if (u.snapshot) {
+        lastSnap = u.snapshot;
+        renderTable(lastSnap.devices);
+        document.getElementById('last-update').innerText = "Last Scan: " + lastSnap.timestamp;
+    }
+    if (lastSnap && lastSys) updateStats(lastSnap, lastSys);
+    if (lastSnap && (u.snapshot || u.history)) updateCharts(lastHist, lastSnap);
+    if (u.logs) document.getElementById('log-output').textContent = u.logs.join("\\n");
 }
 
 function updateStats(snap, sys) {
     document.getElementById('stat-seen').innerText = snap.counts.seen;
     document.getElementById('stat-new').innerText = snap.counts.new || 0;
-    const risk = snap.devices.some(d => (d.vulns||[]).length > 0) ? "CRITICAL" : "LOW";
+    const risk = snap.risk_summary || "LOW";
     document.getElementById('stat-risk').innerText = risk;
     document.getElementById('stat-risk').style.color = risk === "CRITICAL" ? "var(--danger)" : "var(--success)";
     document.getElementById('stat-temp').innerText = sys.temp + "°C";
@@ -148,11 +186,11 @@ function updateStats(snap, sys) {
 function renderTable(devices) {
     const query = document.getElementById('search').value.toLowerCase();
     const tbody = document.getElementById('device-table');
-    tbody.innerHTML = devices.filter(d => d.ip.includes(query) || (d.mac||"").toLowerCase().includes(query) || (d.vendor||"").toLowerCase().includes(query))
+    tbody.innerHTML = devices.filter(d => !query || (d.search || "").includes(query))
         .map(d => {
-            const hasVulns = (d.vulns || []).length > 0;
+            const hasVulns = d.risk_class === 'risk-high';
             return `
-                <tr class="${hasVulns ? 'risk-high' : 'risk-low'}">
+                <tr class="${d.risk_class || 'risk-low'}">
                     <td style="font-weight:700;">${d.ip}</td>
                     <td>${d.mac || 'N/A'}</td>
                     <td>${d.vendor || 'Unknown'}</td>
@@ -161,7 +199,7 @@ function renderTable(devices) {
                 </tr>`;
         }).join('');
 }
-function updateCharts(history, devices) {
+function updateCharts(history, snap) {
     const trendCtx = document.getElementById('trendChart').getContext('2d');
     if (trendChart) trendChart.destroy();
     trendChart = new Chart(trendCtx, {
@@ -172,7 +210,7 @@ function updateCharts(history, devices) {
         },
         options: { plugins: { legend: { display: false } }, scales: { y: { beginAtZero: true } } }
     });
-    const vendorCounts = devices.reduce((acc, d) => { const v = d.vendor || "Unknown"; acc[v] = (acc[v] || 0) + 1; return acc; }, {});
+    const vendorCounts = snap.vendor_counts || {};
     const vendorCtx = document.getElementById('vendorChart').getContext('2d');
     if (vendorChart) vendorChart.destroy();
     vendorChart = new Chart(vendorCtx, {
@@ -181,8 +219,25 @@ function updateCharts(history, devices) {
         options: { plugins: { legend: { position: 'bottom', labels: { color: '#8892b0' } } } }
     });
 }
-setInterval(refreshData, 5000);
-refreshData();
+// One pushed stream instead of polling four endpoints; EventSource reconnects on its own.
+const stream = new EventSource("/api/stream");
+stream.onmessage = (e) => {
+    try { applyUpdate(JSON.parse(e.data)); } catch (err) { console.error("Sync Error:", err); }
+};
+// A 503 (all stream slots taken) closes the EventSource for good; poll the plain endpoints instead.
+let pollTimer = null;
+function pollOnce() {
+    Promise.all(["/api/snapshot", "/api/history", "/api/log_tail", "/api/sys_info"].map(u => fetch(u).then(r => r.json())))
+        .then(([snap, hist, logs, sys]) => applyUpdate({snapshot: snap, history: hist.records, logs: logs.lines, sys: sys}))
+        .catch(err => console.error("Sync Error:", err));
+}
+stream.onerror = () => {
+    if (stream.readyState === EventSource.CLOSED && !pollTimer) {
+        pollOnce();
+        pollTimer = setInterval(pollOnce, 5000);
+    }
+};
+document.getElementById('search').addEventListener('input', () => { if (lastSnap) renderTable(lastSnap.devices); });
 </script>
 </body>
 </html>
@@ -197,24 +252,122 @@ def load_json(path: Path, default: Any) -> Any:
     except: return default
 
 def save_json(path: Path, data: Any):
-    path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    """Temp file + fsync + rename, so a power cut leaves either the old or the new file, never a torn one."""
+    if orjson is not None:
+        body = orjson.dumps(data, option=orjson.OPT_INDENT_2 if DEBUG_JSON else 0)
+    else:
+        body = (json.dumps(data, indent=2) if DEBUG_JSON else json.dumps(data, separators=(",", ":"))).encode("utf-8")
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(body)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def tail_lines(path: Path, n: int, approx_line_bytes: int = 256) -> List[str]:
+    """Last n lines of a file without reading the whole thing."""
+    if n <= 0:
+        return []
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            window = max(n * approx_line_bytes, 4096)
+            while True:
+                start = max(0, size - window)
+                f.seek(start)
+                lines = f.read().decode("utf-8", "replace").splitlines()
+                # first line is likely partial unless we started at offset 0
+                if start == 0 or len(lines) > n:
+                    return lines[-n:] if start == 0 else lines[1:][-n:]
+                window *= 2
+    except OSError:
+        return []
+
+def load_journal(path: Path) -> List[dict]:
+    """Reads an append-only .jsonl journal, skipping torn/partial lines."""
+    recs = []
+    if path.exists():
+        for line in path.read_text(encoding="utf-8").splitlines():
+            try: recs.append(json.loads(line))
+            except: pass
+    return recs
+
+def load_vendor_cache() -> Dict[str, str]:
+    cache = load_json(VENDOR_CACHE_FILE, {})
+    for rec in load_journal(VENDOR_JOURNAL_FILE):
+        if "prefix" in rec and "vendor" in rec:
+            cache[rec["prefix"]] = rec["vendor"]
+    return cache
+
+class Journal:
+    """Append-only .jsonl next to a consolidated .json; checkpointed every CHECKPOINT_EVERY appends."""
+    def __init__(self, path: Path, checkpoint):
+        self.path = path
+        self.checkpoint_fn = checkpoint
+        self.appends = 0
+        self.fp = open(path, "a", buffering=1 << 16, encoding="utf-8")
+        atexit.register(self.checkpoint)
+
+    def append(self, rec: dict):
+        self.fp.write(json.dumps(rec) + "\n")
+        self.fp.flush()
+        self.appends += 1
+        if self.appends >= CHECKPOINT_EVERY:
+            self.checkpoint()
+
+    def checkpoint(self):
+        self.checkpoint_fn()  # save_json: durably on disk before the journal is dropped
+        self.fp.flush()
+        self.fp.truncate(0)
+        self.appends = 0
+
+def oui_key(mac: str) -> int:
+    return int(mac.replace(":", "").replace("-", "")[:6], 16)
+
+def load_oui(path: Path) -> Dict[int, str]:
+    """IEEE oui.csv -> {24-bit prefix: organization}. Empty if the file isn't there."""
+    oui = {}
+    try:
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.reader(f):
+                try: oui[int(row[1], 16)] = row[2].strip()
+                except: pass  # header / malformed rows
+    except OSError:
+        logging.warning(f"{path} not found; vendor lookups use the cache/online API only.")
+    return oui
+
+_OUI: Dict[int, str] = load_oui(OUI_FILE)
+
+# In-memory cache is authoritative; the journal only makes new entries durable.
+_VENDOR_CACHE: Dict[str, str] = load_vendor_cache()
+_vendor_journal = Journal(VENDOR_JOURNAL_FILE, lambda: save_json(VENDOR_CACHE_FILE, _VENDOR_CACHE))
+_vendor_lock = threading.Lock()  # scanner thread + request threads share the cache
 
 def get_vendor(mac: str) -> str:
     """Uses Code 2's logic to find the vendor."""
     if not mac: return "Unknown"
-    cache = load_json(VENDOR_CACHE_FILE, {})
+    try: vendor = _OUI.get(oui_key(mac))
+    except ValueError: vendor = None
+    if vendor:
+        return vendor
+
     mac_prefix = mac[:8].upper()
-    
-    if mac_prefix in cache:
-        return cache[mac_prefix]
-    
+    with _vendor_lock:
+        cached = _VENDOR_CACHE.get(mac_prefix)
+    if cached is not None:
+        return cached
+
+    if not VENDOR_ONLINE_LOOKUP:
+        return "Unknown"
     try:
         # Simple API lookup
-        r = requests.get(f"https://api.macvendors.com/{mac}", timeout=2)
+        r = _session.get(f"https://api.macvendors.com/{mac}", timeout=2)
         if r.status_code == 200:
             vendor = r.text.strip()
-            cache[mac_prefix] = vendor
-            save_json(VENDOR_CACHE_FILE, cache)
+            with _vendor_lock:
+                _VENDOR_CACHE[mac_prefix] = vendor
+                _vendor_journal.append({"prefix": mac_prefix, "vendor": vendor})
             return vendor
     except: pass
     return "Unknown"
@@ -224,60 +377,174 @@ def send_telegram(message: str):
     if not TELEGRAM["ENABLED"]: return
     url = f"https://api.telegram.org/bot{TELEGRAM['TOKEN']}/sendMessage"
     try:
-        requests.post(url, json={"chat_id": TELEGRAM["CHAT_ID"], "text": message}, timeout=10)
+        _session.post(url, json={"chat_id": TELEGRAM["CHAT_ID"], "text": message}, timeout=10)
         logging.info("Telegram Sent")
     except Exception as e:
         logging.error(f"Telegram Error: {e}")
 
+def stream_nmap_hosts(cmd: List[str]) -> Iterator[ET.Element]:
+    """Yields each <host> as soon as nmap writes it, so parsing overlaps the scan."""
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        for _, elem in ET.iterparse(proc.stdout, events=("end",)):
+            if elem.tag == "host":
+                yield elem
+                elem.clear()
+    finally:
+        proc.stdout.close()
+        proc.wait()
+
+def host_to_device(host: ET.Element) -> Optional[dict]:
+    """One nmap <host>. Hosts without a MAC (e.g. this Pi) are skipped, as before."""
+    ip = mac = None
+    vendor = ""
+    for addr in host.findall("address"):
+        if addr.get("addrtype") == "ipv4":
+            ip = addr.get("addr")
+        elif addr.get("addrtype") == "mac":
+            mac = addr.get("addr")
+            vendor = addr.get("vendor", "")
+    if not ip or not mac:
+        return None
+    return {"ip": ip, "mac": mac, "vendor": vendor, "ports": [], "vulns": []}
+
+def scan_network(cmd: List[str]) -> List[dict]:
+    """Runs nmap and builds devices while it streams; vendor fallbacks resolve on worker threads meanwhile."""
+    devices = []
+    pending = []
+    with ThreadPoolExecutor(max_workers=VENDOR_WORKERS) as vendor_pool:
+        for host in stream_nmap_hosts(cmd):
+            device = host_to_device(host)
+            if device is None:
+                continue
+            if not device["vendor"]:
+                pending.append((device, vendor_pool.submit(get_vendor, device["mac"])))
+            devices.append(device)
+        for device, fut in pending:
+            device["vendor"] = fut.result()
+    return devices
+
+def annotate_snapshot(snapshot: dict):
+    """Render-ready fields so the browser doesn't recompute them on every update."""
+    devices = snapshot["devices"]
+    for d in devices:
+        d["risk_class"] = "risk-high" if d.get("vulns") else "risk-low"
+        d["search"] = f"{d['ip']} {d.get('mac') or ''} {d.get('vendor') or ''}".lower()
+    snapshot["vendor_counts"] = dict(Counter(d.get("vendor") or "Unknown" for d in devices))
+    snapshot["risk_summary"] = "CRITICAL" if any(d.get("vulns") for d in devices) else "LOW"
+
 # ----------------------
 # BACKGROUND SCANNER LOOP
 # ----------------------
+def close_durably(fp):
+    """atexit hook: flush + fsync once on shutdown rather than after every write."""
+    try:
+        fp.flush()
+        os.fsync(fp.fileno())
+        fp.close()
+    except (OSError, ValueError):
+        pass
+
+# Latest snapshot, published by the scanner thread and served straight from memory.
+_snapshot_lock = threading.Lock()
+_snapshot: dict = load_json(SNAPSHOT_FILE, {})
+
+# Last 50 history records for /api/history; history.jsonl is only for durability.
+_history: deque = deque(maxlen=50)
+
+def prime_history():
+    for line in tail_lines(HISTORY_FILE, _history.maxlen):
+        try: _history.append(json.loads(line))
+        except: pass
+
+def trim_history(fp):
+    """Cut an over-size history.jsonl down to its last HISTORY_KEEP_BYTES, on a line boundary."""
+    fp.flush()
+    size = os.fstat(fp.fileno()).st_size
+    if size <= HISTORY_MAX_BYTES:
+        return
+    with open(HISTORY_FILE, "r+b") as f:
+        f.seek(size - HISTORY_KEEP_BYTES)
+        tail = f.read()
+        tail = tail[tail.find(b"\n") + 1:]
+        f.seek(0)
+        f.write(tail)
+        f.truncate()
+    # fp is in append mode, so its next write lands at the new end of file
+
+# Per-client queues for /api/stream; the scanner fans each update out to all of them.
+_subscribers: List[queue.Queue] = []
+_subs_lock = threading.Lock()
+
+def subscribe() -> Optional[queue.Queue]:
+    """New stream queue, or None once SSE_MAX_CLIENTS streams are already open."""
+    q = queue.Queue(maxsize=16)
+    with _subs_lock:
+        if len(_subscribers) >= SSE_MAX_CLIENTS:
+            return None
+        _subscribers.append(q)
+    return q
+
+def unsubscribe(q: queue.Queue):
+    """Idempotent: called from both the stream generator and the response close hook."""
+    with _subs_lock:
+        if q in _subscribers:
+            _subscribers.remove(q)
+
+def publish_update(update: dict):
+    with _subs_lock:
+        subs = list(_subscribers)
+    for q in subs:
+        try: q.put_nowait(update)
+        except queue.Full: pass  # stalled client; it gets the next scan
+
+def publish_snapshot(snapshot: dict):
+    with _snapshot_lock:
+        _snapshot.clear()
+        _snapshot.update(snapshot)
+    save_json(SNAPSHOT_FILE, snapshot)  # durability only; the API no longer reads it
+
 def background_scanner():
     """Continuously scans and handles alerts."""
     last_report_date = None
     
     logging.info("Background Scanner Started...")
+    prime_history()
+    hist_fp = open(HISTORY_FILE, "a", buffering=1 << 16)
+    atexit.register(close_durably, hist_fp)
+    hist_pending = 0
 
     while True:
         try:
             # 1. RUN NMAP
-            cmd = ["nmap", "-sn", NETWORK_CIDR]
-            res = subprocess.run(cmd, capture_output=True, text=True)
-            
-            devices = []
-            for line in res.stdout.splitlines():
-                if "Nmap scan report for" in line:
-                    parts = line.split()
-                    ip = parts[-1].strip("()")
-                    current_device = {"ip": ip, "mac": None, "vendor": "Scanning...", "ports": [], "vulns": []}
-                if "MAC Address:" in line:
-                    mac = line.split("MAC Address:")[1].split("(")[0].strip()
-                    current_device["mac"] = mac
-                    current_device["vendor"] = get_vendor(mac)
-                    devices.append(current_device)
-                # If no MAC found (local device), add it anyway
-                if "Nmap scan report" in line and not any(d['ip'] == ip for d in devices):
-                     # Add simplified entry if it was the localhost or no MAC line appeared yet
-                     pass 
+            cmd = ["nmap", "-sn", "-oX", "-", NETWORK_CIDR]
+            devices = scan_network(cmd)
 
             # Fix for localhost which has no MAC in nmap output
             if not devices:
                 logging.warning("No devices found. Check sudo permissions.")
 
             # 2. SAVE SNAPSHOT
+            now = datetime.now()  # one clock read per cycle, shared by snapshot/history/report
             snapshot = {
-                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "timestamp": now.strftime("%Y-%m-%d %H:%M:%S"),
                 "counts": {"seen": len(devices), "new": 0, "alert": 0},
                 "devices": devices
             }
-            save_json(SNAPSHOT_FILE, snapshot)
+            annotate_snapshot(snapshot)
+            publish_snapshot(snapshot)
 
             # 3. UPDATE HISTORY
-            with open(HISTORY_FILE, "a") as f:
-                f.write(json.dumps({"seen": len(devices), "ts": datetime.now().isoformat()}) + "\n")
+            rec = {"seen": len(devices), "ts": now.isoformat()}
+            _history.append(rec)
+            hist_fp.write(json.dumps(rec) + "\n")
+            hist_pending += 1
+            if hist_pending >= HISTORY_FLUSH_EVERY:
+                trim_history(hist_fp)
+                hist_pending = 0
+            publish_update({"snapshot": snapshot, "history": list(_history), "logs": tail_lines(LOG_FILE, 20)})
 
             # 4. DAILY TELEGRAM REPORT (5:00 AM)
-            now = datetime.now()
             if now.hour == 5 and now.minute == 0:
                 if last_report_date != now.date():
                     report = f"🌅 5AM DAILY REPORT\nDevices Online: {len(devices)}\nSystem Status: OK"
@@ -290,6 +557,30 @@ def background_scanner():
             logging.error(f"Scanner Loop Error: {e}")
             time.sleep(10)
 
+_scanner_lock = threading.Lock()
+_scanner_thread: Optional[threading.Thread] = None
+
+def start_scanner():
+    """Start the background scanner once per process (script, waitress or gunicorn)."""
+    global _scanner_thread
+    with _scanner_lock:
+        if _scanner_thread is None:
+            _scanner_thread = threading.Thread(target=background_scanner, daemon=True)
+            _scanner_thread.start()
+
+@app.before_request
+def ensure_scanner():
+    # Under gunicorn/waitress-serve the module is imported, never run as __main__.
+    if _scanner_thread is None:
+        start_scanner()
+
+def run_server():
+    """Serve on waitress' thread pool when installed, else the threaded dev server."""
+    if serve is not None:
+        serve(app, host="0.0.0.0", port=APP_PORT, threads=WSGI_THREADS)
+    else:
+        app.run(host="0.0.0.0", port=APP_PORT, debug=False, threaded=True)
+
 # ----------------------
 # FLASK ROUTES
 # ----------------------
@@ -297,29 +588,69 @@ def background_scanner():
 def home(): return render_template_string(HTML)
 
 @app.route("/api/snapshot")
-def api_snapshot(): return jsonify(load_json(SNAPSHOT_FILE, {"counts":{"seen":0},"devices":[]}))
+def api_snapshot():
+    # ETag = scan timestamp, so polls between scans get an empty 304
+    with _snapshot_lock:
+        etag = _snapshot.get("timestamp", "")
+        # weak tag: flask-compress rewrites strong ETags per encoding ("<ts>:gzip"), which would never match here
+        if etag and request.if_none_match.contains_weak(etag):
+            resp = Response(status=304)
+        else:
+            resp = jsonify(_snapshot or {"counts":{"seen":0},"devices":[]})
+    if etag:
+        resp.set_etag(etag, weak=True)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
 
 @app.route("/api/history")
 def api_history():
-    recs = []
-    if HISTORY_FILE.exists():
-        lines = HISTORY_FILE.read_text().splitlines()[-50:]
-        recs = [json.loads(line) for line in lines]
-    return jsonify({"records": recs})
+    return jsonify({"records": list(_history)})
 
 @app.route("/api/log_tail")
 def api_log_tail():
-    lines = LOG_FILE.read_text().splitlines()[-20:] if LOG_FILE.exists() else []
+    lines = tail_lines(LOG_FILE, 20)
     return jsonify({"lines": lines})
 
-@app.route("/api/sys_info")
-def api_sys_info():
+def sys_info() -> dict:
     temp = 0
     try:
         with open("/sys/class/thermal/thermal_zone0/temp", "r") as f:
             temp = round(int(f.read()) / 1000, 1)
     except: pass
-    return jsonify({"cpu": psutil.cpu_percent(), "ram_perc": psutil.virtual_memory().percent, "temp": temp})
+    return {"cpu": psutil.cpu_percent(), "ram_perc": psutil.virtual_memory().percent, "temp": temp}
+
+@app.route("/api/sys_info")
+def api_sys_info():
+    return jsonify(sys_info())
+
+def sse_message(data: dict) -> str:
+    body = orjson.dumps(data).decode() if orjson is not None else json.dumps(data)
+    return f"data: {body}\n\n"
+
+@app.route("/api/stream")
+def api_stream():
+    """Server-Sent Events: full state on connect, then whatever the scanner publishes."""
+    q = subscribe()
+    if q is None:
+        # every stream holds a worker thread; past the cap the page falls back to polling
+        return Response("stream limit reached", status=503, headers={"Retry-After": str(SSE_SYS_INFO_SEC)})
+    def gen():
+        try:
+            with _snapshot_lock:
+                snap = dict(_snapshot) or {"counts":{"seen":0},"devices":[]}
+            yield sse_message({"snapshot": snap, "history": list(_history), "logs": tail_lines(LOG_FILE, 20), "sys": sys_info()})
+            while True:
+                try:
+                    update = q.get(timeout=SSE_SYS_INFO_SEC)
+                except queue.Empty:
+                    update = {"sys": sys_info()}  # doubles as the keep-alive
+                yield sse_message(update)
+        finally:
+            unsubscribe(q)
+    resp = Response(gen(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    # gen()'s finally never runs if the response is closed before the first chunk; free the slot either way
+    resp.call_on_close(lambda: unsubscribe(q))
+    return resp
 
 # ----------------------
 # MAIN ENTRY POINT
@@ -332,8 +663,8 @@ if __name__ == "__main__":
         print("   Please restart with: sudo python3 dashboard.py")
     
     # Start the Scanner Thread
-    t = threading.Thread(target=background_scanner, daemon=True)
-    t.start()
+    start_scanner()
     
-    # Start the Web App
-    app.run(host="0.0.0.0", port=APP_PORT, debug=False)
+    # Start the Web App (gunicorn: gunicorn -w 1 --threads 12 -b 0.0.0.0:8080 dashboard6:app,
+    # i.e. --threads >= SSE_MAX_CLIENTS + 8 so open streams cannot starve the API)
+    run_server()
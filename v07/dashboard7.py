@@ -4,18 +4,42 @@ SOC Pi v7.0 - Real-Time Network Intelligence Dashboard
 Run with: sudo python3 dashboard.py
 """
 
+import atexit
+import csv
 import psutil
 import json
 import time
 import threading
 import subprocess
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import logging
 import os
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Any, List
-from flask import Flask, jsonify, render_template_string
+from typing import Any, Dict, Iterator, List, Optional, Set
+from xml.etree import ElementTree as ET
+from flask import Flask, Response, jsonify, render_template_string, request
+
+try:
+    import orjson  # fast C serializer; stdlib json is the fallback
+except ImportError:
+    orjson = None
+try:
+    import numpy as np
+    from numba import njit, prange  # batch risk scoring for very large sweeps
+except ImportError:
+    np = njit = prange = None
+try:
+    from flask_compress import Compress  # gzip for API responses when installed
+except ImportError:
+    Compress = None
+try:
+    from waitress import serve  # threaded production WSGI server
+except ImportError:
+    serve = None
 
 # ----------------------
 # CONFIGURATION
@@ -27,6 +51,14 @@ HISTORY_FILE = Path("history.jsonl")
 LOG_FILE = Path("network_monitor.log")
 VENDOR_CACHE_FILE = Path("vendor_cache.json")
 KNOWN_DEVICES_FILE = Path("known_devices.json")
+VENDOR_JOURNAL_FILE = Path("vendor_cache.jsonl")
+OUI_FILE = Path("oui.csv")  # IEEE MA-L registry: https://standards-oui.ieee.org/oui/oui.csv
+VENDOR_ONLINE_LOOKUP = True  # fall back to api.macvendors.com for prefixes missing from OUI_FILE
+KNOWN_DEVICES_JOURNAL_FILE = Path("known_devices.jsonl")
+CHECKPOINT_EVERY = 50  # fold journals into the .json files after N appends
+DEBUG_JSON = False  # pretty-print the persisted .json files
+VENDOR_WORKERS = 4  # concurrent get_vendor fallbacks while nmap is still streaming
+WSGI_THREADS = 8  # request threads when served by waitress (or gunicorn --threads)
 
 # Telegram Settings
 TELEGRAM = {
@@ -46,6 +78,42 @@ VULN_DB = {
     3389: ("MEDIUM", "RDP - Remote Desktop"),
 }
 
+# Risk scoring: bit i of a host's mask = VULN_PORTS[i] is open. A host takes the
+# severity of its highest-numbered vulnerable port, i.e. its highest set bit.
+VULN_PORTS = sorted(VULN_DB)
+VULN_BIT = {p: i for i, p in enumerate(VULN_PORTS)}
+SEVERITIES = ["LOW", "MEDIUM", "HIGH", "CRITICAL"]
+NUMBA_MIN_HOSTS = 256  # below this the JIT call overhead isn't worth it
+
+def vuln_mask(ports: List[int]) -> int:
+    m = 0
+    for p in ports:
+        b = VULN_BIT.get(p)
+        if b is not None:
+            m |= 1 << b
+    return m
+
+if njit is not None:
+    VULN_SEVERITY_CODES = np.array([SEVERITIES.index(VULN_DB[p][0]) for p in VULN_PORTS], dtype=np.int8)
+
+    @njit(cache=True, nogil=True, parallel=True)
+    def _risk_codes(masks, sev_by_bit):
+        out = np.zeros(masks.shape[0], dtype=np.int8)
+        for i in prange(masks.shape[0]):
+            m = masks[i]
+            b = -1
+            while m:
+                m >>= np.uint64(1)
+                b += 1
+            if b >= 0:
+                out[i] = sev_by_bit[b]
+        return out
+else:
+    _risk_codes = None
+
+# Dashboard badge per risk level, attached to each device by the scanner
+RISK_BADGES = {"CRITICAL": "badge-danger", "HIGH": "badge-danger", "MEDIUM": "badge-warn", "LOW": "badge-success"}
+
 # ----------------------
 # LOGGING SETUP
 # ----------------------
@@ -56,6 +124,12 @@ logging.basicConfig(
 )
 
 app = Flask(__name__)
+if Compress is not None:
+    Compress(app)
+
+# One keep-alive pool for macvendors + Telegram instead of a TLS handshake per call
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=16, max_retries=Retry(total=2)))
 
 # ----------------------
 # DASHBOARD UI
@@ -117,9 +191,23 @@ HTML = """
     </div>
 </div>
 <script>
+// Snapshot devices arrive column-wise ({ip:[...], mac:[...], ...}); rebuild row objects for rendering.
+function zipColumns(cols) {
+    const keys = Object.keys(cols);
+    const n = keys.length ? cols[keys[0]].length : 0;
+    const rows = [];
+    for (let i = 0; i < n; i++) {
+        const d = {};
+        for (const k of keys) d[k] = cols[k][i];
+        rows.push(d);
+    }
+    return rows;
+}
+
 async function refreshData() {
     try {
-        const snap = await fetch("/api/snapshot").then(r => r.json());
+        const snap = await fetch("/api/snapshot?layout=columns").then(r => r.json());
+        snap.devices = zipColumns(snap.columns || {});
         const sys = await fetch("/api/sys_info").then(r => r.json());
 
         document.getElementById('stat-seen').innerText = snap.counts.seen;
@@ -129,10 +217,7 @@ async function refreshData() {
 
         const tbody = document.getElementById('device-table');
         tbody.innerHTML = snap.devices.map(d => {
-            let badgeClass = "badge-success";
-            if(d.risk === "CRITICAL" || d.risk === "HIGH") badgeClass = "badge-danger";
-            else if(d.risk === "MEDIUM") badgeClass = "badge-warn";
-
+            const badgeClass = d.badge || "badge-success";
             const ports = d.ports.map(p => `<span class="port-tag">${p}</span>`).join('') || "None";
 
             return `
@@ -162,27 +247,110 @@ def load_json(path: Path, default: Any) -> Any:
     except: return default
 
 def save_json(path: Path, data: Any):
-    path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    """Temp file + fsync + rename, so a power cut leaves either the old or the new file, never a torn one."""
+    if orjson is not None:
+        body = orjson.dumps(data, option=orjson.OPT_INDENT_2 if DEBUG_JSON else 0)
+    else:
+        body = (json.dumps(data, indent=2) if DEBUG_JSON else json.dumps(data, separators=(",", ":"))).encode("utf-8")
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(body)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
 
 def send_telegram(message: str):
     if not TELEGRAM["ENABLED"]: return
     url = f"https://api.telegram.org/bot{TELEGRAM['TOKEN']}/sendMessage"
     try:
-        requests.post(url, json={"chat_id": TELEGRAM["CHAT_ID"], "text": message, "parse_mode": "Markdown"}, timeout=10)
+        _session.post(url, json={"chat_id": TELEGRAM["CHAT_ID"], "text": message, "parse_mode": "Markdown"}, timeout=10)
     except Exception as e:
         logging.error(f"Telegram Error: {e}")
 
+def load_journal(path: Path) -> List[dict]:
+    """Reads an append-only .jsonl journal, skipping torn/partial lines."""
+    recs = []
+    if path.exists():
+        for line in path.read_text(encoding="utf-8").splitlines():
+            try: recs.append(json.loads(line))
+            except: pass
+    return recs
+
+class Journal:
+    """Append-only .jsonl next to a consolidated .json; checkpointed every CHECKPOINT_EVERY appends."""
+    def __init__(self, path: Path, checkpoint):
+        self.path = path
+        self.checkpoint_fn = checkpoint
+        self.appends = 0
+        self.fp = open(path, "a", buffering=1 << 16, encoding="utf-8")
+        atexit.register(self.checkpoint)
+
+    def append(self, rec: dict):
+        self.fp.write(json.dumps(rec) + "\n")
+        self.fp.flush()
+        self.appends += 1
+        if self.appends >= CHECKPOINT_EVERY:
+            self.checkpoint()
+
+    def checkpoint(self):
+        self.checkpoint_fn()  # save_json: durably on disk before the journal is dropped
+        self.fp.flush()
+        self.fp.truncate(0)
+        self.appends = 0
+
+def load_vendor_cache() -> Dict[str, str]:
+    cache = load_json(VENDOR_CACHE_FILE, {})
+    for rec in load_journal(VENDOR_JOURNAL_FILE):
+        if "prefix" in rec and "vendor" in rec:
+            cache[rec["prefix"]] = rec["vendor"]
+    return cache
+
+def load_known_macs() -> Set[str]:
+    known = set(load_json(KNOWN_DEVICES_FILE, []))
+    for rec in load_journal(KNOWN_DEVICES_JOURNAL_FILE):
+        if rec.get("mac"):
+            known.add(rec["mac"])
+    return known
+
+def oui_key(mac: str) -> int:
+    return int(mac.replace(":", "").replace("-", "")[:6], 16)
+
+def load_oui(path: Path) -> Dict[int, str]:
+    """IEEE oui.csv -> {24-bit prefix: organization}. Empty if the file isn't there."""
+    oui = {}
+    try:
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.reader(f):
+                try: oui[int(row[1], 16)] = row[2].strip()
+                except: pass  # header / malformed rows
+    except OSError:
+        logging.warning(f"{path} not found; vendor lookups use the cache/online API only.")
+    return oui
+
+_OUI: Dict[int, str] = load_oui(OUI_FILE)
+
+# In-memory state is authoritative; journals only make new entries durable.
+_VENDOR_CACHE: Dict[str, str] = load_vendor_cache()
+_vendor_journal = Journal(VENDOR_JOURNAL_FILE, lambda: save_json(VENDOR_CACHE_FILE, _VENDOR_CACHE))
+_vendor_lock = threading.Lock()  # scanner thread + request threads share the cache
+
 def get_vendor(mac: str) -> str:
     if not mac: return "Unknown"
-    cache = load_json(VENDOR_CACHE_FILE, {})
+    try: vendor = _OUI.get(oui_key(mac))
+    except ValueError: vendor = None
+    if vendor: return vendor
     prefix = mac[:8].upper()
-    if prefix in cache: return cache[prefix]
+    with _vendor_lock:
+        cached = _VENDOR_CACHE.get(prefix)
+    if cached is not None: return cached
+    if not VENDOR_ONLINE_LOOKUP: return "Unknown"
     try:
-        r = requests.get(f"https://api.macvendors.com/{mac}", timeout=2)
+        r = _session.get(f"https://api.macvendors.com/{mac}", timeout=2)
         if r.status_code == 200:
             vendor = r.text.strip()
-            cache[prefix] = vendor
-            save_json(VENDOR_CACHE_FILE, cache)
+            with _vendor_lock:
+                _VENDOR_CACHE[prefix] = vendor
+                _vendor_journal.append({"prefix": prefix, "vendor": vendor})
             return vendor
     except: pass
     return "Unknown"
@@ -191,54 +359,108 @@ def get_vendor(mac: str) -> str:
 # SCANNER CORE
 # ----------------------
 
+# Latest snapshot, published by the scanner thread and served straight from memory.
+_snapshot_lock = threading.Lock()
+_snapshot: dict = load_json(SNAPSHOT_FILE, {})
+
+def snapshot_columns(snapshot: dict) -> dict:
+    """Struct-of-arrays wire layout: each device key is sent once, not once per device."""
+    devices = snapshot.get("devices", [])
+    keys = list(devices[0]) if devices else []
+    out = {k: v for k, v in snapshot.items() if k != "devices"}
+    out["columns"] = {k: [d.get(k) for d in devices] for k in keys}
+    return out
+
+def publish_snapshot(snapshot: dict):
+    with _snapshot_lock:
+        _snapshot.clear()
+        _snapshot.update(snapshot)
+    save_json(SNAPSHOT_FILE, snapshot)  # durability only; the API no longer reads it
+
+def stream_nmap_hosts(cmd: List[str]) -> Iterator[ET.Element]:
+    """Yields each <host> as soon as nmap writes it, so parsing overlaps the scan."""
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        for _, elem in ET.iterparse(proc.stdout, events=("end",)):
+            if elem.tag == "host":
+                yield elem
+                elem.clear()
+    finally:
+        proc.stdout.close()
+        proc.wait()
+
+def host_to_device(host: ET.Element) -> Optional[dict]:
+    """One nmap <host> from the `nmap -F -oX -` sweep: addresses, open ports, risk."""
+    ip = None
+    mac = ""
+    vendor = ""
+    for addr in host.findall("address"):
+        if addr.get("addrtype") == "ipv4":
+            ip = addr.get("addr")
+        elif addr.get("addrtype") == "mac":
+            mac = addr.get("addr", "")
+            vendor = addr.get("vendor", "")
+    if not ip:
+        return None
+
+    ports = []
+    for port in host.findall("ports/port"):
+        state = port.find("state")
+        if port.get("protocol") != "tcp" or state is None or state.get("state") != "open":
+            continue
+        ports.append(int(port.get("portid")))
+
+    return {"ip": ip, "mac": mac, "vendor": vendor, "ports": ports}
+
+def score_devices(devices: List[dict]):
+    """Sets risk + badge on every device in one batch (see VULN_PORTS for the bitmask layout)."""
+    masks = [vuln_mask(d["ports"]) for d in devices]
+    if _risk_codes is not None and len(masks) >= NUMBA_MIN_HOSTS:
+        codes = _risk_codes(np.array(masks, dtype=np.uint64), VULN_SEVERITY_CODES)
+        risks = [SEVERITIES[c] for c in codes]
+    else:
+        risks = [VULN_DB[VULN_PORTS[m.bit_length() - 1]][0] if m else "LOW" for m in masks]
+    for d, risk in zip(devices, risks):
+        d["risk"] = risk
+        d["badge"] = RISK_BADGES.get(risk, "badge-success")
+
+def scan_network(cmd: List[str]) -> List[dict]:
+    """Runs nmap and builds devices while it streams; vendor fallbacks resolve on worker threads meanwhile."""
+    devices = []
+    pending = []
+    with ThreadPoolExecutor(max_workers=VENDOR_WORKERS) as vendor_pool:
+        for host in stream_nmap_hosts(cmd):
+            device = host_to_device(host)
+            if device is None:
+                continue
+            if not device["vendor"]:
+                pending.append((device, vendor_pool.submit(get_vendor, device["mac"])))
+            devices.append(device)
+        for device, fut in pending:
+            device["vendor"] = fut.result()
+    score_devices(devices)
+    return devices
+
 def background_scanner():
     logging.info("Deep Vulnerability Scanner Started...")
-    known_macs = load_json(KNOWN_DEVICES_FILE, [])
+    known_macs = load_known_macs()
+    known_journal = Journal(KNOWN_DEVICES_JOURNAL_FILE, lambda: save_json(KNOWN_DEVICES_FILE, sorted(known_macs)))
 
     while True:
         try:
             # 1. RUN NMAP DISCOVERY & PORT SCAN
-            # -F (Fast scan 100 ports), -sV (Service detection)
-            cmd = ["nmap", "-sn", NETWORK_CIDR]
-            res = subprocess.run(cmd, capture_output=True, text=True)
-            
-            ips = []
-            for line in res.stdout.splitlines():
-                if "Nmap scan report for" in line:
-                    ips.append(line.split()[-1].strip("()"))
-
-            found_devices = []
-            for ip in ips:
-                # Targeted port scan for found host
-                port_cmd = ["nmap", "-F", ip]
-                port_res = subprocess.run(port_cmd, capture_output=True, text=True)
-                
-                mac = ""
-                ports = []
-                risk = "LOW"
-                vulnerabilities = []
-
-                for line in port_res.stdout.splitlines():
-                    if "MAC Address:" in line:
-                        mac = line.split("MAC Address:")[1].split("(")[0].strip()
-                    if "/tcp" in line and "open" in line:
-                        p = int(line.split("/")[0])
-                        ports.append(p)
-                        if p in VULN_DB:
-                            severity, desc = VULN_DB[p]
-                            risk = severity
-                            vulnerabilities.append(f"{p} ({desc})")
-
-                vendor = get_vendor(mac)
-                device = {"ip": ip, "mac": mac, "vendor": vendor, "ports": ports, "risk": risk}
-                found_devices.append(device)
-
-                # 2. TELEGRAM NOTIFICATION (NEW DEVICE OR VULN)
+            # -F (Fast scan 100 ports) in the same pass as discovery; XML carries MAC + vendor
+            cmd = ["nmap", "-F", "-oX", "-", NETWORK_CIDR]
+            found_devices = scan_network(cmd)
+
+            # 2. TELEGRAM NOTIFICATION (NEW DEVICE OR VULN)
+            for device in found_devices:
+                mac = device["mac"]
                 if mac and mac not in known_macs:
-                    msg = f"🛡 *SOC ALERT: NEW DEVICE*\nIP: `{ip}`\nMAC: `{mac}`\nVendor: {vendor}\nPorts: {ports}\nRisk: {risk}"
+                    msg = f"🛡 *SOC ALERT: NEW DEVICE*\nIP: `{device['ip']}`\nMAC: `{mac}`\nVendor: {device['vendor']}\nPorts: {device['ports']}\nRisk: {device['risk']}"
                     send_telegram(msg)
-                    known_macs.append(mac)
-                    save_json(KNOWN_DEVICES_FILE, known_macs)
+                    known_macs.add(mac)
+                    known_journal.append({"mac": mac})
 
             # 3. SAVE DATA
             snapshot = {
@@ -246,13 +468,37 @@ def background_scanner():
                 "counts": {"seen": len(found_devices)},
                 "devices": found_devices
             }
-            save_json(SNAPSHOT_FILE, snapshot)
+            publish_snapshot(snapshot)
             time.sleep(45)
 
         except Exception as e:
             logging.error(f"Scanner Loop Error: {e}")
             time.sleep(10)
 
+_scanner_lock = threading.Lock()
+_scanner_thread: Optional[threading.Thread] = None
+
+def start_scanner():
+    """Start the background scanner once per process (script, waitress or gunicorn)."""
+    global _scanner_thread
+    with _scanner_lock:
+        if _scanner_thread is None:
+            _scanner_thread = threading.Thread(target=background_scanner, daemon=True)
+            _scanner_thread.start()
+
+@app.before_request
+def ensure_scanner():
+    # Under gunicorn/waitress-serve the module is imported, never run as __main__.
+    if _scanner_thread is None:
+        start_scanner()
+
+def run_server():
+    """Serve on waitress' thread pool when installed, else the threaded dev server."""
+    if serve is not None:
+        serve(app, host="0.0.0.0", port=APP_PORT, threads=WSGI_THREADS)
+    else:
+        app.run(host="0.0.0.0", port=APP_PORT, debug=False, threaded=True)
+
 # ----------------------
 # FLASK API
 # ----------------------
@@ -260,8 +506,23 @@ def background_scanner():
 def home(): return render_template_string(HTML)
 
 @app.route("/api/snapshot")
-def api_snapshot(): 
-    return jsonify(load_json(SNAPSHOT_FILE, {"counts": {"seen": 0}, "devices": []}))
+def api_snapshot():
+    # ETag = scan timestamp, so polls between scans get an empty 304
+    columnar = request.args.get("layout") == "columns"
+    with _snapshot_lock:
+        etag = _snapshot.get("timestamp", "")
+        if etag and columnar:
+            etag += "-columns"
+        # weak tag: flask-compress rewrites strong ETags per encoding ("<ts>:gzip"), which would never match here
+        if etag and request.if_none_match.contains_weak(etag):
+            resp = Response(status=304)
+        else:
+            snap = _snapshot or {"counts": {"seen": 0}, "devices": []}
+            resp = jsonify(snapshot_columns(snap) if columnar else snap)
+    if etag:
+        resp.set_etag(etag, weak=True)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
 
 @app.route("/api/sys_info")
 def api_sys_info():
@@ -277,5 +538,5 @@ if __name__ == "__main__":
         print("CRITICAL: Root privileges required for Nmap detection.")
         exit(1)
 
-    threading.Thread(target=background_scanner, daemon=True).start()
-    app.run(host="0.0.0.0", port=APP_PORT, debug=False)
\ No newline at end of file
+    start_scanner()
+    run_server()  # or: gunicorn -w 1 --threads 8 -b 0.0.0.0:8080 dashboard7:app
\ No newline at end of file
@@ -6,31 +6,60 @@ Dashboard w/ charts, history, log tail, system info, vendor cache, Telegram aler
 
 RUN:
   sudo python3 dashboard.py
+  # or: sudo gunicorn -w 1 --threads 8 -b 0.0.0.0:8080 dashboard8:app   (one worker = one scanner)
 
 DEPENDENCIES:
   sudo apt-get update
   sudo apt-get install -y nmap
+  sudo apt-get install -y masscan   # optional: fast open-port pre-pass before nmap -sV -O
   sudo pip3 install flask psutil requests
+  sudo pip3 install scapy   # optional: in-process ARP discovery instead of nmap -sn
+  sudo pip3 install orjson  # optional: faster JSON for snapshots and API responses
+  sudo pip3 install waitress  # optional: threaded WSGI server instead of the Flask dev server
 
 NOTES:
 - Run with sudo/root for best results (MAC detection + OS detection).
-- Telegram creds: set env vars or disable TELEGRAM["ENABLED"].
+- Telegram: SOCPI_TELEGRAM_ENABLED=1 plus SOCPI_TELEGRAM_TOKEN / SOCPI_TELEGRAM_CHAT_ID.
 """
 
+import atexit
+import csv
+import hashlib
 import json
 import time
 import threading
 import subprocess
 import requests
+from requests.adapters import HTTPAdapter
 import logging
 import os
+import queue
 import re
+import shutil
+import sys
+import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from datetime import datetime
-from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
+from xml.etree import ElementTree as ET
+from typing import Any, Dict, FrozenSet, Iterator, List, Optional, Set, Tuple, Union
 
 import psutil
-from flask import Flask, jsonify, render_template_string
+from flask import Flask, Response, request
+
+try:
+    import orjson  # fast C serializer; stdlib json is the fallback
+except ImportError:
+    orjson = None
+try:
+    from waitress import serve  # threaded production WSGI server
+except ImportError:
+    serve = None
+try:
+    from scapy.all import ARP, Ether, srp  # in-process ARP sweep for discovery
+except ImportError:
+    srp = None
 
 # ----------------------
 # CONFIGURATION
@@ -40,30 +69,66 @@ NETWORK_CIDR = os.getenv("SOCPI_CIDR", "192.168.0.0/24")
 
 SCAN_INTERVAL_SEC = int(os.getenv("SOCPI_SCAN_INTERVAL", "60"))        # host discovery cadence
 PROFILE_TTL_SEC = int(os.getenv("SOCPI_PROFILE_TTL", "300"))           # re-profile same host after N seconds
+PROFILE_BATCH_MAX = int(os.getenv("SOCPI_PROFILE_BATCH", "16"))         # hosts per profile nmap run
+PROFILE_BATCH_WAIT_SEC = 2.0                                            # wait this long to fill a batch
 NMAP_TOP_PORTS = int(os.getenv("SOCPI_TOP_PORTS", "50"))
+# Optional masscan pre-pass: find open ports fast, then nmap fingerprints only those.
+# Default range covers the well-known ports plus every port the risk/type heuristics look at.
+MASSCAN_PORTS = os.getenv("SOCPI_MASSCAN_PORTS", "1-1024,1900,2323,2869,3306,3389,5555,5900,8008,8009,8080,8443,62078")
+MASSCAN_RATE = int(os.getenv("SOCPI_MASSCAN_RATE", "10000"))           # packets/sec
+USE_MASSCAN = os.getenv("SOCPI_MASSCAN", "1") == "1" and shutil.which("masscan") is not None
+ARP_TIMEOUT_SEC = float(os.getenv("SOCPI_ARP_TIMEOUT", "2"))          # scapy discovery reply wait
+VENDOR_WORKERS = 8                                                      # concurrent macvendors lookups per cycle
+DEBUG_JSON = os.getenv("SOCPI_DEBUG_JSON", "0") == "1"                 # pretty-print the persisted .json files
+WSGI_THREADS = int(os.getenv("SOCPI_WSGI_THREADS", "8"))                # request threads under waitress / gunicorn --threads
+SYS_INFO_TTL_SEC = 1.0                                                  # /api/sys_info answers from cache this long
 
 SNAPSHOT_FILE = Path(os.getenv("SOCPI_SNAPSHOT_FILE", "scan_snapshot.json"))
 HISTORY_FILE = Path(os.getenv("SOCPI_HISTORY_FILE", "history.jsonl"))
 LOG_FILE = Path(os.getenv("SOCPI_LOG_FILE", "network_monitor.log"))
 VENDOR_CACHE_FILE = Path(os.getenv("SOCPI_VENDOR_CACHE", "vendor_cache.json"))
-
-
+OUI_FILE = Path(os.getenv("SOCPI_OUI_FILE", "oui.csv"))                 # IEEE MA-L registry, fetched on first run
+OUI_URL = "https://standards-oui.ieee.org/oui/oui.csv"
+
+# Telegram alerts (off unless enabled and both creds are set)
+TELEGRAM = {
+    "ENABLED": os.getenv("SOCPI_TELEGRAM_ENABLED", "0") == "1",
+    "TOKEN": os.getenv("SOCPI_TELEGRAM_TOKEN", ""),
+    "CHAT_ID": os.getenv("SOCPI_TELEGRAM_CHAT_ID", ""),
+}
 
 # "Risk" heuristic ports (you can tune this)
-RISKY_PORTS_CRITICAL = {"23", "2323", "3389", "5900", "445"}   # telnet, RDP, VNC, SMB
-RISKY_PORTS_MEDIUM = {"22", "21", "8080", "8443", "3306"}      # ssh/ftp/webadmin/db-ish
+RISKY_PORTS_CRITICAL = frozenset({23, 2323, 3389, 5900, 445})   # telnet, RDP, VNC, SMB
+RISKY_PORTS_MEDIUM = frozenset({22, 21, 8080, 8443, 3306})      # ssh/ftp/webadmin/db-ish
 
 
 # ----------------------
 # LOGGING & APP
 # ----------------------
+LOG_RING: deque = deque(maxlen=200)  # recent formatted log lines for /api/log_tail
+LOG_START_SIZE = LOG_FILE.stat().st_size if LOG_FILE.exists() else 0  # previous runs' part of the log
+
+
+class RingHandler(logging.Handler):
+    """Keeps the last formatted records in LOG_RING so the API never re-reads the log file."""
+    def emit(self, record: logging.LogRecord):
+        try:
+            LOG_RING.append(self.format(record))
+        except Exception:
+            self.handleError(record)
+
+
 logging.basicConfig(
     level=logging.INFO,
     format="[%(asctime)s] %(levelname)s: %(message)s",
-    handlers=[logging.FileHandler(LOG_FILE), logging.StreamHandler()],
+    handlers=[logging.FileHandler(LOG_FILE), logging.StreamHandler(), RingHandler()],
 )
 app = Flask(__name__)
 
+# One keep-alive pool for macvendors + Telegram instead of a TLS handshake per call
+HTTP = requests.Session()
+HTTP.mount("https://", HTTPAdapter(pool_connections=VENDOR_WORKERS, pool_maxsize=VENDOR_WORKERS))
+
 # ----------------------
 # UI (Dashboard)
 # ----------------------
@@ -276,43 +341,157 @@ document.getElementById('risk-filter').addEventListener('change', refreshData);
 """
 
 
+# No Jinja markup in HTML, so it is encoded once and served as-is
+# (if variables are ever added: app.jinja_env.from_string(HTML) once, .render() per request).
+HTML_BYTES = HTML.encode("utf-8")
+
+
 # ----------------------
 # JSON UTIL
 # ----------------------
+def dumps(data: Any) -> bytes:
+    """Compact UTF-8 JSON; orjson when installed."""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+
+def loads(raw: Any) -> Any:
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+
+def json_response(data: Any) -> Response:
+    return Response(dumps(data), mimetype="application/json")
+
+
+def conditional_json(body: bytes, etag: str) -> Response:
+    """JSON body with an ETag; empty 304 when the client already has this version."""
+    if request.if_none_match.contains(etag):
+        resp = Response(status=304)
+    else:
+        resp = Response(body, mimetype="application/json")
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "no-cache"  # always revalidate, never serve stale
+    return resp
+
+
 def load_json(path: Path, default: Any) -> Any:
     try:
-        return json.loads(path.read_text(encoding="utf-8"))
+        return loads(path.read_bytes())
     except Exception:
         return default
 
 
 def save_json(path: Path, data: Any):
-    path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    if DEBUG_JSON:
+        path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    else:
+        path.write_bytes(dumps(data))
+
+
+def tail_lines(path: Path, n: int, approx_line_bytes: int = 256, end: Optional[int] = None) -> List[str]:
+    """Last n lines of a file (or of its first `end` bytes) without reading the whole thing."""
+    if n <= 0:
+        return []
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell() if end is None else min(end, f.tell())
+            window = max(n * approx_line_bytes, 4096)
+            while True:
+                start = max(0, size - window)
+                f.seek(start)
+                lines = f.read(size - start).decode("utf-8", "replace").splitlines()
+                # first line is likely partial unless we started at offset 0
+                if start == 0 or len(lines) > n:
+                    return lines[-n:] if start == 0 else lines[1:][-n:]
+                window *= 2
+    except OSError:
+        return []
 
 
 # ----------------------
 # VENDOR LOOKUP (cached)
 # ----------------------
+def load_oui(path: Path) -> Dict[str, str]:
+    """
+    IEEE oui.csv -> {"AA:BB:CC": organization}.
+    Downloads the registry once if it isn't on disk; empty dict if that fails too.
+    """
+    if not path.exists():
+        try:
+            logging.info(f"Fetching OUI registry from {OUI_URL}…")
+            r = HTTP.get(OUI_URL, timeout=30)
+            r.raise_for_status()
+            path.write_bytes(r.content)
+        except Exception as e:
+            logging.warning(f"OUI registry unavailable ({e}); vendor lookups use cache/online API only.")
+            return {}
+
+    oui: Dict[str, str] = {}
+    with open(path, newline="", encoding="utf-8", errors="replace") as f:
+        for row in csv.reader(f):
+            # Registry,Assignment,Organization Name,Organization Address
+            if len(row) >= 3 and len(row[1]) == 6:
+                a = row[1].upper()
+                oui[f"{a[0:2]}:{a[2:4]}:{a[4:6]}"] = row[2].strip()
+    return oui
+
+
+OUI_DB: Dict[str, str] = load_oui(OUI_FILE)
+
+VENDOR_CACHE: Dict[str, str] = load_json(VENDOR_CACHE_FILE, {})
+VENDOR_CACHE_LOCK = threading.Lock()
+VENDOR_DIRTY = False
+
+
+def flush_vendor_cache():
+    """Persist VENDOR_CACHE if lookups added entries since the last flush."""
+    global VENDOR_DIRTY
+    with VENDOR_CACHE_LOCK:
+        if not VENDOR_DIRTY:
+            return
+        data = dict(VENDOR_CACHE)
+        VENDOR_DIRTY = False
+    save_json(VENDOR_CACHE_FILE, data)
+
+
+atexit.register(flush_vendor_cache)
+
+
+VENDOR_POOL = ThreadPoolExecutor(max_workers=VENDOR_WORKERS)  # scanner-side lookups, overlapped with nmap
+
+
+def is_unknown_vendor(vendor: Optional[str]) -> bool:
+    return (vendor or "").strip().lower() in ("unknown", "unknown vendor", "")
+
+
 def get_vendor(mac: str) -> str:
     """
     Tries:
-      1) local cache by OUI prefix
-      2) api.macvendors.com lookup
+      1) local IEEE OUI registry
+      2) in-memory cache by OUI prefix
+      3) api.macvendors.com lookup
     """
+    global VENDOR_DIRTY
     if not mac:
         return "Unknown"
-    cache = load_json(VENDOR_CACHE_FILE, {})
     mac_prefix = mac[:8].upper()  # "AA:BB:CC"
-    if mac_prefix in cache:
-        return cache[mac_prefix]
+    vendor = OUI_DB.get(mac_prefix)
+    if vendor:
+        return vendor
+    with VENDOR_CACHE_LOCK:
+        if mac_prefix in VENDOR_CACHE:
+            return VENDOR_CACHE[mac_prefix]
 
     try:
-        r = requests.get(f"https://api.macvendors.com/{mac}", timeout=3)
+        r = HTTP.get(f"https://api.macvendors.com/{mac}", timeout=3)
         if r.status_code == 200:
             vendor = r.text.strip()
             if vendor:
-                cache[mac_prefix] = vendor
-                save_json(VENDOR_CACHE_FILE, cache)
+                with VENDOR_CACHE_LOCK:
+                    VENDOR_CACHE[mac_prefix] = vendor
+                    VENDOR_DIRTY = True
                 return vendor
     except Exception:
         pass
@@ -331,7 +510,7 @@ def send_telegram(message: str):
 
     url = f"https://api.telegram.org/bot{TELEGRAM['TOKEN']}/sendMessage"
     try:
-        requests.post(url, json={"chat_id": TELEGRAM["CHAT_ID"], "text": message}, timeout=10)
+        HTTP.post(url, json={"chat_id": TELEGRAM["CHAT_ID"], "text": message}, timeout=10)
         logging.info("Telegram sent.")
     except Exception as e:
         logging.error(f"Telegram error: {e}")
@@ -340,37 +519,53 @@ def send_telegram(message: str):
 # ----------------------
 # CLUE ENGINE (from Code 1 + a bit more)
 # ----------------------
-def identify_device_type(vendor: str, os_guess: str, ports: List[str], hostname: str) -> str:
+_PI_RE = re.compile(r"\bpi\b")
+_VENDOR_TOKEN_RE = re.compile(r"[A-Z0-9]+")
+TV_VENDORS = frozenset({"SAMSUNG", "LG", "SONY", "VIZIO", "PANASONIC", "HISENSE", "TCL"})
+MEDIA_PORTS = frozenset({8008, 8009, 1900, 554, 2869})
+
+
+def port_ids(ports: List[str]) -> FrozenSet[int]:
+    """Port strings ("22/tcp open  ssh ...") -> {22, ...}; computed once per device per scan."""
+    ids = set()
+    for p in ports:
+        try:
+            ids.add(int(p.split("/", 1)[0]))
+        except ValueError:
+            pass
+    return frozenset(ids)
+
+
+def identify_device_type(vendor: str, os_guess: str, port_nums: FrozenSet[int], hostname: str) -> str:
     vendor_u = (vendor or "Unknown").upper()
     os_l = (os_guess or "Unknown").lower()
     hn_l = (hostname or "").lower()
-    port_nums = [p.split("/")[0] for p in ports]
 
     # 1) Raspberry Pi
-    if "RASPBERRY" in vendor_u or re.search(r"\bpi\b", hn_l):
+    if "RASPBERRY" in vendor_u or _PI_RE.search(hn_l):
         return "Raspberry Pi"
 
     # 2) Apple
     if "APPLE" in vendor_u:
-        if "62078" in port_nums:
+        if 62078 in port_nums:
             return "iPhone/iPad (Locked)"
         if "darwin" in os_l or "mac os" in os_l or "macos" in os_l:
             return "Mac (iMac/MacBook)"
         return "Apple Device"
 
     # 3) Smart TV / Media
-    tv_vendors = ["SAMSUNG", "LG", "SONY", "VIZIO", "PANASONIC", "HISENSE", "TCL"]
-    if any(v in vendor_u for v in tv_vendors):
+    # whole-word vendor match: "LG Electronics" hits, "Intelligent Systems" doesn't
+    if not TV_VENDORS.isdisjoint(_VENDOR_TOKEN_RE.findall(vendor_u)):
         return "Smart TV"
-    if any(p in port_nums for p in ["8008", "8009", "1900", "554", "2869"]):
+    if not MEDIA_PORTS.isdisjoint(port_nums):
         return "Smart TV / Media Player"
 
     # 4) Android-ish hints
-    if any(p in port_nums for p in ["5555"]) and "linux" in os_l:
+    if 5555 in port_nums and "linux" in os_l:
         return "Android / Debug (ADB)"
 
     # 5) General Linux server
-    if "linux" in os_l and "22" in port_nums:
+    if "linux" in os_l and 22 in port_nums:
         return "Linux Server / SBC"
 
     if os_guess and os_guess != "Unknown":
@@ -383,17 +578,16 @@ def identify_device_type(vendor: str, os_guess: str, ports: List[str], hostname:
     return "Unknown Device"
 
 
-def compute_risk(ports: List[str], os_guess: str) -> str:
+def compute_risk(port_nums: FrozenSet[int], os_guess: str) -> str:
     """
     Simple heuristic:
       - CRITICAL if any critical risky ports are open
       - MEDIUM if any medium risky ports are open OR OS is unknown
       - LOW otherwise
     """
-    port_nums = {p.split("/")[0] for p in ports}
-    if port_nums & RISKY_PORTS_CRITICAL:
+    if not RISKY_PORTS_CRITICAL.isdisjoint(port_nums):
         return "CRITICAL"
-    if port_nums & RISKY_PORTS_MEDIUM:
+    if not RISKY_PORTS_MEDIUM.isdisjoint(port_nums):
         return "MEDIUM"
     if (os_guess or "").strip().lower() in ("", "unknown"):
         return "MEDIUM"
@@ -403,116 +597,342 @@ def compute_risk(ports: List[str], os_guess: str) -> str:
 # ----------------------
 # NMAP PARSERS
 # ----------------------
-def run_cmd(cmd: List[str]) -> Tuple[int, str, str]:
-    res = subprocess.run(cmd, capture_output=True, text=True)
-    return res.returncode, res.stdout, res.stderr
-
-
-def parse_discovery_nmap(output: str) -> List[Dict[str, Any]]:
+def stream_nmap_hosts(cmd: List[str]) -> Iterator[ET.Element]:
     """
-    Parse `nmap -sn <CIDR>` output into list of {ip, hostname?, mac?, vendor?}.
+    Run nmap with `-oX -` and yield each <host> as soon as nmap writes it.
+    Elements are cleared after use, so memory stays flat regardless of host count.
+    stderr goes to a temp file so it can't fill a pipe and stall nmap; logged on failure.
     """
-    hosts: List[Dict[str, Any]] = []
-    current: Optional[Dict[str, Any]] = None
-
-    # Typical lines:
-    # "Nmap scan report for 192.168.0.10"
-    # or "Nmap scan report for host (192.168.0.10)"
-    # "MAC Address: AA:BB:CC:DD:EE:FF (Vendor)"
-    for line in output.splitlines():
-        line = line.strip()
-
-        if line.startswith("Nmap scan report for"):
-            # flush previous
-            if current:
-                hosts.append(current)
-            current = {"ip": None, "hostname": "", "mac": None, "vendor": "Unknown"}
-
-            target = line.split("for", 1)[1].strip()
-            # target may be "name (ip)" or just "ip"
-            m = re.match(r"(.+)\s+\(([\d\.]+)\)$", target)
-            if m:
-                current["hostname"] = m.group(1).strip()
-                current["ip"] = m.group(2).strip()
-            else:
-                current["ip"] = target.strip("()")
-                current["hostname"] = ""
-
-        elif line.startswith("MAC Address:") and current:
-            # "MAC Address: AA:BB:CC:DD:EE:FF (Vendor Name)"
-            try:
-                after = line.split("MAC Address:", 1)[1].strip()
-                mac = after.split()[0].strip()
-                current["mac"] = mac
-                vendor = ""
-                if "(" in after and ")" in after:
-                    vendor = after.split("(", 1)[1].rsplit(")", 1)[0].strip()
-                current["vendor"] = vendor or "Unknown"
-            except Exception:
-                pass
+    with tempfile.TemporaryFile("w+") as errf:
+        p = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=errf)
+        try:
+            for _, elem in ET.iterparse(p.stdout, events=("end",)):
+                if elem.tag == "host":
+                    yield elem
+                    elem.clear()
+        except ET.ParseError as e:
+            logging.warning(f"nmap XML parse error: {e}")
+        finally:
+            p.stdout.close()
+            rc = p.wait()
+        if rc != 0:
+            errf.seek(0)
+            logging.warning(f"{' '.join(cmd[:2])} returned code={rc}. stderr={errf.read().strip()[:200]}")
+
+
+def parse_discovery_host(host: ET.Element) -> Dict[str, Any]:
+    """
+    One <host> from `nmap -sn -oX -` -> {ip, hostname, mac, vendor}.
+    """
+    ip = mac = None
+    vendor = "Unknown"
+    for addr in host.findall("address"):
+        if addr.get("addrtype") == "ipv4":
+            ip = addr.get("addr")
+        elif addr.get("addrtype") == "mac":
+            mac = addr.get("addr")
+            vendor = addr.get("vendor") or "Unknown"
+    hn = host.find("hostnames/hostname")
+    hostname = (hn.get("name") or "") if hn is not None else ""
+    return {"ip": ip, "hostname": hostname, "mac": mac, "vendor": vendor}
+
+
+def discover_arp(cidr: str, timeout: float = ARP_TIMEOUT_SEC) -> List[Dict[str, Any]]:
+    """
+    Broadcast one ARP who-has per address in `cidr` and collect the replies.
+    Same shape as parse_discovery_host; hostname/vendor are filled in by profiling.
+    """
+    ans, _ = srp(Ether(dst="ff:ff:ff:ff:ff:ff") / ARP(pdst=cidr), timeout=timeout, verbose=0)
+    return [{"ip": r.psrc, "hostname": "", "mac": r.hwsrc.upper(), "vendor": "Unknown"} for _, r in ans]
 
-    if current:
-        hosts.append(current)
 
-    # keep only those with IP
-    return [h for h in hosts if h.get("ip")]
+def discover_hosts() -> List[Dict[str, Any]]:
+    """ARP sweep in-process when scapy is available, otherwise `nmap -sn`."""
+    if srp is not None:
+        try:
+            return discover_arp(NETWORK_CIDR)
+        except Exception as e:
+            logging.warning(f"ARP discovery failed ({e}); falling back to nmap -sn")
+    hosts = [parse_discovery_host(h) for h in stream_nmap_hosts(["nmap", "-sn", "-oX", "-", NETWORK_CIDR])]
+    return [h for h in hosts if h["ip"]]
 
 
-def parse_profile_nmap(output: str) -> Dict[str, Any]:
+def parse_profile_host(host: ET.Element) -> Dict[str, Any]:
     """
-    Parse `nmap -O -sV --top-ports ... <ip>` output.
-    Returns dict with mac, vendor, os_guess, ports(list), hostname.
+    One <host> from `nmap -O -sV --top-ports ... -oX -`.
+    Returns dict with ip, mac, vendor, os_guess, ports(list), hostname.
     """
-    mac = None
-    vendor = "Unknown"
-    os_guess = "Unknown"
-    ports: List[str] = []
-    hostname = ""
+    info = parse_discovery_host(host)
 
-    for line in output.splitlines():
-        s = line.strip()
+    # best OS match by accuracy (what "OS details:" used to show)
+    os_guess = "Unknown"
+    best_acc = -1
+    for m in host.findall("os/osmatch"):
+        acc = int(m.get("accuracy", "0") or 0)
+        if acc > best_acc and m.get("name"):
+            best_acc, os_guess = acc, m.get("name")
 
-        if s.startswith("Nmap scan report for"):
-            target = s.split("for", 1)[1].strip()
-            m = re.match(r"(.+)\s+\(([\d\.]+)\)$", target)
-            hostname = (m.group(1).strip() if m else "")
-        elif "MAC Address:" in s:
-            try:
-                after = s.split("MAC Address:", 1)[1].strip()
-                mac = after.split()[0].strip()
-                if "(" in after and ")" in after:
-                    vendor = after.split("(", 1)[1].rsplit(")", 1)[0].strip() or vendor
-            except Exception:
-                pass
-        elif s.startswith("OS details:"):
-            os_guess = s.split("OS details:", 1)[1].strip() or os_guess
-        elif s.startswith("Running:"):
-            # sometimes more reliable than OS details
-            running = s.split("Running:", 1)[1].strip()
-            if running:
-                os_guess = running
-        elif "/tcp" in s and " open " in f" {s} ":
-            # Example: "22/tcp open  ssh  OpenSSH 8.2p1 ..."
-            ports.append(s)
-
-    return {"mac": mac, "vendor": vendor, "os": os_guess, "ports": ports, "hostname": hostname}
+    # Keep the old display form: "22/tcp open  ssh  OpenSSH 8.2p1 ..."
+    ports: List[str] = []
+    for p in host.findall("ports/port"):
+        st = p.find("state")
+        if st is None or st.get("state") != "open":
+            continue
+        svc = p.find("service")
+        name = product = ""
+        if svc is not None:
+            name = svc.get("name", "")
+            product = " ".join(x for x in (svc.get("product"), svc.get("version"), svc.get("extrainfo")) if x)
+        ports.append(sys.intern(f"{p.get('portid')}/{p.get('protocol', 'tcp')} open  {name}  {product}".rstrip()))
+
+    info.update({"os": os_guess, "ports": ports})
+    return info
+
+
+def fast_port_sweep(target_file: str) -> Optional[Dict[str, List[int]]]:
+    """
+    masscan the targets in `target_file` over MASSCAN_PORTS -> {ip: [open tcp ports]}.
+    None if masscan failed (caller falls back to a plain nmap --top-ports run).
+    """
+    cmd = ["masscan", "-p", MASSCAN_PORTS, "--rate", str(MASSCAN_RATE), "--wait", "2",
+           "-oL", "-", "-iL", target_file]
+    try:
+        res = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logging.warning(f"masscan failed: {e}")
+        return None
+    if res.returncode != 0:
+        logging.warning(f"masscan returned code={res.returncode}. stderr={res.stderr.strip()[:200]}")
+        return None
+
+    open_ports: Dict[str, set] = {}
+    for line in res.stdout.splitlines():
+        # "open tcp 22 192.168.0.10 1700000000"
+        parts = line.split()
+        if len(parts) >= 4 and parts[0] == "open" and parts[1] == "tcp":
+            open_ports.setdefault(parts[3], set()).add(int(parts[2]))
+    return {ip: sorted(ports) for ip, ports in open_ports.items()}
+
+
+def _nmap_profile(targets: List[str], port_args: List[str], results: Dict[str, Dict[str, Any]]):
+    """One -O -sV nmap run over `targets`; parsed hosts land in `results` by IP."""
+    # OS detection & version detection often require sudo/root
+    cmd = ["nmap", "-O", "-sV", *port_args, "-T4",
+           "--max-retries", "2", "--min-rate", "500", "-oX", "-", *targets]
+    for host in stream_nmap_hosts(cmd):
+        prof = parse_profile_host(host)
+        if prof["ip"]:
+            results[prof["ip"]] = prof
+
+
+def profile_hosts_batch(ips: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    -O -sV profile of all stale hosts; nmap parallelizes across targets itself.
+    With masscan, hosts that had open ports get a run over just those ports and the
+    rest a plain --top-ports run, so every host still gets OS detection.
+    """
+    if not ips:
+        return {}
+    top_ports = ["--top-ports", str(NMAP_TOP_PORTS)]
+    results: Dict[str, Dict[str, Any]] = {}
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", prefix="socpi_targets_") as f:
+        f.write("\n".join(ips) + "\n")
+        f.flush()
+
+        swept = fast_port_sweep(f.name) if USE_MASSCAN else None
+        if swept is None:
+            _nmap_profile(["-iL", f.name], top_ports, results)
+            return results
+
+    # hosts with something open: only the ports that are open on any of them
+    if swept:
+        ports = ",".join(str(p) for p in sorted({p for ps in swept.values() for p in ps}))
+        _nmap_profile(sorted(swept), ["-p", ports], results)
+    # the rest (phones, firewalled desktops) still get the plain pass so -O has something to go on
+    rest = [ip for ip in ips if ip not in swept]
+    if rest:
+        _nmap_profile(rest, top_ports, results)
+    return results
 
 
 # ----------------------
 # INVENTORY + SCANNER LOOP
 # ----------------------
+# Device identity: the MAC as a 48-bit int, or ("IP", ip) for hosts nmap saw without one
+DeviceKey = Union[int, Tuple[str, str]]
+
+
+def mac_to_int(mac: str) -> int:
+    return int(mac.replace(":", "").replace("-", ""), 16)
+
+
+def make_key(ip: str, mac: Optional[str]) -> DeviceKey:
+    return mac_to_int(mac) if mac else ("IP", ip)
+
+
+class Inventory:
+    """
+    Struct-of-arrays device table: one list per field, row i is one device.
+    Keyed by make_key() (MAC as int if present else ("IP", ip)); rows are never removed.
+    """
+    FIELDS = ("ip", "mac", "vendor", "hostname", "os", "type", "risk", "ports",
+              "vulns", "first_seen", "last_seen", "last_profile_epoch")
+
+    def __init__(self):
+        self.keys: List[DeviceKey] = []
+        self.idx: Dict[DeviceKey, int] = {}
+        self.cols: Dict[str, List[Any]] = {f: [] for f in self.FIELDS}
+        self._order: Optional[List[int]] = None  # rows sorted by IP; reset when an IP changes
+
+    def __contains__(self, key: DeviceKey) -> bool:
+        return key in self.idx
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def get(self, key: DeviceKey, field: str, default: Any = None) -> Any:
+        i = self.idx.get(key)
+        return default if i is None else self.cols[field][i]
+
+    def upsert(self, key: DeviceKey, **values: Any) -> bool:
+        """Write the given columns for `key`; returns True if the row is new."""
+        i = self.idx.get(key)
+        new = i is None
+        if new:
+            i = self.idx[key] = len(self.keys)
+            self.keys.append(key)
+            for col in self.cols.values():
+                col.append(None)
+        if "ip" in values and self.cols["ip"][i] != values["ip"]:
+            self._order = None
+        for f, v in values.items():
+            self.cols[f][i] = v
+        return new
+
+    def records(self) -> List[Dict[str, Any]]:
+        """Rows as dicts in IP order (the snapshot/API shape)."""
+        if self._order is None:
+            ips = self.cols["ip"]
+            self._order = sorted(range(len(ips)), key=lambda i: ips[i] or "")
+        cols = [self.cols[f] for f in self.FIELDS]
+        return [dict(zip(self.FIELDS, [c[i] for c in cols])) for i in self._order]
+
+
 inventory_lock = threading.Lock()
-device_inventory: Dict[str, Dict[str, Any]] = {}  # key: MAC if present else "IP:<ip>"
+inventory = Inventory()
 
 # Track "new device" alerts so we don't spam
-seen_keys: set = set()
+seen_keys: Set[DeviceKey] = set()
+
+# Serialized latest snapshot + its ETag, swapped in whole (one tuple) by the publisher;
+# /api/snapshot serves the bytes as-is.
+def _snapshot_entry(snapshot: Dict[str, Any]) -> Tuple[bytes, str]:
+    body = dumps(snapshot)
+    return body, hashlib.md5(body).hexdigest()
 
 
-def make_key(ip: str, mac: Optional[str]) -> str:
-    return mac.upper() if mac else f"IP:{ip}"
+SNAPSHOT_CACHE: Tuple[bytes, str] = _snapshot_entry(load_json(SNAPSHOT_FILE, {
+    "timestamp": "", "subnet": NETWORK_CIDR, "counts": {"seen": 0, "new": 0, "critical": 0}, "devices": []
+}))
+
+# Last 50 history records for /api/history; history.jsonl is only for persistence.
+HISTORY_RING: deque = deque(maxlen=50)
+for _line in tail_lines(HISTORY_FILE, HISTORY_RING.maxlen):
+    try:
+        HISTORY_RING.append(loads(_line))
+    except Exception:
+        pass
+# ...and the previous run's log tail (only what predates startup), ahead of anything logged since
+LOG_RING.extendleft(reversed(tail_lines(LOG_FILE, LOG_RING.maxlen - len(LOG_RING), end=LOG_START_SIZE)))
+
+
+# Discovery -> profiler handoff. _profile_pending holds IPs queued or being profiled
+# (guarded by inventory_lock) so a slow profile run isn't queued twice.
+profile_q: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+_profile_pending: set = set()
+snapshot_dirty = threading.Event()  # set by either worker; the publisher rebuilds the snapshot
+
+
+def resolve_vendors(profs: List[Dict[str, Any]], vendor_jobs: Optional[Dict[str, Any]] = None) -> Dict[str, str]:
+    """Concurrent get_vendor for every MAC still without a vendor; joins lookups already in flight."""
+    jobs = dict(vendor_jobs or {})
+    for prof in profs:
+        if prof["mac"] and is_unknown_vendor(prof["vendor"]) and prof["mac"] not in jobs:
+            jobs[prof["mac"]] = VENDOR_POOL.submit(get_vendor, prof["mac"])
+    return {
+        prof["mac"]: jobs[prof["mac"]].result()
+        for prof in profs
+        if prof["mac"] in jobs and is_unknown_vendor(prof["vendor"])
+    }
+
+
+def record_host(ip: str, prof: Dict[str, Any], vendor_final: str, now: datetime, profiled: bool):
+    """Score one merged host, upsert it into the inventory, and alert the first time we see it."""
+    mac_final = prof["mac"]
+
+    # identify device type & risk
+    port_nums = port_ids(prof["ports"])
+    dev_type = identify_device_type(vendor_final, prof["os"], port_nums, prof["hostname"])
+    risk = compute_risk(port_nums, prof["os"])
+
+    key = make_key(ip, mac_final)
+    stamp = now.strftime("%Y-%m-%d %H:%M:%S")
+
+    with inventory_lock:
+        inventory.upsert(
+            key,
+            ip=ip,
+            mac=mac_final,
+            # interned: one shared object per distinct value across the inventory
+            vendor=sys.intern(vendor_final),
+            hostname=prof["hostname"] or "",
+            os=sys.intern(prof["os"] or "Unknown"),
+            type=sys.intern(dev_type),
+            risk=sys.intern(risk),
+            ports=prof["ports"],
+            vulns=inventory.get(key, "vulns") or [],  # placeholder for future CVE integration
+            first_seen=inventory.get(key, "first_seen") or stamp,
+            last_seen=now.strftime("%H:%M:%S"),
+            # only a real profile resets the TTL clock
+            last_profile_epoch=time.time() if profiled else (inventory.get(key, "last_profile_epoch") or 0),
+        )
+
+    # Telegram alert on first time we ever see a key
+    if key not in seen_keys:
+        seen_keys.add(key)
+        if TELEGRAM["ENABLED"]:
+            msg = (
+                f"🛰️ NEW DEVICE DETECTED\n"
+                f"IP: {ip}\n"
+                f"MAC: {mac_final or 'N/A'}\n"
+                f"Vendor: {vendor_final}\n"
+                f"Type: {dev_type}\n"
+                f"OS: {prof['os']}\n"
+                f"Risk: {risk}\n"
+                f"Ports: {', '.join(prof['ports'][:10])}{'…' if len(prof['ports'])>10 else ''}"
+            )
+            send_telegram(msg)
+
+
+def build_snapshot(now: datetime) -> Dict[str, Any]:
+    """Inventory in IP order + counts; "new" = first seen within the last discovery interval."""
+    with inventory_lock:
+        devices_list = inventory.records()
+    since = (now - timedelta(seconds=SCAN_INTERVAL_SEC)).strftime("%Y-%m-%d %H:%M:%S")
+    return {
+        "timestamp": now.strftime("%Y-%m-%d %H:%M:%S"),
+        "subnet": NETWORK_CIDR,
+        "counts": {
+            "seen": len(devices_list),
+            "new": sum(1 for d in devices_list if (d["first_seen"] or "") >= since),
+            "critical": sum(1 for d in devices_list if d["risk"] == "CRITICAL"),
+        },
+        "devices": devices_list,
+    }
 
 
 def background_scanner():
+    """Discovery stage: every SCAN_INTERVAL_SEC, refresh known hosts and queue stale ones for profiling."""
     logging.info(f"Starting SOC Pi v10 scanner on {NETWORK_CIDR} (scan={SCAN_INTERVAL_SEC}s, profile_ttl={PROFILE_TTL_SEC}s)")
 
     last_report_date = None
@@ -523,136 +943,57 @@ def background_scanner():
 
         try:
             # 1) DISCOVERY
-            logging.info("Discovery scan (-sn)…")
-            rc, out, err = run_cmd(["nmap", "-sn", NETWORK_CIDR])
-            if rc != 0:
-                logging.warning(f"Discovery nmap returned code={rc}. stderr={err.strip()[:200]}")
-            discovered = parse_discovery_nmap(out)
-
-            # 2) PROFILE (deep) - only when new or stale
-            new_devices = 0
-            critical_devices = 0
-
-            for host in discovered:
-                ip = host["ip"]
-                disc_mac = host.get("mac")
-                disc_vendor = host.get("vendor") or "Unknown"
-                disc_hostname = host.get("hostname") or ""
+            logging.info("Discovery scan (ARP)…" if srp is not None else "Discovery scan (-sn)…")
+            discovered = discover_hosts()
 
-                key_guess = make_key(ip, disc_mac)
-                do_profile = True
-
-                with inventory_lock:
-                    existing = device_inventory.get(key_guess)
-                    if existing:
-                        # profile only if stale
-                        last_prof = existing.get("last_profile_epoch", 0)
-                        do_profile = (time.time() - last_prof) >= PROFILE_TTL_SEC
-
-                prof = {"mac": disc_mac, "vendor": disc_vendor, "os": "Unknown", "ports": [], "hostname": disc_hostname}
-
-                if do_profile:
-                    logging.info(f"Profiling {ip} (-O -sV top {NMAP_TOP_PORTS})…")
-                    # OS detection & version detection often require sudo/root
-                    cmd = ["nmap", "-O", "-sV", "--top-ports", str(NMAP_TOP_PORTS), "-T4", ip]
-                    # If user runs as sudo, this is already root; don't double "sudo" here.
-                    rc2, out2, err2 = run_cmd(cmd)
-                    if rc2 != 0:
-                        logging.warning(f"Profile nmap for {ip} returned code={rc2}. stderr={err2.strip()[:200]}")
-                    parsed = parse_profile_nmap(out2)
-
-                    # merge back: discovery can still be useful if profile fails
-                    prof["mac"] = parsed.get("mac") or disc_mac
-                    prof["vendor"] = parsed.get("vendor") or disc_vendor
-                    prof["os"] = parsed.get("os") or "Unknown"
-                    prof["ports"] = parsed.get("ports") or []
-                    prof["hostname"] = parsed.get("hostname") or disc_hostname
-                else:
-                    # keep prior profile details
-                    with inventory_lock:
-                        if existing:
-                            prof["os"] = existing.get("os", "Unknown")
-                            prof["ports"] = existing.get("ports", [])
-                            prof["hostname"] = existing.get("hostname", disc_hostname)
-
-                # vendor enrichment if unknown
-                vendor_final = prof["vendor"] or disc_vendor or "Unknown"
-                mac_final = prof["mac"]
-                if (vendor_final.strip().lower() in ("unknown", "unknown vendor", "")) and mac_final:
-                    vendor_final = get_vendor(mac_final)
-
-                # identify device type & risk
-                dev_type = identify_device_type(vendor_final, prof["os"], prof["ports"], prof["hostname"])
-                risk = compute_risk(prof["ports"], prof["os"])
-                if risk == "CRITICAL":
-                    critical_devices += 1
-
-                key = make_key(ip, mac_final)
-                first_seen = None
-
-                with inventory_lock:
-                    if key not in device_inventory:
-                        new_devices += 1
-                        first_seen = now.strftime("%Y-%m-%d %H:%M:%S")
-
-                    prev = device_inventory.get(key, {})
-                    device_inventory[key] = {
-                        "ip": ip,
-                        "mac": mac_final,
-                        "vendor": vendor_final,
-                        "hostname": prof["hostname"] or "",
-                        "os": prof["os"] or "Unknown",
-                        "type": dev_type,
-                        "risk": risk,
-                        "ports": prof["ports"],
-                        "vulns": prev.get("vulns", []),  # placeholder for future CVE integration
-                        "first_seen": prev.get("first_seen") or first_seen or now.strftime("%Y-%m-%d %H:%M:%S"),
-                        "last_seen": now.strftime("%H:%M:%S"),
-                        "last_profile_epoch": time.time(),
-                    }
-
-                # Telegram alert on first time we ever see a key
-                if key not in seen_keys:
-                    seen_keys.add(key)
-                    if TELEGRAM["ENABLED"]:
-                        msg = (
-                            f"🛰️ NEW DEVICE DETECTED\n"
-                            f"IP: {ip}\n"
-                            f"MAC: {mac_final or 'N/A'}\n"
-                            f"Vendor: {vendor_final}\n"
-                            f"Type: {dev_type}\n"
-                            f"OS: {prof['os']}\n"
-                            f"Risk: {risk}\n"
-                            f"Ports: {', '.join(prof['ports'][:10])}{'…' if len(prof['ports'])>10 else ''}"
-                        )
-                        send_telegram(msg)
-
-            # 3) SAVE SNAPSHOT (sorted)
+            # 2) PROFILE (deep) - only when new or stale: hand off to profile_worker
+            known: List[Tuple[str, Dict[str, Any]]] = []
+            stale: List[Dict[str, Any]] = []
             with inventory_lock:
-                devices_list = list(device_inventory.values())
-            devices_list.sort(key=lambda d: d.get("ip", ""))
-
-            snapshot = {
-                "timestamp": now.strftime("%Y-%m-%d %H:%M:%S"),
-                "subnet": NETWORK_CIDR,
-                "counts": {"seen": len(devices_list), "new": new_devices, "critical": critical_devices},
-                "devices": devices_list,
-            }
-            save_json(SNAPSHOT_FILE, snapshot)
-
-            # 4) HISTORY
+                for host in discovered:
+                    ip = host["ip"]
+                    if ip in _profile_pending:
+                        continue
+                    key = make_key(ip, host.get("mac"))
+                    last_prof = inventory.get(key, "last_profile_epoch")
+                    if last_prof is None or (time.time() - last_prof) >= PROFILE_TTL_SEC:
+                        _profile_pending.add(ip)
+                        stale.append(host)
+                    else:
+                        # keep prior profile details
+                        known.append((ip, {
+                            "mac": host.get("mac"),
+                            "vendor": host.get("vendor") or "Unknown",
+                            "os": inventory.get(key, "os") or "Unknown",
+                            "ports": inventory.get(key, "ports") or [],
+                            "hostname": inventory.get(key, "hostname") or host.get("hostname") or "",
+                        }))
+            for host in stale:
+                profile_q.put(host)
+
+            resolved = resolve_vendors([prof for _, prof in known])
+            for ip, prof in known:
+                record_host(ip, prof, resolved.get(prof["mac"]) or prof["vendor"] or "Unknown", now, profiled=False)
+            snapshot_dirty.set()
+
+            # 3) HISTORY
+            counts = build_snapshot(now)["counts"]
             HISTORY_FILE.parent.mkdir(parents=True, exist_ok=True)
-            with open(HISTORY_FILE, "a", encoding="utf-8") as f:
-                f.write(json.dumps({"seen": len(devices_list), "new": new_devices, "critical": critical_devices, "ts": now.isoformat()}) + "\n")
+            rec = {"seen": counts["seen"], "new": counts["new"], "critical": counts["critical"], "ts": now.isoformat()}
+            HISTORY_RING.append(rec)
+            with open(HISTORY_FILE, "ab") as f:
+                f.write(dumps(rec) + b"\n")
 
-            # 5) DAILY TELEGRAM REPORT (9:00 PM)
+            flush_vendor_cache()
+
+            # 4) DAILY TELEGRAM REPORT (9:00 PM)
             if TELEGRAM["ENABLED"] and now.hour == 0 and now.minute == 5:
                 if last_report_date != now.date():
                     report = (
                         f"🌅 9PM DAILY REPORT\n"
                         f"Subnet: {NETWORK_CIDR}\n"
-                        f"Devices Online: {len(devices_list)}\n"
-                        f"Critical Devices: {critical_devices}\n"
+                        f"Devices Online: {counts['seen']}\n"
+                        f"Critical Devices: {counts['critical']}\n"
                         f"System: OK"
                     )
                     send_telegram(report)
@@ -667,52 +1008,162 @@ def background_scanner():
         time.sleep(sleep_for)
 
 
+def profile_worker():
+    """Profile stage: drain profile_q in batches (PROFILE_BATCH_MAX hosts or PROFILE_BATCH_WAIT_SEC)."""
+    while True:
+        batch = [profile_q.get()]
+        deadline = time.time() + PROFILE_BATCH_WAIT_SEC
+        while len(batch) < PROFILE_BATCH_MAX:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(profile_q.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        try:
+            # vendor lookups for MACs already known from discovery run while the profile nmap is busy
+            vendor_jobs = {
+                h["mac"]: VENDOR_POOL.submit(get_vendor, h["mac"])
+                for h in batch if h.get("mac") and is_unknown_vendor(h.get("vendor"))
+            }
+
+            logging.info(f"Profiling {len(batch)} host(s) (-O -sV top {NMAP_TOP_PORTS})…")
+            profiles = profile_hosts_batch([h["ip"] for h in batch])
+
+            merged: List[Tuple[str, Dict[str, Any]]] = []
+            for host in batch:
+                parsed = profiles.get(host["ip"], {})
+                disc_vendor = host.get("vendor") or "Unknown"
+                disc_hostname = host.get("hostname") or ""
+                # merge back: discovery can still be useful if profile fails
+                merged.append((host["ip"], {
+                    "mac": parsed.get("mac") or host.get("mac"),
+                    "vendor": parsed.get("vendor") or disc_vendor,
+                    "os": parsed.get("os") or "Unknown",
+                    "ports": parsed.get("ports") or [],
+                    "hostname": parsed.get("hostname") or disc_hostname,
+                }))
+
+            resolved = resolve_vendors([prof for _, prof in merged], vendor_jobs)
+            now = datetime.now()
+            for ip, prof in merged:
+                record_host(ip, prof, resolved.get(prof["mac"]) or prof["vendor"] or "Unknown", now, profiled=True)
+            snapshot_dirty.set()
+        except Exception as e:
+            logging.error(f"Profile worker error: {e}")
+        finally:
+            with inventory_lock:
+                _profile_pending.difference_update(h["ip"] for h in batch)
+
+
+def snapshot_publisher():
+    """Rebuild SNAPSHOT_CACHE + the snapshot file whenever a worker changed the inventory."""
+    global SNAPSHOT_CACHE
+    while True:
+        snapshot_dirty.wait()
+        snapshot_dirty.clear()
+        try:
+            snapshot = build_snapshot(datetime.now())
+            SNAPSHOT_CACHE = _snapshot_entry(snapshot)  # single reference swap, no lock needed
+            save_json(SNAPSHOT_FILE, snapshot)
+        except Exception as e:
+            logging.error(f"Snapshot publish error: {e}")
+
+
+_scanner_lock = threading.Lock()
+_scanner_thread: Optional[threading.Thread] = None
+
+
+def start_scanner():
+    """Start the scanner pipeline once per process (script, waitress or gunicorn)."""
+    global _scanner_thread
+    with _scanner_lock:
+        if _scanner_thread is None:
+            threading.Thread(target=profile_worker, daemon=True).start()
+            threading.Thread(target=snapshot_publisher, daemon=True).start()
+            _scanner_thread = threading.Thread(target=background_scanner, daemon=True)
+            _scanner_thread.start()
+
+
+def run_server():
+    """Serve on waitress' thread pool when installed, else the threaded dev server."""
+    if serve is not None:
+        serve(app, host="0.0.0.0", port=APP_PORT, threads=WSGI_THREADS)
+    else:
+        app.run(host="0.0.0.0", port=APP_PORT, debug=False, threaded=True)
+
+
 # ----------------------
 # FLASK ROUTES
 # ----------------------
+@app.before_request
+def ensure_scanner():
+    # Under gunicorn the module is imported, never run as __main__.
+    if _scanner_thread is None:
+        start_scanner()
+
+
 @app.route("/")
 def home():
-    return render_template_string(HTML)
+    return Response(HTML_BYTES, mimetype="text/html")
 
 
 @app.route("/api/snapshot")
 def api_snapshot():
-    default = {"timestamp": "", "subnet": NETWORK_CIDR, "counts": {"seen": 0, "new": 0, "critical": 0}, "devices": []}
-    return jsonify(load_json(SNAPSHOT_FILE, default))
+    body, etag = SNAPSHOT_CACHE
+    return conditional_json(body, etag)
 
 
 @app.route("/api/history")
 def api_history():
-    recs: List[Dict[str, Any]] = []
-    if HISTORY_FILE.exists():
-        lines = HISTORY_FILE.read_text(encoding="utf-8").splitlines()[-50:]
-        for line in lines:
-            try:
-                recs.append(json.loads(line))
-            except Exception:
-                pass
-    return jsonify({"records": recs})
+    recs = list(HISTORY_RING)
+    # records are only ever appended, so the newest timestamp identifies the tail
+    etag = f"{len(recs)}-{recs[-1].get('ts', '')}" if recs else "empty"
+    if request.if_none_match.contains(etag):
+        return conditional_json(b"", etag)
+    return conditional_json(dumps({"records": recs}), etag)
 
 
 @app.route("/api/log_tail")
 def api_log_tail():
-    lines = LOG_FILE.read_text(encoding="utf-8").splitlines()[-30:] if LOG_FILE.exists() else []
-    return jsonify({"lines": lines})
+    return json_response({"lines": list(LOG_RING)[-30:]})
 
 
-@app.route("/api/sys_info")
-def api_sys_info():
-    temp = 0.0
+psutil.cpu_percent(interval=None)  # prime the delta so the first API read is meaningful
+
+try:
+    _THERMAL_FD: Optional[int] = os.open("/sys/class/thermal/thermal_zone0/temp", os.O_RDONLY)
+except OSError:
+    _THERMAL_FD = None
+
+_sys_cache: Dict[str, Any] = {}
+_sys_cache_ts = 0.0
+
+
+def read_temp() -> float:
+    """SoC temperature in °C via the fd opened at startup (pread: no open/close per poll)."""
+    if _THERMAL_FD is None:
+        return 0.0
     try:
-        with open("/sys/class/thermal/thermal_zone0/temp", "r", encoding="utf-8") as f:
-            temp = round(int(f.read().strip()) / 1000.0, 1)
+        return round(int(os.pread(_THERMAL_FD, 32, 0).strip()) / 1000.0, 1)
     except Exception:
-        pass
-    return jsonify({
-        "cpu": psutil.cpu_percent(interval=0.1),
-        "ram_perc": psutil.virtual_memory().percent,
-        "temp": temp
-    })
+        return 0.0
+
+
+@app.route("/api/sys_info")
+def api_sys_info():
+    global _sys_cache, _sys_cache_ts
+    now = time.time()
+    if now - _sys_cache_ts >= SYS_INFO_TTL_SEC:
+        _sys_cache = {
+            "cpu": psutil.cpu_percent(interval=None),  # since last call; never blocks the worker
+            "ram_perc": psutil.virtual_memory().percent,
+            "temp": read_temp(),
+        }
+        _sys_cache_ts = now
+    return json_response(_sys_cache)
 
 
 # ----------------------
@@ -725,8 +1176,7 @@ if __name__ == "__main__":
         print("   Recommended: sudo python3 dashboard.py")
 
     # Start background scanner
-    t = threading.Thread(target=background_scanner, daemon=True)
-    t.start()
+    start_scanner()
 
     # Start web app
-    app.run(host="0.0.0.0", port=APP_PORT, debug=False)
+    run_server()
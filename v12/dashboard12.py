@@ -11,6 +11,7 @@ Real-SOC dashboard (no real-time messaging yet):
 - Charts/history/log tail/sysinfo + CSV export
 """
 
+import atexit
 import csv
 import io
 import json
@@ -19,18 +20,38 @@ import os
 import re
 import socket
 import subprocess
+import tempfile
 import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from functools import lru_cache
 from logging.handlers import RotatingFileHandler
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
-from xml.etree import ElementTree as ET
+from typing import Any, Dict, FrozenSet, Iterator, List, Optional, Tuple
 
 import psutil
-import requests  # kept for vendor lookup (optional)
+import urllib3  # vendor lookup; ships with requests
 from flask import Flask, Response, jsonify, render_template_string
 
+try:
+    from lxml import etree as ET  # C parser with tag-filtered iterparse
+    HAVE_LXML = True
+except ImportError:
+    from xml.etree import ElementTree as ET
+    HAVE_LXML = False
+
+try:
+    from defusedxml.ElementTree import iterparse as std_iterparse  # rejects entity/DTD tricks
+except ImportError:
+    from xml.etree.ElementTree import iterparse as std_iterparse
+
+try:
+    import orjson  # fast C serializer; stdlib json is the fallback
+except ImportError:
+    orjson = None
+
 # ----------------------
 # CONFIGURATION
 # ----------------------
@@ -40,6 +61,9 @@ NETWORK_CIDR = os.getenv("SOCPI_CIDR", "192.168.0.0/24")
 SCAN_INTERVAL_SEC = int(os.getenv("SOCPI_SCAN_INTERVAL", "60"))
 PROFILE_TTL_SEC = int(os.getenv("SOCPI_PROFILE_TTL", "300"))
 NMAP_TOP_PORTS = int(os.getenv("SOCPI_TOP_PORTS", "50"))
+PROFILE_WORKERS = int(os.getenv("SOCPI_PROFILE_WORKERS", "8"))  # concurrent nmap profiles
+VENDOR_WORKERS = int(os.getenv("SOCPI_VENDOR_WORKERS", "10"))   # concurrent macvendors lookups
+DNS_WORKERS = int(os.getenv("SOCPI_DNS_WORKERS", "32"))         # concurrent PTR lookups after discovery
 
 OFFLINE_AFTER_SEC = int(os.getenv("SOCPI_OFFLINE_AFTER", "180"))
 
@@ -61,8 +85,8 @@ BT_ENABLED = os.getenv("SOCPI_BT_ENABLED", "true").lower() == "true"
 BT_SCAN_INTERVAL = int(os.getenv("SOCPI_BT_SCAN_INTERVAL", "30"))
 
 # Risky ports (tune as you like)
-RISKY_PORTS_CRITICAL = {"23", "2323", "3389", "5900", "445"}  # telnet, rdp, vnc, smb
-RISKY_PORTS_MEDIUM = {"22", "21", "8080", "8443", "3306", "5432"}  # ssh/ftp/admin/db
+RISKY_PORTS_CRITICAL = frozenset({"23", "2323", "3389", "5900", "445"})  # telnet, rdp, vnc, smb
+RISKY_PORTS_MEDIUM = frozenset({"22", "21", "8080", "8443", "3306", "5432"})  # ssh/ftp/admin/db
 
 # ----------------------
 # LOGGING & APP
@@ -70,13 +94,30 @@ RISKY_PORTS_MEDIUM = {"22", "21", "8080", "8443", "3306", "5432"}  # ssh/ftp/adm
 logger = logging.getLogger("socpi")
 logger.setLevel(logging.INFO)
 
-_rot = RotatingFileHandler(LOG_FILE, maxBytes=2_000_000, backupCount=3)
+class TailingRotatingHandler(RotatingFileHandler):
+    """RotatingFileHandler that also keeps the last formatted lines in memory for /api/log_tail."""
+    def __init__(self, *args: Any, tail_size: int = 200, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.tail: deque = deque(maxlen=tail_size)
+
+    def emit(self, record: logging.LogRecord):
+        super().emit(record)
+        try:
+            self.tail.append(self.format(record))
+        except Exception:
+            self.handleError(record)
+
+
+LOG_START_SIZE = LOG_FILE.stat().st_size if LOG_FILE.exists() else 0  # previous runs' part of the log
+_rot = TailingRotatingHandler(LOG_FILE, maxBytes=2_000_000, backupCount=3)
 _rot.setFormatter(logging.Formatter("[%(asctime)s] %(levelname)s: %(message)s"))
 logger.addHandler(_rot)
 logger.addHandler(logging.StreamHandler())
 
 app = Flask(__name__)
 
+HTTP = urllib3.PoolManager(num_pools=1, maxsize=VENDOR_WORKERS, retries=False)
+
 # ----------------------
 # STATE
 # ----------------------
@@ -279,6 +320,7 @@ HTML = r"""
 <script>
 let trendChart, vendorChart;
 let lastSnapshot = null;
+let shownDevices = [];  // rows reference devices by index instead of inlining their JSON
 
 function badgeForState(d){
   if(d.state === "OFFLINE") return '<span class="badge badge-warn">OFFLINE</span>';
@@ -339,11 +381,12 @@ function renderTable(devices) {
     return hay.includes(q) && riskOk;
   });
 
-  tbody.innerHTML = filtered.map(d => {
+  shownDevices = filtered;
+  tbody.innerHTML = filtered.map((d, i) => {
     const ports = (d.services || []).slice(0, 10).join(", ");
     const more = (d.services || []).length > 10 ? ` <span class="pill">+${(d.services||[]).length-10} more</span>` : "";
     return `
-      <tr class="${riskClass(d)}" onclick='openModal(${JSON.stringify(d).replace(/</g,"\\u003c")})'>
+      <tr class="${riskClass(d)}" onclick="openModal(shownDevices[${i}])">
         <td style="font-weight:700;">${d.ip || "N/A"}</td>
         <td>
           <div style="font-weight:700;">${d.display_name || d.ip || "Device"}</div>
@@ -362,7 +405,7 @@ function renderTable(devices) {
   }).join('');
 }
 
-function updateCharts(history, devices) {
+function updateCharts(history, devices, vendors) {
   const trendCtx = document.getElementById('trendChart').getContext('2d');
   if (trendChart) trendChart.destroy();
   trendChart = new Chart(trendCtx, {
@@ -374,7 +417,8 @@ function updateCharts(history, devices) {
     options: { plugins:{ legend:{ display:false } }, scales:{ y:{ beginAtZero:true } } }
   });
 
-  const vendorCounts = devices.reduce((acc, d) => {
+  // server tallies vendors once per scan; fall back to counting here for old snapshots
+  const vendorCounts = vendors || devices.reduce((acc, d) => {
     const v = d.vendor || "Unknown";
     acc[v] = (acc[v] || 0) + 1;
     return acc;
@@ -438,7 +482,7 @@ async function refreshSlow() {
       `Last Scan: ${snap.timestamp || "N/A"} | Subnet: ${snap.subnet || "N/A"} | scan=${status.scan_interval || "?"}s`;
 
     renderTable(snap.devices || []);
-    updateCharts(hist.records || [], snap.devices || []);
+    updateCharts(hist.records || [], snap.devices || [], snap.vendors);
   } catch (e) { console.error("Slow sync error:", e); }
 }
 
@@ -457,16 +501,51 @@ document.getElementById('risk-filter').addEventListener('change', refreshSlow);
 # ----------------------
 # UTIL: JSON + TIME
 # ----------------------
+def dumps(data: Any) -> bytes:
+    """Compact UTF-8 JSON; orjson when installed."""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+
+def loads(raw: Any) -> Any:
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+
 def load_json(path: Path, default: Any) -> Any:
     try:
-        return json.loads(path.read_text(encoding="utf-8"))
+        return loads(path.read_bytes())
     except Exception:
         return default
 
 
 def save_json(path: Path, data: Any):
     path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    if orjson is not None:
+        path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    else:
+        path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+
+
+def tail_lines(path: Path, n: int, approx_line_bytes: int = 256, end: Optional[int] = None) -> List[str]:
+    """Last n lines of a file (or of its first `end` bytes) without reading the whole thing."""
+    if n <= 0:
+        return []
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell() if end is None else min(end, f.tell())
+            window = max(n * approx_line_bytes, 4096)
+            while True:
+                start = max(0, size - window)
+                f.seek(start)
+                lines = f.read(size - start).decode("utf-8", "replace").splitlines()
+                # first line is likely partial unless we started at offset 0
+                if start == 0 or len(lines) > n:
+                    return lines[-n:] if start == 0 else lines[1:][-n:]
+                window *= 2
+    except OSError:
+        return []
 
 
 def now_ts() -> str:
@@ -476,6 +555,13 @@ def now_ts() -> str:
 # ----------------------
 # ALERTS / EVENTS
 # ----------------------
+# one append handle for the process lifetime instead of open() per event
+ALERTS_FILE.parent.mkdir(parents=True, exist_ok=True)
+alerts_fp = open(ALERTS_FILE, "ab", buffering=0)  # unbuffered: one write() per event
+alerts_lock = threading.Lock()
+atexit.register(alerts_fp.close)
+
+
 def emit_event(kind: str, severity: str, title: str, details: Optional[dict] = None):
     evt = {
         "ts": now_ts(),
@@ -485,19 +571,17 @@ def emit_event(kind: str, severity: str, title: str, details: Optional[dict] = N
         "details": details or {},
     }
     logger.info(f"EVENT {severity} {kind}: {title} | {evt['details']}")
-    ALERTS_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with open(ALERTS_FILE, "a", encoding="utf-8") as f:
-        f.write(json.dumps(evt) + "\n")
+    line = dumps(evt) + b"\n"
+    with alerts_lock:
+        alerts_fp.write(line)
 
 
 def tail_events(limit: int = 25) -> List[dict]:
-    if not ALERTS_FILE.exists():
-        return []
-    lines = ALERTS_FILE.read_text(encoding="utf-8").splitlines()[-limit:]
+    lines = tail_lines(ALERTS_FILE, limit)
     out = []
     for ln in reversed(lines):
         try:
-            out.append(json.loads(ln))
+            out.append(loads(ln))
         except Exception:
             pass
     return out
@@ -506,9 +590,22 @@ def tail_events(limit: int = 25) -> List[dict]:
 # ----------------------
 # ALIASES (friendly names / zones)
 # ----------------------
+_aliases_cache: Dict[str, dict] = {}
+_aliases_mtime: Optional[float] = None
+
+
 def load_aliases() -> Dict[str, dict]:
-    data = load_json(ALIASES_FILE, {})
-    return data if isinstance(data, dict) else {}
+    """Aliases from disk, re-parsed only when the file's mtime changes (edits apply without a restart)."""
+    global _aliases_cache, _aliases_mtime
+    try:
+        mtime = ALIASES_FILE.stat().st_mtime
+    except OSError:
+        mtime = None
+    if mtime != _aliases_mtime:
+        data = load_json(ALIASES_FILE, {}) if mtime is not None else {}
+        _aliases_cache = data if isinstance(data, dict) else {}
+        _aliases_mtime = mtime
+    return _aliases_cache
 
 
 def apply_alias(key: str, d: dict, aliases: Dict[str, dict]) -> dict:
@@ -527,37 +624,87 @@ def apply_alias(key: str, d: dict, aliases: Dict[str, dict]) -> dict:
 # ----------------------
 # VENDOR LOOKUP (cached; optional)
 # ----------------------
+VENDOR_CACHE: Dict[str, str] = load_json(VENDOR_CACHE_FILE, {})
+VENDOR_CACHE_LOCK = threading.Lock()
+VENDOR_DIRTY = False
+
+
+def flush_vendor_cache():
+    """Persist VENDOR_CACHE if lookups added entries since the last flush."""
+    global VENDOR_DIRTY
+    with VENDOR_CACHE_LOCK:
+        if not VENDOR_DIRTY:
+            return
+        data = dict(VENDOR_CACHE)
+        VENDOR_DIRTY = False
+    save_json(VENDOR_CACHE_FILE, data)
+
+
+atexit.register(flush_vendor_cache)
+
+
+def is_unknown_vendor(vendor: Optional[str]) -> bool:
+    return (vendor or "").strip().lower() in ("unknown", "unknown vendor", "")
+
+
 def get_vendor(mac: str) -> str:
+    global VENDOR_DIRTY
     if not mac:
         return "Unknown"
-    cache = load_json(VENDOR_CACHE_FILE, {})
     mac_prefix = mac[:8].upper()
-    if mac_prefix in cache:
-        return cache[mac_prefix]
+    with VENDOR_CACHE_LOCK:
+        if mac_prefix in VENDOR_CACHE:
+            return VENDOR_CACHE[mac_prefix]
 
     try:
-        r = requests.get(f"https://api.macvendors.com/{mac}", timeout=3)
-        if r.status_code == 200:
-            vendor = r.text.strip()
+        r = HTTP.request("GET", f"https://api.macvendors.com/{mac}", timeout=3.0)
+        if r.status == 200:
+            vendor = r.data.decode("utf-8", "replace").strip()
             if vendor:
-                cache[mac_prefix] = vendor
-                save_json(VENDOR_CACHE_FILE, cache)
+                with VENDOR_CACHE_LOCK:
+                    VENDOR_CACHE[mac_prefix] = vendor
+                    VENDOR_DIRTY = True
                 return vendor
     except Exception:
         pass
     return "Unknown"
 
 
+def resolve_vendors_bulk(macs: List[str]) -> Dict[str, str]:
+    """
+    Resolve many MACs at once: one lookup per distinct OUI prefix, run
+    concurrently over the shared keep-alive session. Returns mac -> vendor.
+    """
+    by_prefix: Dict[str, str] = {}
+    for mac in macs:
+        if mac:
+            by_prefix.setdefault(mac[:8].upper(), mac)
+    if not by_prefix:
+        return {}
+
+    workers = max(1, min(VENDOR_WORKERS, len(by_prefix)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        resolved = dict(zip(by_prefix, pool.map(get_vendor, by_prefix.values())))
+    return {mac: resolved[mac[:8].upper()] for mac in macs if mac}
+
+
 # ----------------------
 # DEVICE TYPE + RISK + FINDINGS
 # ----------------------
-def identify_device_type(vendor: str, os_guess: str, hostname: str, open_ports: List[str]) -> str:
+_PI_RE = re.compile(r"\bpi\b", re.I)
+_TV_RE = re.compile(r"SAMSUNG|LG|SONY|VIZIO|PANASONIC|HISENSE|TCL")  # matched against upper-cased vendor
+_MEDIA_PORTS = frozenset({"8008", "8009", "1900", "554", "2869"})
+_HTTP_ADMIN_PORTS = frozenset({"80", "8080", "8443"})
+
+
+# Inputs are all hashable (port sets are frozensets), and most devices look the same
+# scan after scan, so the classifiers are memoized instead of re-run per device.
+@lru_cache(maxsize=4096)
+def identify_device_type(vendor: str, os_guess: str, hostname: str, port_set: FrozenSet[str]) -> str:
     vendor_u = (vendor or "Unknown").upper()
     os_l = (os_guess or "Unknown").lower()
-    hn_l = (hostname or "").lower()
-    port_set = set(open_ports)
 
-    if "RASPBERRY" in vendor_u or re.search(r"\bpi\b", hn_l):
+    if "RASPBERRY" in vendor_u or _PI_RE.search(hostname or ""):
         return "Raspberry Pi"
     if "APPLE" in vendor_u:
         if "62078" in port_set:
@@ -565,10 +712,9 @@ def identify_device_type(vendor: str, os_guess: str, hostname: str, open_ports:
         if "darwin" in os_l or "mac os" in os_l or "macos" in os_l:
             return "Mac (iMac/MacBook)"
         return "Apple Device"
-    tv_vendors = ["SAMSUNG", "LG", "SONY", "VIZIO", "PANASONIC", "HISENSE", "TCL"]
-    if any(v in vendor_u for v in tv_vendors):
+    if _TV_RE.search(vendor_u):
         return "Smart TV"
-    if port_set.intersection({"8008", "8009", "1900", "554", "2869"}):
+    if not _MEDIA_PORTS.isdisjoint(port_set):
         return "Smart TV / Media Player"
     if "windows" in os_l:
         return "Windows Device"
@@ -579,63 +725,61 @@ def identify_device_type(vendor: str, os_guess: str, hostname: str, open_ports:
     return "Unknown Device"
 
 
-def compute_risk(open_ports: List[str], os_guess: str, state: str) -> str:
+@lru_cache(maxsize=4096)
+def compute_risk(port_set: FrozenSet[str], os_guess: str, state: str) -> str:
     if state == "OFFLINE":
         return "MEDIUM"
-    ps = set(open_ports)
-    if ps & RISKY_PORTS_CRITICAL:
+    if not RISKY_PORTS_CRITICAL.isdisjoint(port_set):
         return "CRITICAL"
-    if ps & RISKY_PORTS_MEDIUM:
+    if not RISKY_PORTS_MEDIUM.isdisjoint(port_set):
         return "MEDIUM"
     if (os_guess or "").strip().lower() in ("", "unknown"):
         return "MEDIUM"
     return "LOW"
 
 
-def build_findings_and_recs(open_ports: List[str], services: List[dict], os_guess: str) -> Tuple[List[str], List[str]]:
-    findings: List[str] = []
-    recs: List[str] = []
-    port_set = set(open_ports)
-
-    if "23" in port_set or "2323" in port_set:
-        findings.append("Telnet exposed (unencrypted remote access).")
-        recs.append("Disable Telnet; use SSH with keys and restrict by firewall.")
-    if "445" in port_set:
-        findings.append("SMB exposed (port 445).")
-        recs.append("Restrict SMB to trusted subnets; disable SMBv1; patch Windows/Samba.")
-    if "3389" in port_set:
-        findings.append("RDP exposed (port 3389).")
-        recs.append("Restrict RDP via firewall/VPN; enable NLA; enforce MFA if possible.")
-    if "5900" in port_set:
-        findings.append("VNC exposed (port 5900).")
-        recs.append("Restrict VNC to LAN/VPN; require strong auth; prefer SSH tunneling.")
-
-    if "22" in port_set:
-        findings.append("SSH exposed.")
-        recs.append("Use key-based auth, disable password auth, limit users, and rate-limit.")
-    if "21" in port_set:
-        findings.append("FTP exposed (often plaintext).")
-        recs.append("Prefer SFTP/FTPS; disable FTP if not required.")
-    if "3306" in port_set or "5432" in port_set:
-        findings.append("Database port exposed (MySQL/Postgres).")
-        recs.append("Bind DB to localhost or trusted subnet; require auth; firewall the port.")
-    if "80" in port_set or "8080" in port_set or "8443" in port_set:
-        findings.append("HTTP/admin web port exposed (possible management UI).")
-        recs.append("Disable unused admin UIs; enforce auth; patch; restrict access by IP/VLAN.")
+# (ports, finding, recommendation) - checked in order against each device's port set
+FINDING_RULES: Tuple[Tuple[FrozenSet[str], str, str], ...] = (
+    (frozenset({"23", "2323"}), "Telnet exposed (unencrypted remote access).",
+     "Disable Telnet; use SSH with keys and restrict by firewall."),
+    (frozenset({"445"}), "SMB exposed (port 445).",
+     "Restrict SMB to trusted subnets; disable SMBv1; patch Windows/Samba."),
+    (frozenset({"3389"}), "RDP exposed (port 3389).",
+     "Restrict RDP via firewall/VPN; enable NLA; enforce MFA if possible."),
+    (frozenset({"5900"}), "VNC exposed (port 5900).",
+     "Restrict VNC to LAN/VPN; require strong auth; prefer SSH tunneling."),
+    (frozenset({"22"}), "SSH exposed.",
+     "Use key-based auth, disable password auth, limit users, and rate-limit."),
+    (frozenset({"21"}), "FTP exposed (often plaintext).",
+     "Prefer SFTP/FTPS; disable FTP if not required."),
+    (frozenset({"3306", "5432"}), "Database port exposed (MySQL/Postgres).",
+     "Bind DB to localhost or trusted subnet; require auth; firewall the port."),
+    (_HTTP_ADMIN_PORTS, "HTTP/admin web port exposed (possible management UI).",
+     "Disable unused admin UIs; enforce auth; patch; restrict access by IP/VLAN."),
+)
+
+
+def build_findings_and_recs(port_set: FrozenSet[str], services: List[dict], os_guess: str) -> Tuple[List[str], List[str]]:
+    # insertion-ordered dicts dedupe as we go
+    findings: Dict[str, None] = {}
+    recs: Dict[str, None] = {}
+
+    for ports, finding, rec in FINDING_RULES:
+        if not ports.isdisjoint(port_set):
+            findings[finding] = None
+            recs[rec] = None
 
     if (os_guess or "").strip().lower() in ("", "unknown"):
-        findings.append("OS fingerprint is unknown (could be blocked or unusual).")
-        recs.append("Enable ICMP responses (if appropriate) and allow Nmap OS detection internally; verify device manually.")
+        findings["OS fingerprint is unknown (could be blocked or unusual)."] = None
+        recs["Enable ICMP responses (if appropriate) and allow Nmap OS detection internally; verify device manually."] = None
 
     for s in services:
         prod = (s.get("product") or "").strip()
         ver = (s.get("version") or "").strip()
         if prod and ver:
-            findings.append(f"Service detected: {prod} {ver} ({s.get('port')}/{s.get('proto')}).")
+            findings[f"Service detected: {prod} {ver} ({s.get('port')}/{s.get('proto')})."] = None
 
-    findings = list(dict.fromkeys(findings))
-    recs = list(dict.fromkeys(recs))
-    return findings, recs
+    return list(findings), list(recs)
 
 
 # ----------------------
@@ -656,16 +800,83 @@ def run_cmd(cmd: List[str], timeout: int = 120) -> Tuple[int, str, str]:
         return 1, "", str(e)
 
 
-def nmap_discovery_xml(cidr: str) -> List[dict]:
-    rc, out, err = run_cmd(["nmap", "-sn", "-oX", "-", cidr], timeout=180)
-    if rc != 0:
-        logger.warning(f"Discovery nmap error code={rc}: {err[:200]}")
-        return []
+def run_cmd_stream(cmd: List[str]) -> Tuple[subprocess.Popen, Any]:
+    """
+    Start cmd with stdout piped for incremental parsing. stderr is spooled to a
+    temp file so a chatty child can never stall on a full pipe.
+    """
+    err_fp = tempfile.TemporaryFile()
+    try:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=err_fp, bufsize=1 << 16)
+    except Exception:
+        err_fp.close()
+        raise
+    return proc, err_fp
+
+
+def iter_nmap_hosts(source: Any) -> Iterator[Any]:
+    """
+    Yield each <host> of nmap -oX output as soon as it is parsed, then free it,
+    so memory stays flat however many hosts the scan returns.
+    Hostnames come from the network, so entities/DTDs are never resolved and a
+    malformed section is skipped rather than aborting the whole host list.
+    """
+    if HAVE_LXML:
+        hosts = ET.iterparse(source, events=("end",), tag="host", resolve_entities=False, no_network=True,
+                             huge_tree=False, recover=True, collect_ids=False)
+        for _, host in hosts:
+            yield host
+            host.clear()
+            while host.getprevious() is not None:
+                del host.getparent()[0]
+    else:
+        for _, el in std_iterparse(source, events=("end",)):
+            if el.tag == "host":
+                yield el
+                el.clear()
+
+
+def stream_nmap_hosts(cmd: List[str], timeout: int) -> Iterator[Any]:
+    """
+    Run nmap and yield <host> elements while it is still scanning.
+    Raises TimeoutExpired / CalledProcessError once the output is consumed.
+    """
+    proc, err_fp = run_cmd_stream(cmd)
+    timed_out = threading.Event()
+
+    def _kill():
+        timed_out.set()
+        proc.kill()
+
+    killer = threading.Timer(timeout, _kill)
+    killer.daemon = True
+    killer.start()
+    try:
+        try:
+            yield from iter_nmap_hosts(proc.stdout)
+        except Exception:
+            if not timed_out.is_set():
+                raise
+        if timed_out.is_set():
+            raise subprocess.TimeoutExpired(cmd, timeout)
+        rc = proc.wait()
+        if rc != 0:
+            err_fp.seek(0)
+            err = err_fp.read().decode("utf-8", "replace")
+            raise subprocess.CalledProcessError(rc, cmd, stderr=err)
+    finally:
+        killer.cancel()
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        proc.stdout.close()
+        err_fp.close()
+
 
+def nmap_discovery_xml(cidr: str) -> List[dict]:
     hosts: List[dict] = []
     try:
-        root = ET.fromstring(out)
-        for h in root.findall("host"):
+        for h in stream_nmap_hosts(["nmap", "-sn", "-n", "-oX", "-", cidr], timeout=180):
             status = h.find("status")
             if status is None or status.attrib.get("state") != "up":
                 continue
@@ -689,19 +900,48 @@ def nmap_discovery_xml(cidr: str) -> List[dict]:
 
             if ip:
                 hosts.append({"ip": ip, "mac": mac, "vendor": vendor, "hostname": hostname})
+    except subprocess.TimeoutExpired:
+        logger.warning("Discovery nmap timed out")
+        return []
+    except subprocess.CalledProcessError as e:
+        logger.warning(f"Discovery nmap error code={e.returncode}: {e.stderr[:200]}")
+        return []
     except Exception as e:
         logger.error(f"Discovery XML parse failed: {e}")
         return []
+
+    # nmap runs with -n; PTR lookups happen here in parallel instead of one by one inside nmap
+    if hosts:
+        with ThreadPoolExecutor(max_workers=max(1, min(DNS_WORKERS, len(hosts)))) as pool:
+            for h, name in zip(hosts, pool.map(reverse_dns, [h["ip"] for h in hosts])):
+                h["hostname"] = h["hostname"] or name
     return hosts
 
 
+# Compiled once: lxml runs these in C rather than stepping through ElementPath per call.
+if HAVE_LXML:
+    _xp_hostname = ET.XPath("hostnames/hostname[1]/@name", smart_strings=False)
+    _xp_mac_addrs = ET.XPath("address[@addrtype='mac']")
+    _xp_osmatches = ET.XPath("os/osmatch")
+    _xp_open_ports = ET.XPath("ports/port[state/@state='open']")
+else:
+    def _xp_hostname(h: Any) -> List[str]:
+        hne = h.find("hostnames/hostname")
+        return [hne.attrib.get("name", "")] if hne is not None and "name" in hne.attrib else []
+
+    def _xp_mac_addrs(h: Any) -> List[Any]:
+        return h.findall("address[@addrtype='mac']")
+
+    def _xp_osmatches(h: Any) -> List[Any]:
+        return h.findall("os/osmatch")
+
+    def _xp_open_ports(h: Any) -> List[Any]:
+        return [p for p in h.findall("ports/port") if p.find("state[@state='open']") is not None]
+
+
 def nmap_profile_xml(ip: str) -> dict:
     cmd = ["nmap", "-O", "-sV", "--top-ports", str(NMAP_TOP_PORTS), "-T4", "-oX", "-", ip]
-    rc, out, err = run_cmd(cmd, timeout=240)
-    if rc != 0:
-        logger.warning(f"Profile nmap {ip} error code={rc}: {err[:200]}")
-        return {"mac": None, "vendor": "Unknown", "hostname": "", "os": "Unknown", "ports": [], "services": []}
-
+    empty = {"mac": None, "vendor": "Unknown", "hostname": "", "os": "Unknown", "ports": [], "services": []}
     mac = None
     vendor = "Unknown"
     hostname = ""
@@ -710,56 +950,50 @@ def nmap_profile_xml(ip: str) -> dict:
     services: List[dict] = []
 
     try:
-        root = ET.fromstring(out)
-        h0 = root.find("host")
-        if h0 is not None:
-            hn = h0.find("hostnames")
-            if hn is not None:
-                hne = hn.find("hostname")
-                if hne is not None:
-                    hostname = hne.attrib.get("name", "") or ""
-
-            for addr in h0.findall("address"):
-                if addr.attrib.get("addrtype") == "mac":
-                    mac = addr.attrib.get("addr")
-                    vendor = addr.attrib.get("vendor", vendor) or vendor
-
-            os_el = h0.find("os")
-            if os_el is not None:
-                best = None
-                best_acc = -1
-                for m in os_el.findall("osmatch"):
-                    acc = int(m.attrib.get("accuracy", "0"))
-                    if acc > best_acc:
-                        best_acc = acc
-                        best = m.attrib.get("name", "")
-                if best:
-                    os_guess = best
-
-            ports_el = h0.find("ports")
-            if ports_el is not None:
-                for p in ports_el.findall("port"):
-                    proto = p.attrib.get("protocol", "tcp")
-                    portid = p.attrib.get("portid", "")
-                    st = p.find("state")
-                    if st is None or st.attrib.get("state") != "open":
-                        continue
-                    open_ports.append(portid)
-
-                    svc = p.find("service")
-                    svc_name = (svc.attrib.get("name") if svc is not None else "") or ""
-                    product = (svc.attrib.get("product") if svc is not None else "") or ""
-                    version = (svc.attrib.get("version") if svc is not None else "") or ""
-                    extrainfo = (svc.attrib.get("extrainfo") if svc is not None else "") or ""
-
-                    services.append({
-                        "port": portid,
-                        "proto": proto,
-                        "name": svc_name,
-                        "product": product,
-                        "version": version,
-                        "extrainfo": extrainfo
-                    })
+        for h0 in stream_nmap_hosts(cmd, timeout=240):
+            names = _xp_hostname(h0)
+            if names:
+                hostname = names[0] or ""
+
+            for addr in _xp_mac_addrs(h0):
+                mac = addr.attrib.get("addr")
+                vendor = addr.attrib.get("vendor", vendor) or vendor
+
+            best = None
+            best_acc = -1
+            for m in _xp_osmatches(h0):
+                acc = int(m.attrib.get("accuracy", "0"))
+                if acc > best_acc:
+                    best_acc = acc
+                    best = m.attrib.get("name", "")
+            if best:
+                os_guess = best
+
+            for p in _xp_open_ports(h0):
+                proto = p.attrib.get("protocol", "tcp")
+                portid = p.attrib.get("portid", "")
+                open_ports.append(portid)
+
+                svc = p.find("service")
+                svc_name = (svc.attrib.get("name") if svc is not None else "") or ""
+                product = (svc.attrib.get("product") if svc is not None else "") or ""
+                version = (svc.attrib.get("version") if svc is not None else "") or ""
+                extrainfo = (svc.attrib.get("extrainfo") if svc is not None else "") or ""
+
+                services.append({
+                    "port": portid,
+                    "proto": proto,
+                    "name": svc_name,
+                    "product": product,
+                    "version": version,
+                    "extrainfo": extrainfo
+                })
+    except subprocess.TimeoutExpired:
+        logger.warning(f"Profile nmap {ip} timed out")
+        return empty
+    except subprocess.CalledProcessError as e:
+        logger.warning(f"Profile nmap {ip} error code={e.returncode}: {e.stderr[:200]}")
+        return empty
     except Exception as e:
         logger.error(f"Profile XML parse failed for {ip}: {e}")
 
@@ -773,6 +1007,25 @@ def nmap_profile_xml(ip: str) -> dict:
     }
 
 
+def profile_hosts(ips: List[str]) -> Dict[str, dict]:
+    """
+    Run nmap_profile_xml for several IPs at once. Each call is mostly waiting
+    on the nmap subprocess, so a small thread pool overlaps them well.
+    """
+    results: Dict[str, dict] = {}
+    ips = list(dict.fromkeys(ips))
+    if not ips:
+        return results
+
+    workers = max(1, min(PROFILE_WORKERS, len(ips)))
+    logger.info(f"Profiling {len(ips)} host(s) (XML, {workers} workers)…")
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(nmap_profile_xml, ip): ip for ip in ips}
+        for fut in as_completed(futures):
+            results[futures[fut]] = fut.result()
+    return results
+
+
 def reverse_dns(ip: str) -> str:
     try:
         name, _, _ = socket.gethostbyaddr(ip)
@@ -797,6 +1050,11 @@ def make_key(ip: str, mac: Optional[str]) -> str:
     return mac.upper() if mac else f"IP:{ip}"
 
 
+def discovery_fingerprint(host: dict) -> str:
+    """What nmap -sn reported about a host; a change means its cached profile may be stale."""
+    return f"{host.get('mac') or ''}|{host.get('hostname') or ''}|{host.get('vendor') or ''}"
+
+
 def service_strings(services: List[dict]) -> List[str]:
     out = []
     for s in services:
@@ -876,6 +1134,43 @@ def diff_and_emit_events(key: str, curr: dict, prev: Optional[dict]):
         )
 
 
+# ----------------------
+# SERVED PAYLOADS (serialized once per update, not per poll)
+# ----------------------
+EMPTY_SNAPSHOT = {"timestamp": "", "subnet": NETWORK_CIDR, "offline_after": OFFLINE_AFTER_SEC,
+                  "counts": {"seen": 0, "new": 0, "critical": 0}, "devices": []}
+
+SNAPSHOT_BYTES: bytes = dumps(load_json(SNAPSHOT_FILE, EMPTY_SNAPSHOT))
+
+# Last 50 history records for /api/history; history.jsonl is only for persistence.
+HISTORY_RING: deque = deque(maxlen=50)
+for _line in tail_lines(HISTORY_FILE, HISTORY_RING.maxlen):
+    try:
+        HISTORY_RING.append(loads(_line))
+    except Exception:
+        pass
+HISTORY_BYTES: bytes = dumps({"records": list(HISTORY_RING)})
+# ...and the previous run's log tail (only what predates startup), ahead of anything logged since
+_rot.tail.extendleft(reversed(tail_lines(LOG_FILE, _rot.tail.maxlen - len(_rot.tail), end=LOG_START_SIZE)))
+
+RADIO_BYTES: bytes = b""
+
+
+def publish_radio():
+    """Re-serialize /api/radio after a Wi-Fi or BT scan updated the shared state."""
+    global RADIO_BYTES
+    with radio_lock:
+        w = dict(wifi_state)
+        b = dict(bt_state)
+    RADIO_BYTES = dumps({
+        "wifi": {"enabled": WIFI_ENABLED, **w},
+        "bt": {"enabled": BT_ENABLED, **b}
+    })  # single reference swap, readers never see a partial payload
+
+
+publish_radio()
+
+
 # ----------------------
 # RADIO SENSORS (Wi-Fi / BT)
 # ----------------------
@@ -953,6 +1248,7 @@ def radio_thread():
                 with radio_lock:
                     wifi_state["ts"] = ts
                     wifi_state["aps"] = aps
+                publish_radio()
 
                 bssids = {a["bssid"] for a in aps}
                 new = sorted(bssids - prev_wifi_bssids)
@@ -967,6 +1263,7 @@ def radio_thread():
                 with radio_lock:
                     bt_state["ts"] = ts
                     bt_state["devices"] = devs
+                publish_radio()
 
                 macs = {d["mac"] for d in devs}
                 new = sorted(macs - prev_bt_macs)
@@ -985,17 +1282,23 @@ def radio_thread():
 # SCANNER LOOP
 # ----------------------
 def background_scanner():
+    global SNAPSHOT_BYTES, HISTORY_BYTES
     logger.info(
         f"Starting SOC Pi v11 scanner on {NETWORK_CIDR} "
         f"(scan={SCAN_INTERVAL_SEC}s, profile_ttl={PROFILE_TTL_SEC}s, offline_after={OFFLINE_AFTER_SEC}s)"
     )
 
     baseline = load_baseline()
-    aliases = load_aliases()
+
+    SNAPSHOT_FILE.parent.mkdir(parents=True, exist_ok=True)
+    HISTORY_FILE.parent.mkdir(parents=True, exist_ok=True)
+    hist_fp = open(HISTORY_FILE, "ab", buffering=0)
+    atexit.register(hist_fp.close)
 
     while True:
         start_ts = time.time()
         now = datetime.now()
+        aliases = load_aliases()  # one stat() unless device_aliases.json was edited
 
         # mark scanning start
         with scan_lock:
@@ -1012,6 +1315,33 @@ def background_scanner():
 
             # NOTE: do not force state here; OFFLINE detection happens later via last_seen_epoch
 
+            # decide who needs a fresh profile up front, then run those nmaps concurrently
+            # (within the TTL, a host is only re-profiled if what discovery saw about it changed;
+            # this is the cycle's only locked read, profile workers never touch the inventory)
+            to_profile: List[str] = []
+            known: Dict[str, Dict[str, Any]] = {}
+            with inventory_lock:
+                for host in discovered:
+                    k = make_key(host["ip"], host.get("mac"))
+                    existing = known[k] = device_inventory.get(k)
+                    if (not existing
+                            or (time.time() - existing.get("last_profile_epoch", 0.0)) >= PROFILE_TTL_SEC
+                            or existing.get("discovery_fingerprint") != discovery_fingerprint(host)):
+                        to_profile.append(host["ip"])
+                    else:
+                        logger.debug(f"Profile of {host['ip']} still fresh, skipping")
+            profiles = profile_hosts(to_profile)
+
+            # one concurrent vendor pass for every MAC nmap couldn't name
+            unknown_macs: List[str] = []
+            for host in discovered:
+                p = profiles.get(host["ip"]) or host
+                if p.get("mac") and is_unknown_vendor(p.get("vendor") or host.get("vendor")):
+                    unknown_macs.append(p["mac"])
+            vendors = resolve_vendors_bulk(unknown_macs)
+
+            updates: Dict[str, Dict[str, Any]] = {}
+
             for host in discovered:
                 ip = host["ip"]
                 disc_mac = host.get("mac")
@@ -1020,14 +1350,8 @@ def background_scanner():
 
                 key_guess = make_key(ip, disc_mac)
 
-                # decide whether to re-profile
-                existing = None
-                do_profile = True
-                with inventory_lock:
-                    existing = device_inventory.get(key_guess)
-                    if existing:
-                        last_prof = existing.get("last_profile_epoch", 0.0)
-                        do_profile = (time.time() - last_prof) >= PROFILE_TTL_SEC
+                existing = known.get(key_guess)
+                do_profile = ip in profiles
 
                 prof = {
                     "mac": disc_mac,
@@ -1039,8 +1363,7 @@ def background_scanner():
                 }
 
                 if do_profile:
-                    logger.info(f"Profiling {ip} (XML)…")
-                    prof.update(nmap_profile_xml(ip))
+                    prof.update(profiles[ip])
                 else:
                     # reuse previous profile data
                     if existing:
@@ -1049,29 +1372,28 @@ def background_scanner():
                         prof["services"] = existing.get("services_raw", [])
                         prof["hostname"] = existing.get("hostname", disc_hostname) or disc_hostname
 
-                # hostname enrichment
+                # hostname enrichment (discovery already did the PTR lookup)
                 if not prof.get("hostname"):
-                    rdns = reverse_dns(ip)
-                    if rdns:
-                        prof["hostname"] = rdns
+                    prof["hostname"] = disc_hostname
 
                 # vendor enrichment if unknown
                 vendor_final = prof.get("vendor") or disc_vendor or "Unknown"
                 mac_final = prof.get("mac")
-                if (vendor_final.strip().lower() in ("unknown", "unknown vendor", "")) and mac_final:
-                    vendor_final = get_vendor(mac_final)
+                if is_unknown_vendor(vendor_final) and mac_final:
+                    vendor_final = vendors.get(mac_final) or get_vendor(mac_final)
 
                 open_ports = prof.get("ports", []) or []
+                port_set = frozenset(open_ports)  # built once, shared by type/risk/findings
                 services_raw = prof.get("services", []) or []
                 services_str = service_strings(services_raw)
 
                 state = "ONLINE"
-                dev_type = identify_device_type(vendor_final, prof.get("os", "Unknown"), prof.get("hostname", ""), open_ports)
-                risk = compute_risk(open_ports, prof.get("os", "Unknown"), state)
+                dev_type = identify_device_type(vendor_final, prof.get("os", "Unknown"), prof.get("hostname", ""), port_set)
+                risk = compute_risk(port_set, prof.get("os", "Unknown"), state)
                 if risk == "CRITICAL":
                     critical_devices += 1
 
-                findings, recs = build_findings_and_recs(open_ports, services_raw, prof.get("os", "Unknown"))
+                findings, recs = build_findings_and_recs(port_set, services_raw, prof.get("os", "Unknown"))
 
                 key = make_key(ip, mac_final)
 
@@ -1099,13 +1421,12 @@ def background_scanner():
                     "first_seen": first_seen,
                     "last_seen": now.strftime("%H:%M:%S"),
                     "last_seen_epoch": time.time(),
+                    "discovery_fingerprint": discovery_fingerprint(host),
                     "last_profile_epoch": (time.time() if do_profile else (existing.get("last_profile_epoch", time.time()) if existing else time.time())),
                 }
 
                 device = apply_alias(key, device, aliases)
-
-                with inventory_lock:
-                    device_inventory[key] = device
+                updates[key] = device
 
                 diff_and_emit_events(key, device, baseline_prev)
 
@@ -1127,8 +1448,9 @@ def background_scanner():
                     "alias": device.get("alias", ""),
                 }
 
-            # OFFLINE detection
+            # publish this cycle's devices in one batch, then OFFLINE detection
             with inventory_lock:
+                device_inventory.update(updates)
                 for k, d in device_inventory.items():
                     last_epoch = d.get("last_seen_epoch", 0.0)
                     if (time.time() - last_epoch) >= OFFLINE_AFTER_SEC:
@@ -1147,14 +1469,21 @@ def background_scanner():
                                 baseline[k]["state"] = "OFFLINE"
 
             save_baseline(baseline)
+            flush_vendor_cache()
 
             with inventory_lock:
                 devices_list = list(device_inventory.values())
 
-            # enforce OFFLINE risk adjust
+            # enforce OFFLINE risk adjust, tallying the dashboard aggregates in the same pass
+            critical_now = 0
+            vendor_counts: Dict[str, int] = {}
             for d in devices_list:
                 if d.get("state") == "OFFLINE":
                     d["risk"] = "MEDIUM"
+                elif d.get("risk") == "CRITICAL":
+                    critical_now += 1
+                v = d.get("vendor") or "Unknown"
+                vendor_counts[v] = vendor_counts.get(v, 0) + 1
 
             devices_list.sort(key=lambda d: (d.get("state") == "OFFLINE", d.get("ip", "")))
 
@@ -1165,20 +1494,23 @@ def background_scanner():
                 "counts": {
                     "seen": len(devices_list),
                     "new": new_devices,
-                    "critical": sum(1 for d in devices_list if d.get("risk") == "CRITICAL" and d.get("state") != "OFFLINE"),
+                    "critical": critical_now,
                 },
+                "vendors": vendor_counts,
                 "devices": devices_list,
             }
-            save_json(SNAPSHOT_FILE, snapshot)
-
-            HISTORY_FILE.parent.mkdir(parents=True, exist_ok=True)
-            with open(HISTORY_FILE, "a", encoding="utf-8") as f:
-                f.write(json.dumps({
-                    "seen": snapshot["counts"]["seen"],
-                    "new": snapshot["counts"]["new"],
-                    "critical": snapshot["counts"]["critical"],
-                    "ts": now.isoformat()
-                }) + "\n")
+            SNAPSHOT_BYTES = dumps(snapshot)
+            SNAPSHOT_FILE.write_bytes(SNAPSHOT_BYTES)  # the bytes the API serves; no second, indented encode
+
+            rec = {
+                "seen": snapshot["counts"]["seen"],
+                "new": snapshot["counts"]["new"],
+                "critical": snapshot["counts"]["critical"],
+                "ts": now.isoformat()
+            }
+            hist_fp.write(dumps(rec) + b"\n")
+            HISTORY_RING.append(rec)
+            HISTORY_BYTES = dumps({"records": list(HISTORY_RING)})
 
         except Exception as e:
             last_err = str(e)[:200]
@@ -1204,22 +1536,12 @@ def home():
 
 @app.route("/api/snapshot")
 def api_snapshot():
-    default = {"timestamp": "", "subnet": NETWORK_CIDR, "offline_after": OFFLINE_AFTER_SEC,
-               "counts": {"seen": 0, "new": 0, "critical": 0}, "devices": []}
-    return jsonify(load_json(SNAPSHOT_FILE, default))
+    return Response(SNAPSHOT_BYTES, mimetype="application/json")
 
 
 @app.route("/api/history")
 def api_history():
-    recs: List[Dict[str, Any]] = []
-    if HISTORY_FILE.exists():
-        lines = HISTORY_FILE.read_text(encoding="utf-8").splitlines()[-50:]
-        for line in lines:
-            try:
-                recs.append(json.loads(line))
-            except Exception:
-                pass
-    return jsonify({"records": recs})
+    return Response(HISTORY_BYTES, mimetype="application/json")
 
 
 @app.route("/api/status")
@@ -1250,19 +1572,12 @@ def api_alerts():
 
 @app.route("/api/radio")
 def api_radio():
-    with radio_lock:
-        w = dict(wifi_state)
-        b = dict(bt_state)
-    return jsonify({
-        "wifi": {"enabled": WIFI_ENABLED, **w},
-        "bt": {"enabled": BT_ENABLED, **b}
-    })
+    return Response(RADIO_BYTES, mimetype="application/json")
 
 
 @app.route("/api/log_tail")
 def api_log_tail():
-    lines = LOG_FILE.read_text(encoding="utf-8").splitlines()[-30:] if LOG_FILE.exists() else []
-    return jsonify({"lines": lines})
+    return jsonify({"lines": list(_rot.tail)[-30:]})
 
 
 @app.route("/api/sys_info")
@@ -1282,7 +1597,7 @@ def api_sys_info():
 
 @app.route("/api/export.csv")
 def api_export_csv():
-    snap = load_json(SNAPSHOT_FILE, {"devices": []})
+    snap = loads(SNAPSHOT_BYTES)
     devices = snap.get("devices", [])
 
     output = io.StringIO()
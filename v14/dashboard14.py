@@ -11,26 +11,42 @@ Real-SOC dashboard (no real-time messaging yet):
 - Charts/history/log tail/sysinfo + CSV export
 """
 
+import atexit
 import csv
 import io
 import json
 import logging
+import mmap
 import os
 import re
 import socket
 import subprocess
+import tempfile
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
 from datetime import datetime
+from functools import lru_cache
 from logging.handlers import RotatingFileHandler
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
-from xml.etree import ElementTree as ET
 
 import psutil
 import requests  # kept for vendor lookup (optional)
 from flask import Flask, Response, jsonify, render_template_string
 
+try:
+    from lxml import etree as ET  # libxml2 parser; same Element API as the stdlib
+    HAVE_LXML = True
+except ImportError:
+    from xml.etree import ElementTree as ET
+    HAVE_LXML = False
+
+try:
+    import orjson  # fast C serializer; stdlib json is the fallback
+except ImportError:
+    orjson = None
+
 # ----------------------
 # CONFIGURATION
 # ----------------------
@@ -40,18 +56,27 @@ NETWORK_CIDR = os.getenv("SOCPI_CIDR", "192.168.0.0/24")
 SCAN_INTERVAL_SEC = int(os.getenv("SOCPI_SCAN_INTERVAL", "60"))
 PROFILE_TTL_SEC = int(os.getenv("SOCPI_PROFILE_TTL", "300"))
 NMAP_TOP_PORTS = int(os.getenv("SOCPI_TOP_PORTS", "50"))
+PROFILE_WORKERS = int(os.getenv("SOCPI_PROFILE_WORKERS", "8"))  # concurrent nmap profile batches
+DNS_WORKERS = int(os.getenv("SOCPI_DNS_WORKERS", "16"))  # concurrent PTR lookups per cycle
+RDNS_TTL_SEC = int(os.getenv("SOCPI_RDNS_TTL", "3600"))  # cached PTR answers (including misses)
+RDNS_TIMEOUT_SEC = float(os.getenv("SOCPI_RDNS_TIMEOUT", "2"))  # wall-clock budget for one cycle's lookups
 
 OFFLINE_AFTER_SEC = int(os.getenv("SOCPI_OFFLINE_AFTER", "180"))
 
 SNAPSHOT_FILE = Path(os.getenv("SOCPI_SNAPSHOT_FILE", "scan_snapshot.json"))
 HISTORY_FILE = Path(os.getenv("SOCPI_HISTORY_FILE", "history.jsonl"))
+HISTORY_FLUSH_EVERY = int(os.getenv("SOCPI_HISTORY_FLUSH_EVERY", "10"))  # history records buffered between flushes
 LOG_FILE = Path(os.getenv("SOCPI_LOG_FILE", "network_monitor.log"))
 VENDOR_CACHE_FILE = Path(os.getenv("SOCPI_VENDOR_CACHE", "vendor_cache.json"))
 
 BASELINE_FILE = Path(os.getenv("SOCPI_BASELINE_FILE", "baseline.json"))
+BASELINE_REFRESH_SEC = int(os.getenv("SOCPI_BASELINE_REFRESH", "600"))  # max age of on-disk last_seen when nothing else changed
 ALERTS_FILE = Path(os.getenv("SOCPI_ALERTS_FILE", "alerts.jsonl"))
 ALIASES_FILE = Path(os.getenv("SOCPI_ALIASES_FILE", "device_aliases.json"))
 
+THERMAL_FILE = Path("/sys/class/thermal/thermal_zone0/temp")
+SYSINFO_TTL_SEC = float(os.getenv("SOCPI_SYSINFO_TTL", "2"))  # dashboard polls inside this window share one reading
+
 # Optional Radio Sensors (DEFAULT ON per your request)
 WIFI_ENABLED = os.getenv("SOCPI_WIFI_ENABLED", "true").lower() == "true"
 WIFI_IFACE = os.getenv("SOCPI_WIFI_IFACE", "wlan0")
@@ -64,8 +89,8 @@ BT_SCAN_INTERVAL = int(os.getenv("SOCPI_BT_SCAN_INTERVAL", "30"))
 WIFI_CLOSE_DBM = float(os.getenv("SOCPI_WIFI_CLOSE_DBM", "-40"))  # "very close" AP threshold
 
 # Risky ports (tune as you like)
-RISKY_PORTS_CRITICAL = {"23", "2323", "3389", "5900", "445"}  # telnet, rdp, vnc, smb
-RISKY_PORTS_MEDIUM = {"22", "21", "8080", "8443", "3306", "5432"}  # ssh/ftp/admin/db
+RISKY_PORTS_CRITICAL = frozenset({23, 2323, 3389, 5900, 445})  # telnet, rdp, vnc, smb
+RISKY_PORTS_MEDIUM = frozenset({22, 21, 8080, 8443, 3306, 5432})  # ssh/ftp/admin/db
 
 # ----------------------
 # LOGGING & APP
@@ -86,16 +111,29 @@ app = Flask(__name__)
 inventory_lock = threading.Lock()
 device_inventory: Dict[str, Dict[str, Any]] = {}  # key: MAC if present else "IP:<ip>"
 
-radio_lock = threading.Lock()
+# Each of these has a single writer thread that replaces the whole dict (never mutates it),
+# so HTTP readers just take the current reference: no lock, no copy.
 wifi_state: Dict[str, Any] = {"ts": "", "aps": []}
 bt_state: Dict[str, Any] = {"ts": "", "devices": []}
 
-scan_lock = threading.Lock()
 scan_status: Dict[str, Any] = {"state": "IDLE", "last_start": "", "last_end": "", "last_err": ""}
 
+# Latest snapshot, served from memory; SNAPSHOT_FILE is only rewritten when devices change
+snapshot_state: Optional[Dict[str, Any]] = None
+
+# (taken_at_epoch, payload) for /api/sys_info, swapped as one tuple
+sysinfo_cache: Tuple[float, Dict[str, Any]] = (0.0, {})
+
 # Manual scan trigger
 scan_requested = threading.Event()
 
+# History appends share one buffered handle; flushed every HISTORY_FLUSH_EVERY records or when read
+HISTORY_FILE.parent.mkdir(parents=True, exist_ok=True)
+history_fh = open(HISTORY_FILE, "ab", buffering=8192)
+history_lock = threading.Lock()
+history_pending = 0
+atexit.register(history_fh.close)
+
 # ----------------------
 # UI (Dashboard)
 # ----------------------
@@ -777,16 +815,47 @@ document.getElementById('risk-filter').addEventListener('change', refreshSlow);
 # ----------------------
 # UTIL: JSON + TIME
 # ----------------------
+def dumps(data: Any) -> bytes:
+    """Compact UTF-8 JSON; orjson when installed."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+
+def loads(raw: Any) -> Any:
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+
 def load_json(path: Path, default: Any) -> Any:
     try:
-        return json.loads(path.read_text(encoding="utf-8"))
+        return loads(path.read_bytes())
     except Exception:
         return default
 
 
 def save_json(path: Path, data: Any):
     path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    if orjson is not None:
+        path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    else:
+        path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+
+
+def tail_lines(path: Path, n: int) -> List[str]:
+    """Last n lines of a file, found by scanning a read-only mmap backwards for newlines."""
+    try:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            end = len(mm)
+            if end and mm[end - 1] == 0x0A:  # ignore the trailing newline
+                end -= 1
+            pos = end
+            for _ in range(n):
+                pos = mm.rfind(b"\n", 0, pos)
+                if pos < 0:
+                    break
+            return mm[pos + 1:end].decode("utf-8", "replace").splitlines()
+    except (OSError, ValueError):  # ValueError: empty files cannot be mapped
+        return []
 
 
 def now_ts() -> str:
@@ -822,8 +891,8 @@ def emit_event(kind: str, severity: str, title: str, details: Optional[dict] = N
     }
     logger.info(f"EVENT {severity} {kind}: {title} | {evt['details']}")
     ALERTS_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with open(ALERTS_FILE, "a", encoding="utf-8") as f:
-        f.write(json.dumps(evt) + "\n")
+    with open(ALERTS_FILE, "ab") as f:
+        f.write(dumps(evt) + b"\n")
 
 
 def tail_events(limit: int = 25) -> List[dict]:
@@ -833,7 +902,7 @@ def tail_events(limit: int = 25) -> List[dict]:
     out = []
     for ln in reversed(lines):
         try:
-            out.append(json.loads(ln))
+            out.append(loads(ln))
         except Exception:
             pass
     return out
@@ -887,7 +956,7 @@ def get_vendor(mac: str) -> str:
 # ----------------------
 # DEVICE TYPE + RISK + FINDINGS
 # ----------------------
-def identify_device_type(vendor: str, os_guess: str, hostname: str, open_ports: List[str]) -> str:
+def identify_device_type(vendor: str, os_guess: str, hostname: str, open_ports: List[int]) -> str:
     vendor_u = (vendor or "Unknown").upper()
     os_l = (os_guess or "Unknown").lower()
     hn_l = (hostname or "").lower()
@@ -896,7 +965,7 @@ def identify_device_type(vendor: str, os_guess: str, hostname: str, open_ports:
     if "RASPBERRY" in vendor_u or re.search(r"\bpi\b", hn_l):
         return "Raspberry Pi"
     if "APPLE" in vendor_u:
-        if "62078" in port_set:
+        if 62078 in port_set:
             return "iPhone/iPad (Locked)"
         if "darwin" in os_l or "mac os" in os_l or "macos" in os_l:
             return "Mac (iMac/MacBook)"
@@ -904,18 +973,18 @@ def identify_device_type(vendor: str, os_guess: str, hostname: str, open_ports:
     tv_vendors = ["SAMSUNG", "LG", "SONY", "VIZIO", "PANASONIC", "HISENSE", "TCL"]
     if any(v in vendor_u for v in tv_vendors):
         return "Smart TV"
-    if port_set.intersection({"8008", "8009", "1900", "554", "2869"}):
+    if port_set.intersection({8008, 8009, 1900, 554, 2869}):
         return "Smart TV / Media Player"
     if "windows" in os_l:
         return "Windows Device"
     if "linux" in os_l:
-        if "22" in port_set:
+        if 22 in port_set:
             return "Linux Server / SBC"
         return "Linux Device"
     return "Unknown Device"
 
 
-def compute_risk(open_ports: List[str], os_guess: str, state: str) -> str:
+def compute_risk(open_ports: List[int], os_guess: str, state: str) -> str:
     if state == "OFFLINE":
         return "MEDIUM"
     ps = set(open_ports)
@@ -928,34 +997,46 @@ def compute_risk(open_ports: List[str], os_guess: str, state: str) -> str:
     return "LOW"
 
 
-def build_findings_and_recs(open_ports: List[str], services: List[dict], os_guess: str) -> Tuple[List[str], List[str]]:
+# Unchanged devices feed the classifiers identical inputs every cycle; ports go in as a tuple
+# so the whole call is hashable and repeats are a cache hit.
+@lru_cache(maxsize=2048)
+def identify_device_type_cached(vendor: str, os_guess: str, hostname: str, ports: Tuple[int, ...]) -> str:
+    return identify_device_type(vendor, os_guess, hostname, list(ports))
+
+
+@lru_cache(maxsize=2048)
+def compute_risk_cached(ports: Tuple[int, ...], os_guess: str, state: str) -> str:
+    return compute_risk(list(ports), os_guess, state)
+
+
+def build_findings_and_recs(open_ports: List[int], services: List[dict], os_guess: str) -> Tuple[List[str], List[str]]:
     findings: List[str] = []
     recs: List[str] = []
     port_set = set(open_ports)
 
-    if "23" in port_set or "2323" in port_set:
+    if 23 in port_set or 2323 in port_set:
         findings.append("Telnet exposed (unencrypted remote access).")
         recs.append("Disable Telnet; use SSH with keys and restrict by firewall.")
-    if "445" in port_set:
+    if 445 in port_set:
         findings.append("SMB exposed (port 445).")
         recs.append("Restrict SMB to trusted subnets; disable SMBv1; patch Windows/Samba.")
-    if "3389" in port_set:
+    if 3389 in port_set:
         findings.append("RDP exposed (port 3389).")
         recs.append("Restrict RDP via firewall/VPN; enable NLA; enforce MFA if possible.")
-    if "5900" in port_set:
+    if 5900 in port_set:
         findings.append("VNC exposed (port 5900).")
         recs.append("Restrict VNC to LAN/VPN; require strong auth; prefer SSH tunneling.")
 
-    if "22" in port_set:
+    if 22 in port_set:
         findings.append("SSH exposed.")
         recs.append("Use key-based auth, disable password auth, limit users, and rate-limit.")
-    if "21" in port_set:
+    if 21 in port_set:
         findings.append("FTP exposed (often plaintext).")
         recs.append("Prefer SFTP/FTPS; disable FTP if not required.")
-    if "3306" in port_set or "5432" in port_set:
+    if 3306 in port_set or 5432 in port_set:
         findings.append("Database port exposed (MySQL/Postgres).")
         recs.append("Bind DB to localhost or trusted subnet; require auth; firewall the port.")
-    if "80" in port_set or "8080" in port_set or "8443" in port_set:
+    if 80 in port_set or 8080 in port_set or 8443 in port_set:
         findings.append("HTTP/admin web port exposed (possible management UI).")
         recs.append("Disable unused admin UIs; enforce auth; patch; restrict access by IP/VLAN.")
 
@@ -1000,7 +1081,7 @@ def nmap_discovery_xml(cidr: str) -> List[dict]:
 
     hosts: List[dict] = []
     try:
-        root = ET.fromstring(out)
+        root = ET.fromstring(out.encode("utf-8"))  # lxml refuses str input carrying an encoding declaration
         for h in root.findall("host"):
             status = h.find("status")
             if status is None or status.attrib.get("state") != "up":
@@ -1031,64 +1112,110 @@ def nmap_discovery_xml(cidr: str) -> List[dict]:
     return hosts
 
 
-def nmap_profile_xml(ip: str) -> dict:
-    cmd = ["nmap", "-O", "-sV", "--top-ports", str(NMAP_TOP_PORTS), "-T4", "-oX", "-", ip]
-    rc, out, err = run_cmd(cmd, timeout=240)
-    if rc != 0:
-        logger.warning(f"Profile nmap {ip} error code={rc}: {err[:200]}")
-        return {"mac": None, "vendor": "Unknown", "hostname": "", "os": "Unknown", "ports": [], "services": []}
+def free_element(el: Any):
+    """Release a parsed element; with lxml also drop the already-processed siblings before it."""
+    el.clear()
+    if HAVE_LXML:
+        while el.getprevious() is not None:
+            del el.getparent()[0]
 
-    mac = None
-    vendor = "Unknown"
-    hostname = ""
-    os_guess = "Unknown"
-    open_ports: List[str] = []
-    services: List[dict] = []
 
-    try:
-        root = ET.fromstring(out)
-        h0 = root.find("host")
-        if h0 is not None:
-            hn = h0.find("hostnames")
-            if hn is not None:
-                hne = hn.find("hostname")
-                if hne is not None:
-                    hostname = hne.attrib.get("name", "") or ""
+# Elements the profile parser reads; with lxml nothing else is handed back to Python at all.
+PROFILE_TAGS = ("host", "hostname", "address", "osmatch", "port")
+# Subtrees the stdlib fallback skips wholesale (traceroute hops, NSE output, OS fingerprint detail).
+SKIP_SUBTREES = frozenset({"trace", "hostscript", "script", "portused", "osfingerprint"})
 
-            for addr in h0.findall("address"):
-                if addr.attrib.get("addrtype") == "mac":
-                    mac = addr.attrib.get("addr")
-                    vendor = addr.attrib.get("vendor", vendor) or vendor
 
-            os_el = h0.find("os")
-            if os_el is not None:
-                best = None
-                best_acc = -1
-                for m in os_el.findall("osmatch"):
-                    acc = int(m.attrib.get("accuracy", "0"))
-                    if acc > best_acc:
-                        best_acc = acc
-                        best = m.attrib.get("name", "")
-                if best:
-                    os_guess = best
-
-            ports_el = h0.find("ports")
-            if ports_el is not None:
-                for p in ports_el.findall("port"):
-                    proto = p.attrib.get("protocol", "tcp")
-                    portid = p.attrib.get("portid", "")
-                    st = p.find("state")
-                    if st is None or st.attrib.get("state") != "open":
-                        continue
-                    open_ports.append(portid)
+def empty_profile() -> dict:
+    return {"mac": None, "vendor": "Unknown", "hostname": "", "os": "Unknown", "ports": [], "services": []}
+
+
+def nmap_profile_batch(ips: List[str]) -> Dict[str, dict]:
+    """
+    Profile many hosts with a single nmap run (-iL target file) and demux the XML by host.
+    Returns {ip: profile}; hosts nmap didn't report are simply absent.
+    """
+    results: Dict[str, dict] = {}
+    if not ips:
+        return results
 
-                    svc = p.find("service")
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", prefix="socpi-targets-", delete=False) as tf:
+        tf.write("\n".join(ips) + "\n")
+        targets = tf.name
+    try:
+        cmd = ["nmap", "-O", "-sV", "--top-ports", str(NMAP_TOP_PORTS), "-T4", "-iL", targets, "-oX", "-"]
+        rc, out, err = run_cmd(cmd, timeout=240 + 30 * len(ips))
+    finally:
+        try:
+            os.unlink(targets)
+        except OSError:
+            pass
+    if rc != 0:
+        logger.warning(f"Profile nmap ({len(ips)} hosts) error code={rc}: {err[:200]}")
+        return results
+
+    prof: Optional[dict] = None
+    host_ip = ""
+    best_acc = -1
+    skipping = 0  # depth inside SKIP_SUBTREES (stdlib only; lxml never reports those tags)
+    try:
+        # stream the document: handle each element as it closes and free the bulky ones
+        src = io.BytesIO(out.encode("utf-8"))
+        events = (
+            ET.iterparse(src, events=("start", "end"), tag=PROFILE_TAGS, remove_blank_text=True)
+            if HAVE_LXML
+            else ET.iterparse(src, events=("start", "end"))
+        )
+        for ev, el in events:
+            tag = el.tag
+            if tag in SKIP_SUBTREES:
+                if ev == "start":
+                    skipping += 1
+                else:
+                    skipping -= 1
+                    el.clear()
+                continue
+            if skipping:
+                continue
+            if ev == "start":
+                if tag == "host":
+                    prof = empty_profile()
+                    host_ip = ""
+                    best_acc = -1
+                continue
+            if prof is None:
+                continue  # e.g. <hosthint> blocks outside any <host>
+
+            if tag == "hostname":
+                if not prof["hostname"]:
+                    prof["hostname"] = el.attrib.get("name", "") or ""
+            elif tag == "address":
+                addrtype = el.attrib.get("addrtype")
+                if addrtype == "ipv4":
+                    host_ip = el.attrib.get("addr", "")
+                elif addrtype == "mac":
+                    prof["mac"] = el.attrib.get("addr")
+                    prof["vendor"] = el.attrib.get("vendor", prof["vendor"]) or prof["vendor"]
+            elif tag == "osmatch":
+                acc = int(el.attrib.get("accuracy", "0"))
+                if acc > best_acc:
+                    best_acc = acc
+                    prof["os"] = el.attrib.get("name", "") or prof["os"]
+                free_element(el)
+            elif tag == "port":
+                st = el.find("state")
+                if st is not None and st.attrib.get("state") == "open":
+                    proto = el.attrib.get("protocol", "tcp")
+                    portid = int(el.attrib.get("portid", "0"))
+                    prof["ports"].append(portid)
+
+                    svc = el.find("service")
                     svc_name = (svc.attrib.get("name") if svc is not None else "") or ""
                     product = (svc.attrib.get("product") if svc is not None else "") or ""
                     version = (svc.attrib.get("version") if svc is not None else "") or ""
                     extrainfo = (svc.attrib.get("extrainfo") if svc is not None else "") or ""
 
-                    services.append(
+                    prof["services"].append(
                         {
                             "port": portid,
                             "proto": proto,
@@ -1098,17 +1225,33 @@ def nmap_profile_xml(ip: str) -> dict:
                             "extrainfo": extrainfo,
                         }
                     )
+                free_element(el)
+            elif tag == "host":
+                if host_ip:
+                    results[host_ip] = prof
+                prof = None
+                free_element(el)
     except Exception as e:
-        logger.error(f"Profile XML parse failed for {ip}: {e}")
-
-    return {
-        "mac": mac,
-        "vendor": vendor,
-        "hostname": hostname,
-        "os": os_guess or "Unknown",
-        "ports": open_ports,
-        "services": services,
-    }
+        logger.error(f"Profile XML parse failed ({len(ips)} hosts): {e}")
+
+    return results
+
+
+def profile_hosts(ips: List[str]) -> Dict[str, dict]:
+    """
+    Split the targets round-robin into up to PROFILE_WORKERS batches and run those
+    nmap batches concurrently; each thread just waits on its subprocess.
+    """
+    results: Dict[str, dict] = {}
+    if not ips:
+        return results
+    n = max(1, min(PROFILE_WORKERS, len(ips)))
+    batches = [ips[i::n] for i in range(n)]
+    with ThreadPoolExecutor(max_workers=n) as ex:
+        futures = [ex.submit(nmap_profile_batch, b) for b in batches]
+        for f in as_completed(futures):
+            results.update(f.result())
+    return results
 
 
 def reverse_dns(ip: str) -> str:
@@ -1119,35 +1262,125 @@ def reverse_dns(ip: str) -> str:
         return ""
 
 
+# ip -> (resolved_at_epoch, name); only touched from the scanner thread
+rdns_cache: Dict[str, Tuple[float, str]] = {}
+
+
+def resolve_hostnames(ips: List[str]) -> Dict[str, str]:
+    """
+    PTR names for ips, served from rdns_cache when fresh. Misses are looked up concurrently
+    and the whole batch gets RDNS_TIMEOUT_SEC; lookups still pending then are left to finish
+    in the background and simply retried next cycle.
+    """
+    now = time.time()
+    out: Dict[str, str] = {}
+    missing: List[str] = []
+    for ip in ips:
+        hit = rdns_cache.get(ip)
+        if hit and now - hit[0] < RDNS_TTL_SEC:
+            out[ip] = hit[1]
+        else:
+            missing.append(ip)
+    if not missing:
+        return out
+
+    pool = ThreadPoolExecutor(max_workers=max(1, min(DNS_WORKERS, len(missing))))
+    futures = {pool.submit(reverse_dns, ip): ip for ip in missing}
+    done, _ = wait(futures, timeout=RDNS_TIMEOUT_SEC)
+    pool.shutdown(wait=False, cancel_futures=True)
+    for f in done:
+        ip = futures[f]
+        out[ip] = f.result()
+        rdns_cache[ip] = (now, out[ip])
+    return out
+
+
 # ----------------------
 # BASELINE + DIFF
 # ----------------------
 def load_baseline() -> Dict[str, dict]:
     data = load_json(BASELINE_FILE, {})
-    return data if isinstance(data, dict) else {}
+    if not isinstance(data, dict):
+        return {}
+    # older baselines stored port numbers as strings
+    for entry in data.values():
+        if isinstance(entry, dict) and entry.get("ports"):
+            entry["ports"] = sorted(int(p) for p in entry["ports"])
+    return data
 
 
 def save_baseline(b: Dict[str, dict]):
     save_json(BASELINE_FILE, b)
 
 
+# refreshed every cycle; on their own they do not make the baseline worth rewriting
+BASELINE_VOLATILE = frozenset({"last_seen", "last_seen_epoch"})
+
+
+def baseline_changed(prev: Optional[dict], curr: dict) -> bool:
+    if not prev:
+        return True
+    return any(v != prev.get(k) for k, v in curr.items() if k not in BASELINE_VOLATILE)
+
+
+def snapshot_fingerprint(devices: List[dict], counts: dict) -> int:
+    return hash((
+        tuple(sorted(counts.items())),
+        tuple(
+            (d.get("key"), d.get("state"), d.get("risk"), tuple(d.get("ports", [])),
+             d.get("vendor"), d.get("hostname"), d.get("os"), d.get("type"), d.get("display_name"))
+            for d in devices
+        ),
+    ))
+
+
 def make_key(ip: str, mac: Optional[str]) -> str:
     return mac.upper() if mac else f"IP:{ip}"
 
 
 def service_strings(services: List[dict]) -> List[str]:
-    out = []
+    out: List[str] = []
+    append = out.append
     for s in services:
-        bits = [f"{s.get('port')}/{s.get('proto')}", s.get("name", "")]
-        pv = " ".join([s.get("product", ""), s.get("version", "")]).strip()
+        get = s.get
+        name = get("name")
+        pv = f"{get('product') or ''} {get('version') or ''}".strip()
+        extrainfo = get("extrainfo")
+        row = f"{get('port')}/{get('proto')}"
+        if name:
+            row += " " + name
         if pv:
-            bits.append(pv)
-        if s.get("extrainfo"):
-            bits.append(f"({s['extrainfo']})")
-        out.append(" ".join([b for b in bits if b]).strip())
+            row += " " + pv
+        if extrainfo:
+            row += f" ({extrainfo})"
+        append(row)
     return out
 
 
+def diff_sorted_ports(prev: List[int], curr: List[int]) -> Tuple[List[int], List[int]]:
+    """(added, removed) between two sorted port lists, in one merge pass."""
+    added: List[int] = []
+    removed: List[int] = []
+    i = j = 0
+    while i < len(prev) and j < len(curr):
+        a, b = prev[i], curr[j]
+        if a == b:
+            i += 1
+            j += 1
+        elif a < b:
+            removed.append(prev[i])
+            i += 1
+        else:
+            added.append(curr[j])
+            j += 1
+    removed.extend(prev[i:])
+    added.extend(curr[j:])
+    return added, removed
+
+
+SEVERITY_RANK = {"INFO": 0, "MEDIUM": 1, "CRITICAL": 2}
+
+
 def diff_and_emit_events(key: str, curr: dict, prev: Optional[dict]):
     if prev is None:
         emit_event(
@@ -1163,70 +1396,103 @@ def diff_and_emit_events(key: str, curr: dict, prev: Optional[dict]):
         )
         return
 
+    changes: List[Tuple[str, str, str, dict]] = []  # (kind, severity, title, details)
+
     if prev.get("state") != curr.get("state"):
         sev = "MEDIUM" if curr.get("state") == "OFFLINE" else "INFO"
-        emit_event(
-            kind="STATE_CHANGE",
-            severity=sev,
-            title=f"{curr.get('display_name')} is now {curr.get('state')}",
-            details={"ip": curr.get("ip"), "mac": curr.get("mac"), "from": prev.get("state"), "to": curr.get("state")},
-        )
+        changes.append((
+            "STATE_CHANGE",
+            sev,
+            f"{curr.get('display_name')} is now {curr.get('state')}",
+            {"ip": curr.get("ip"), "mac": curr.get("mac"), "from": prev.get("state"), "to": curr.get("state")},
+        ))
 
     if prev.get("risk") != curr.get("risk") and curr.get("state") != "OFFLINE":
         sev = "CRITICAL" if curr.get("risk") == "CRITICAL" else "MEDIUM"
-        emit_event(
-            kind="RISK_CHANGE",
-            severity=sev,
-            title=f"Risk changed for {curr.get('display_name')}: {prev.get('risk')} → {curr.get('risk')}",
-            details={"ip": curr.get("ip"), "mac": curr.get("mac")},
-        )
-
-    prev_ports = set(prev.get("ports", []))
-    curr_ports = set(curr.get("ports", []))
-    if prev_ports != curr_ports and curr.get("state") != "OFFLINE":
-        added = sorted(curr_ports - prev_ports)
-        removed = sorted(prev_ports - curr_ports)
-        sev = "CRITICAL" if set(added) & RISKY_PORTS_CRITICAL else "MEDIUM"
-        emit_event(
-            kind="PORT_CHANGE",
-            severity=sev,
-            title=f"Port change on {curr.get('display_name')}",
-            details={"ip": curr.get("ip"), "mac": curr.get("mac"), "added": added, "removed": removed},
-        )
+        changes.append((
+            "RISK_CHANGE",
+            sev,
+            f"Risk changed for {curr.get('display_name')}: {prev.get('risk')} → {curr.get('risk')}",
+            {"ip": curr.get("ip"), "mac": curr.get("mac")},
+        ))
+
+    added, removed = diff_sorted_ports(prev.get("ports", []), curr.get("ports", []))
+    if (added or removed) and curr.get("state") != "OFFLINE":
+        sev = "CRITICAL" if not RISKY_PORTS_CRITICAL.isdisjoint(added) else "MEDIUM"
+        changes.append((
+            "PORT_CHANGE",
+            sev,
+            f"Port change on {curr.get('display_name')}",
+            {"ip": curr.get("ip"), "mac": curr.get("mac"), "added": added, "removed": removed},
+        ))
 
     if prev.get("vendor") and curr.get("vendor") and prev.get("vendor") != curr.get("vendor"):
-        emit_event(
-            kind="VENDOR_CHANGE",
-            severity="MEDIUM",
-            title=f"Vendor changed for {curr.get('display_name')}",
-            details={"ip": curr.get("ip"), "mac": curr.get("mac"), "from": prev.get("vendor"), "to": curr.get("vendor")},
-        )
+        changes.append((
+            "VENDOR_CHANGE",
+            "MEDIUM",
+            f"Vendor changed for {curr.get('display_name')}",
+            {"ip": curr.get("ip"), "mac": curr.get("mac"), "from": prev.get("vendor"), "to": curr.get("vendor")},
+        ))
 
     if (prev.get("hostname") or "") != (curr.get("hostname") or "") and curr.get("hostname"):
-        emit_event(
-            kind="HOSTNAME_CHANGE",
-            severity="INFO",
-            title=f"Hostname changed for {curr.get('display_name')}",
-            details={
+        changes.append((
+            "HOSTNAME_CHANGE",
+            "INFO",
+            f"Hostname changed for {curr.get('display_name')}",
+            {
                 "ip": curr.get("ip"),
                 "mac": curr.get("mac"),
                 "from": prev.get("hostname"),
                 "to": curr.get("hostname"),
             },
-        )
+        ))
 
     if (prev.get("os") or "") != (curr.get("os") or "") and curr.get("os") not in ("", "Unknown"):
+        changes.append((
+            "OS_CHANGE",
+            "MEDIUM",
+            f"OS fingerprint changed for {curr.get('display_name')}",
+            {"ip": curr.get("ip"), "mac": curr.get("mac"), "from": prev.get("os"), "to": curr.get("os")},
+        ))
+
+    if len(changes) == 1:
+        emit_event(*changes[0])
+    elif changes:
+        # one batched event per device per cycle instead of a burst of appends
         emit_event(
-            kind="OS_CHANGE",
-            severity="MEDIUM",
-            title=f"OS fingerprint changed for {curr.get('display_name')}",
-            details={"ip": curr.get("ip"), "mac": curr.get("mac"), "from": prev.get("os"), "to": curr.get("os")},
+            kind="DEVICE_CHANGED",
+            severity=max((c[1] for c in changes), key=SEVERITY_RANK.__getitem__),
+            title=f"{len(changes)} changes on {curr.get('display_name')}",
+            details={
+                "ip": curr.get("ip"),
+                "mac": curr.get("mac"),
+                "changes": [{"kind": k, "severity": sev, "title": t, **d} for k, sev, t, d in changes],
+            },
         )
 
 
 # ----------------------
 # RADIO SENSORS (Wi-Fi / BT) + HEURISTICS
 # ----------------------
+# One pass over `iw dev <if> scan` output: BSS header, SSID and signal lines only.
+_IW_RE = re.compile(
+    r"^BSS (?P<bssid>[0-9A-Fa-f:]{17})"
+    r"|^[ \t]*SSID: ?(?P<ssid>.*)$"
+    r"|^[ \t]*signal: (?P<sig>-?\d+(?:\.\d+)?)",
+    re.M,
+)
+
+
+def iw_ap(bssid: str, ssid: str, signal_str: str) -> dict:
+    dbm = parse_dbm(signal_str)
+    flags = []
+    if not ssid.strip():
+        flags.append("HIDDEN_SSID")
+    if dbm is not None and dbm >= WIFI_CLOSE_DBM:
+        flags.append("CLOSE_AP")
+    return {"bssid": bssid, "ssid": ssid, "signal": signal_str, "signal_dbm": dbm, "flags": flags}
+
+
 def wifi_scan_iw(iface: str) -> List[dict]:
     if not have_cmd("iw"):
         return []
@@ -1234,51 +1500,26 @@ def wifi_scan_iw(iface: str) -> List[dict]:
     if rc != 0:
         return []
 
-    aps: List[dict] = []
+    aps: Dict[str, dict] = {}  # by BSSID, first sighting wins
     bssid = None
-    ssid = None
-    signal_str = None
-
-    for line in out.splitlines():
-        line = line.strip()
-        if line.startswith("BSS "):
-            if bssid:
-                dbm = parse_dbm(signal_str or "")
-                flags = []
-                if not (ssid or "").strip():
-                    flags.append("HIDDEN_SSID")
-                if dbm is not None and dbm >= WIFI_CLOSE_DBM:
-                    flags.append("CLOSE_AP")
-                aps.append({"bssid": bssid, "ssid": ssid or "", "signal": (signal_str or ""), "signal_dbm": dbm, "flags": flags})
-            bssid = line.split()[1].split("(")[0]
+    ssid = ""
+    signal_str = ""
+
+    for m in _IW_RE.finditer(out):
+        if m["bssid"]:
+            if bssid and bssid not in aps:
+                aps[bssid] = iw_ap(bssid, ssid, signal_str)
+            bssid = m["bssid"]
             ssid = ""
             signal_str = ""
-        elif line.startswith("SSID:"):
-            ssid = line.split("SSID:", 1)[1].strip()
-        elif "signal:" in line:
-            parts = line.split("signal:", 1)[1].strip()
-            # keep friendly format
-            raw_dbm = parts.split()[0] if parts else ""
-            signal_str = (raw_dbm + " dBm") if raw_dbm else ""
-
-    if bssid:
-        dbm = parse_dbm(signal_str or "")
-        flags = []
-        if not (ssid or "").strip():
-            flags.append("HIDDEN_SSID")
-        if dbm is not None and dbm >= WIFI_CLOSE_DBM:
-            flags.append("CLOSE_AP")
-        aps.append({"bssid": bssid, "ssid": ssid or "", "signal": (signal_str or ""), "signal_dbm": dbm, "flags": flags})
-
-    # unique by BSSID
-    seen = set()
-    uniq = []
-    for a in aps:
-        if a["bssid"] in seen:
-            continue
-        seen.add(a["bssid"])
-        uniq.append(a)
-    return uniq
+        elif m["ssid"] is not None:
+            ssid = m["ssid"].strip()
+        else:
+            signal_str = m["sig"] + " dBm"  # keep friendly format
+
+    if bssid and bssid not in aps:
+        aps[bssid] = iw_ap(bssid, ssid, signal_str)
+    return list(aps.values())
 
 
 def bt_classify(name: str) -> Tuple[str, List[str]]:
@@ -1345,6 +1586,7 @@ def bt_scan_bluetoothctl() -> List[dict]:
 
 
 def radio_thread():
+    global wifi_state, bt_state
     logger.info(f"Radio thread started (Wi-Fi={WIFI_ENABLED}, BT={BT_ENABLED})")
     prev_wifi_bssids = set()
     prev_bt_macs = set()
@@ -1357,9 +1599,7 @@ def radio_thread():
             if WIFI_ENABLED and t >= next_wifi:
                 aps = wifi_scan_iw(WIFI_IFACE)
                 ts = now_ts()
-                with radio_lock:
-                    wifi_state["ts"] = ts
-                    wifi_state["aps"] = aps
+                wifi_state = {"ts": ts, "aps": aps}
 
                 bssids = {a["bssid"] for a in aps}
                 new_bssids = sorted(bssids - prev_wifi_bssids)
@@ -1397,9 +1637,7 @@ def radio_thread():
             if BT_ENABLED and t >= next_bt:
                 devs = bt_scan_bluetoothctl()
                 ts = now_ts()
-                with radio_lock:
-                    bt_state["ts"] = ts
-                    bt_state["devices"] = devs
+                bt_state = {"ts": ts, "devices": devs}
 
                 macs = {d["mac"] for d in devs}
                 new_macs = sorted(macs - prev_bt_macs)
@@ -1425,13 +1663,35 @@ def radio_thread():
 # ----------------------
 # SCANNER LOOP
 # ----------------------
+def append_history(rec: dict):
+    global history_pending
+    with history_lock:
+        history_fh.write(dumps(rec) + b"\n")
+        history_pending += 1
+        if history_pending >= HISTORY_FLUSH_EVERY:
+            history_fh.flush()
+            history_pending = 0
+
+
+def flush_history():
+    """Push buffered history lines to disk so readers of HISTORY_FILE see them."""
+    global history_pending
+    with history_lock:
+        if history_pending:
+            history_fh.flush()
+            history_pending = 0
+
+
 def background_scanner():
+    global scan_status, snapshot_state
     logger.info(
         f"Starting SOC Pi v11 scanner on {NETWORK_CIDR} "
         f"(scan={SCAN_INTERVAL_SEC}s, profile_ttl={PROFILE_TTL_SEC}s, offline_after={OFFLINE_AFTER_SEC}s)"
     )
 
     baseline = load_baseline()
+    baseline_saved_at = 0.0
+    snapshot_fp: Optional[int] = None
     aliases = load_aliases()
 
     while True:
@@ -1439,16 +1699,32 @@ def background_scanner():
         now = datetime.now()
 
         # mark scanning start
-        with scan_lock:
-            scan_status["state"] = "SCANNING"
-            scan_status["last_start"] = now_ts()
-            scan_status["last_err"] = ""
+        scan_status = {**scan_status, "state": "SCANNING", "last_start": now_ts(), "last_err": ""}
 
         last_err: str = ""
 
         try:
             discovered = nmap_discovery_xml(NETWORK_CIDR)
             new_devices = 0
+            baseline_dirty = False
+
+            # hosts whose profile TTL expired are profiled up front, in a few concurrent nmap batches
+            to_profile: List[str] = []
+            profile_cutoff = time.time() - PROFILE_TTL_SEC
+            with inventory_lock:
+                for host in discovered:
+                    existing = device_inventory.get(make_key(host["ip"], host.get("mac")))
+                    if not existing or existing.get("last_profile_epoch", 0.0) <= profile_cutoff:
+                        to_profile.append(host["ip"])
+            if to_profile:
+                logger.info(f"Profiling {len(to_profile)} host(s) in up to {PROFILE_WORKERS} parallel nmap batches (XML)…")
+            profiles = profile_hosts(to_profile)
+            rdns_names = resolve_hostnames([h["ip"] for h in discovered if not h.get("hostname")])
+
+            # one clock read for the whole host loop (taken after profiling, as the per-host reads were)
+            now_epoch = time.time()
+            now_hms = now.strftime("%H:%M:%S")
+            now_full = now.strftime("%Y-%m-%d %H:%M:%S")
 
             for host in discovered:
                 ip = host["ip"]
@@ -1458,14 +1734,9 @@ def background_scanner():
 
                 key_guess = make_key(ip, disc_mac)
 
-                # decide whether to re-profile
-                existing = None
-                do_profile = True
                 with inventory_lock:
                     existing = device_inventory.get(key_guess)
-                    if existing:
-                        last_prof = existing.get("last_profile_epoch", 0.0)
-                        do_profile = (time.time() - last_prof) >= PROFILE_TTL_SEC
+                do_profile = ip in profiles  # a failed profile is retried next cycle
 
                 prof = {
                     "mac": disc_mac,
@@ -1477,8 +1748,7 @@ def background_scanner():
                 }
 
                 if do_profile:
-                    logger.info(f"Profiling {ip} (XML)…")
-                    prof.update(nmap_profile_xml(ip))
+                    prof.update(profiles[ip])
                 else:
                     if existing:
                         prof["os"] = existing.get("os", "Unknown")
@@ -1488,7 +1758,7 @@ def background_scanner():
 
                 # hostname enrichment
                 if not prof.get("hostname"):
-                    rdns = reverse_dns(ip)
+                    rdns = rdns_names.get(ip, "")
                     if rdns:
                         prof["hostname"] = rdns
 
@@ -1498,15 +1768,20 @@ def background_scanner():
                 if (vendor_final.strip().lower() in ("unknown", "unknown vendor", "")) and mac_final:
                     vendor_final = get_vendor(mac_final)
 
-                open_ports = prof.get("ports", []) or []
+                open_ports = sorted(prof.get("ports", []) or [])  # kept sorted for diff_sorted_ports
                 services_raw = prof.get("services", []) or []
-                services_str = service_strings(services_raw)
+                # a reused profile keeps its rendered service lines; only fresh profiles are re-rendered
+                if not do_profile and existing and "services" in existing:
+                    services_str = existing["services"]
+                else:
+                    services_str = service_strings(services_raw)
 
                 state = "ONLINE"
-                dev_type = identify_device_type(
-                    vendor_final, prof.get("os", "Unknown"), prof.get("hostname", ""), open_ports
+                port_key = tuple(open_ports)
+                dev_type = identify_device_type_cached(
+                    vendor_final, prof.get("os", "Unknown"), prof.get("hostname", ""), port_key
                 )
-                risk = compute_risk(open_ports, prof.get("os", "Unknown"), state)
+                risk = compute_risk_cached(port_key, prof.get("os", "Unknown"), state)
 
                 findings, recs = build_findings_and_recs(open_ports, services_raw, prof.get("os", "Unknown"))
 
@@ -1515,7 +1790,7 @@ def background_scanner():
                 baseline_prev = baseline.get(key)
                 first_seen = baseline_prev.get("first_seen") if baseline_prev else None
                 if not first_seen:
-                    first_seen = now.strftime("%Y-%m-%d %H:%M:%S")
+                    first_seen = now_full
                     new_devices += 1
 
                 device = {
@@ -1534,12 +1809,13 @@ def background_scanner():
                     "findings": findings,
                     "recommendations": recs,
                     "first_seen": first_seen,
-                    "last_seen": now.strftime("%H:%M:%S"),
-                    "last_seen_epoch": time.time(),
+                    "last_seen": now_hms,
+                    "last_seen_epoch": now_epoch,
                     "last_profile_epoch": (
-                        time.time()
+                        now_epoch
                         if do_profile
-                        else (existing.get("last_profile_epoch", time.time()) if existing else time.time())
+                        # never profiled successfully: 0.0 keeps the host due, so a failed batch retries next cycle
+                        else (existing.get("last_profile_epoch", 0.0) if existing else 0.0)
                     ),
                 }
 
@@ -1550,7 +1826,7 @@ def background_scanner():
 
                 diff_and_emit_events(key, device, baseline_prev)
 
-                baseline[key] = {
+                baseline_entry = {
                     "key": key,
                     "mac": mac_final,
                     "vendor": vendor_final,
@@ -1561,33 +1837,45 @@ def background_scanner():
                     "state": "ONLINE",
                     "ports": open_ports,
                     "first_seen": first_seen,
-                    "last_seen": now.strftime("%Y-%m-%d %H:%M:%S"),
-                    "last_seen_epoch": time.time(),
+                    "last_seen": now_full,
+                    "last_seen_epoch": now_epoch,
                     "zone": device.get("zone", ""),
                     "owner": device.get("owner", ""),
                     "alias": device.get("alias", ""),
                 }
+                if baseline_changed(baseline_prev, baseline_entry):
+                    baseline_dirty = True
+                baseline[key] = baseline_entry
 
-            # OFFLINE detection
+            # OFFLINE detection: flip state under the lock, emit events after releasing it
+            offline_cutoff = time.time() - OFFLINE_AFTER_SEC
             with inventory_lock:
-                for k, d in device_inventory.items():
-                    last_epoch = d.get("last_seen_epoch", 0.0)
-                    if (time.time() - last_epoch) >= OFFLINE_AFTER_SEC:
-                        if d.get("state") != "OFFLINE":
-                            d["state"] = "OFFLINE"
-                            prev = baseline.get(k, {})
-                            curr = {
-                                **prev,
-                                "state": "OFFLINE",
-                                "display_name": d.get("display_name", d.get("ip", "Device")),
-                                "ip": d.get("ip"),
-                                "mac": d.get("mac"),
-                            }
-                            diff_and_emit_events(k, curr, prev if prev else None)
-                            if k in baseline:
-                                baseline[k]["state"] = "OFFLINE"
-
-            save_baseline(baseline)
+                to_offline = [
+                    (k, d)
+                    for k, d in device_inventory.items()
+                    if d.get("last_seen_epoch", 0.0) <= offline_cutoff and d.get("state") != "OFFLINE"
+                ]
+                for _, d in to_offline:
+                    d["state"] = "OFFLINE"
+
+            for k, d in to_offline:
+                prev = baseline.get(k, {})
+                curr = {
+                    **prev,
+                    "state": "OFFLINE",
+                    "display_name": d.get("display_name", d.get("ip", "Device")),
+                    "ip": d.get("ip"),
+                    "mac": d.get("mac"),
+                }
+                diff_and_emit_events(k, curr, prev if prev else None)
+                if k in baseline:
+                    baseline[k]["state"] = "OFFLINE"
+                    baseline_dirty = True
+
+            # skip no-op rewrites on the SD card; last_seen is still refreshed every BASELINE_REFRESH_SEC
+            if baseline_dirty or (time.time() - baseline_saved_at) >= BASELINE_REFRESH_SEC:
+                save_baseline(baseline)
+                baseline_saved_at = time.time()
 
             with inventory_lock:
                 devices_list = list(device_inventory.values())
@@ -1600,7 +1888,7 @@ def background_scanner():
             devices_list.sort(key=lambda d: (d.get("state") == "OFFLINE", d.get("ip", "")))
 
             snapshot = {
-                "timestamp": now.strftime("%Y-%m-%d %H:%M:%S"),
+                "timestamp": now_full,
                 "subnet": NETWORK_CIDR,
                 "offline_after": OFFLINE_AFTER_SEC,
                 "counts": {
@@ -1610,31 +1898,27 @@ def background_scanner():
                 },
                 "devices": devices_list,
             }
-            save_json(SNAPSHOT_FILE, snapshot)
-
-            HISTORY_FILE.parent.mkdir(parents=True, exist_ok=True)
-            with open(HISTORY_FILE, "a", encoding="utf-8") as f:
-                f.write(
-                    json.dumps(
-                        {
-                            "seen": snapshot["counts"]["seen"],
-                            "new": snapshot["counts"]["new"],
-                            "critical": snapshot["counts"]["critical"],
-                            "ts": now.isoformat(),
-                        }
-                    )
-                    + "\n"
-                )
+            snapshot_state = snapshot
+            fp = snapshot_fingerprint(devices_list, snapshot["counts"])
+            if fp != snapshot_fp:
+                save_json(SNAPSHOT_FILE, snapshot)
+                snapshot_fp = fp
+
+            append_history(
+                {
+                    "seen": snapshot["counts"]["seen"],
+                    "new": snapshot["counts"]["new"],
+                    "critical": snapshot["counts"]["critical"],
+                    "ts": now.isoformat(),
+                }
+            )
 
         except Exception as e:
             last_err = str(e)[:200]
             logger.error(f"Scanner loop error: {e}")
 
         finally:
-            with scan_lock:
-                scan_status["state"] = "IDLE"
-                scan_status["last_end"] = now_ts()
-                scan_status["last_err"] = last_err
+            scan_status = {**scan_status, "state": "IDLE", "last_end": now_ts(), "last_err": last_err}
 
             elapsed = time.time() - start_ts
             sleep_for = max(3, SCAN_INTERVAL_SEC - int(elapsed))
@@ -1648,9 +1932,8 @@ def background_scanner():
 # ----------------------
 @app.route("/api/scan_now", methods=["POST"])
 def api_scan_now():
-    with scan_lock:
-        if scan_status.get("state") == "SCANNING":
-            return jsonify({"ok": False, "msg": "Scan already running."}), 409
+    if scan_status.get("state") == "SCANNING":
+        return jsonify({"ok": False, "msg": "Scan already running."}), 409
 
     scan_requested.set()
     return jsonify({"ok": True, "msg": "Manual scan requested. Starting ASAP."})
@@ -1670,17 +1953,22 @@ def api_snapshot():
         "counts": {"seen": 0, "new": 0, "critical": 0},
         "devices": [],
     }
-    return jsonify(load_json(SNAPSHOT_FILE, default))
+    return jsonify(snapshot_state or load_json(SNAPSHOT_FILE, default))
 
 
 @app.route("/api/history")
 def api_history():
-    recs: List[Dict[str, Any]] = []
-    if HISTORY_FILE.exists():
-        lines = HISTORY_FILE.read_text(encoding="utf-8").splitlines()[-50:]
+    flush_history()
+    lines = [ln for ln in tail_lines(HISTORY_FILE, 50) if ln.strip()]
+    try:
+        # one decoder pass over the tail wrapped as a JSON array
+        recs: List[Dict[str, Any]] = loads("[" + ",".join(lines) + "]")
+    except Exception:
+        # a torn or corrupt line: fall back to per-line parsing and drop the bad ones
+        recs = []
         for line in lines:
             try:
-                recs.append(json.loads(line))
+                recs.append(loads(line))
             except Exception:
                 pass
     return jsonify({"records": recs})
@@ -1688,9 +1976,7 @@ def api_history():
 
 @app.route("/api/status")
 def api_status():
-    with scan_lock:
-        s = dict(scan_status)
-    return jsonify({**s, "scan_interval": SCAN_INTERVAL_SEC, "profile_ttl": PROFILE_TTL_SEC, "offline_after": OFFLINE_AFTER_SEC})
+    return jsonify({**scan_status, "scan_interval": SCAN_INTERVAL_SEC, "profile_ttl": PROFILE_TTL_SEC, "offline_after": OFFLINE_AFTER_SEC})
 
 
 @app.route("/api/alerts")
@@ -1709,56 +1995,69 @@ def api_alerts():
 
 @app.route("/api/radio")
 def api_radio():
-    with radio_lock:
-        w = dict(wifi_state)
-        b = dict(bt_state)
-    return jsonify({"wifi": {"enabled": WIFI_ENABLED, **w}, "bt": {"enabled": BT_ENABLED, **b}})
+    return jsonify({"wifi": {"enabled": WIFI_ENABLED, **wifi_state}, "bt": {"enabled": BT_ENABLED, **bt_state}})
 
 
 @app.route("/api/log_tail")
 def api_log_tail():
-    lines = LOG_FILE.read_text(encoding="utf-8").splitlines()[-30:] if LOG_FILE.exists() else []
+    lines = tail_lines(LOG_FILE, 30)
     return jsonify({"lines": lines})
 
 
-@app.route("/api/sys_info")
-def api_sys_info():
-    temp = 0.0
+def read_temp() -> float:
     try:
-        with open("/sys/class/thermal/thermal_zone0/temp", "r", encoding="utf-8") as f:
-            temp = round(int(f.read().strip()) / 1000.0, 1)
+        return round(int(THERMAL_FILE.read_bytes()) / 1000.0, 1)
     except Exception:
-        pass
-    return jsonify({"cpu": psutil.cpu_percent(interval=0.1), "ram_perc": psutil.virtual_memory().percent, "temp": temp})
+        return 0.0
+
+
+@app.route("/api/sys_info")
+def api_sys_info():
+    global sysinfo_cache
+    now = time.time()
+    taken, info = sysinfo_cache
+    if now - taken >= SYSINFO_TTL_SEC:
+        # interval=None: usage since the previous call, no 100 ms sleep in the request
+        info = {"cpu": psutil.cpu_percent(interval=None), "ram_perc": psutil.virtual_memory().percent, "temp": read_temp()}
+        sysinfo_cache = (now, info)
+    return jsonify(info)
+
+
+class EchoWriter:
+    """File-like sink for csv.writer that returns each line instead of buffering it."""
+
+    def write(self, value: str) -> str:
+        return value
 
 
 @app.route("/api/export.csv")
 def api_export_csv():
-    snap = load_json(SNAPSHOT_FILE, {"devices": []})
+    snap = snapshot_state or load_json(SNAPSHOT_FILE, {"devices": []})
     devices = snap.get("devices", [])
 
-    output = io.StringIO()
-    w = csv.writer(output)
-    w.writerow(["display_name", "ip", "mac", "vendor", "hostname", "os", "type", "zone", "owner", "state", "risk", "ports", "services"])
-    for d in devices:
-        w.writerow(
-            [
-                d.get("display_name", ""),
-                d.get("ip", ""),
-                d.get("mac", ""),
-                d.get("vendor", ""),
-                d.get("hostname", ""),
-                d.get("os", ""),
-                d.get("type", ""),
-                d.get("zone", ""),
-                d.get("owner", ""),
-                d.get("state", ""),
-                d.get("risk", ""),
-                " ".join(d.get("ports", []) or []),
-                " | ".join(d.get("services", []) or []),
-            ]
-        )
-    return Response(output.getvalue(), mimetype="text/csv")
+    def rows():
+        w = csv.writer(EchoWriter())  # writerow() hands back the formatted line
+        yield w.writerow(["display_name", "ip", "mac", "vendor", "hostname", "os", "type", "zone", "owner", "state", "risk", "ports", "services"])
+        for d in devices:
+            yield w.writerow(
+                [
+                    d.get("display_name", ""),
+                    d.get("ip", ""),
+                    d.get("mac", ""),
+                    d.get("vendor", ""),
+                    d.get("hostname", ""),
+                    d.get("os", ""),
+                    d.get("type", ""),
+                    d.get("zone", ""),
+                    d.get("owner", ""),
+                    d.get("state", ""),
+                    d.get("risk", ""),
+                    " ".join(map(str, d.get("ports", []) or [])),
+                    " | ".join(d.get("services", []) or []),
+                ]
+            )
+
+    return Response(rows(), mimetype="text/csv")
 
 
 # ----------------------
@@ -1773,6 +2072,8 @@ if __name__ == "__main__":
     if not have_cmd("nmap"):
         raise SystemExit("nmap is not installed. Install it: sudo apt-get install -y nmap")
 
+    psutil.cpu_percent(interval=None)  # prime the baseline so the first /api/sys_info is meaningful
+
     t = threading.Thread(target=background_scanner, daemon=True)
     t.start()
 
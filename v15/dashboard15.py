@@ -24,6 +24,7 @@ DEPENDENCIES:
   sudo apt-get update
   sudo apt-get install -y nmap iw wireless-tools bluez iptables
   sudo pip3 install flask psutil requests
+  sudo pip3 install lxml   # optional: faster nmap XML parsing
 
 ENV VARS (optional):
   SOCPI_PORT=8080
@@ -50,6 +51,7 @@ FILES:
 """
 
 import csv
+import gzip
 import io
 import json
 import logging
@@ -57,19 +59,32 @@ import os
 import re
 import socket
 import subprocess
+import tempfile
 import threading
 import time
+from collections import deque
 from datetime import datetime
 from functools import wraps
 from logging.handlers import RotatingFileHandler
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
-from xml.etree import ElementTree as ET
-from shutil import which
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from shutil import copyfileobj, which
 
 import psutil
 import requests  # optional vendor lookup
-from flask import Flask, Response, jsonify, render_template_string, request, session, redirect, url_for
+from flask import Flask, Response, request, session, redirect, url_for
+
+try:
+    from lxml import etree as ET  # libxml2 parser; same Element API as the stdlib
+    HAVE_LXML = True
+except ImportError:
+    from xml.etree import ElementTree as ET
+    HAVE_LXML = False
+
+try:
+    import orjson  # fast C serializer; stdlib json is the fallback
+except ImportError:
+    orjson = None
 
 # ----------------------
 # CONFIGURATION
@@ -90,6 +105,9 @@ VENDOR_CACHE_FILE = Path(os.getenv("SOCPI_VENDOR_CACHE", "vendor_cache.json"))
 
 BASELINE_FILE = Path(os.getenv("SOCPI_BASELINE_FILE", "baseline.json"))
 ALERTS_FILE = Path(os.getenv("SOCPI_ALERTS_FILE", "alerts.jsonl"))
+JSONL_ROTATE_BYTES = int(os.getenv("SOCPI_JSONL_ROTATE_BYTES", "5000000"))  # alerts/history roll over (gzipped) past this
+RECENT_ALERTS_MAX = max(1, int(os.getenv("SOCPI_RECENT_ALERTS", "500")))  # alerts kept in memory for /api/alerts
+HISTORY_POINTS = 50  # records served by /api/history (and carried over when history.jsonl rotates)
 ALIASES_FILE = Path(os.getenv("SOCPI_ALIASES_FILE", "device_aliases.json"))
 QUARANTINE_FILE = Path(os.getenv("SOCPI_QUARANTINE_FILE", "quarantine.json"))
 
@@ -107,8 +125,18 @@ ADMIN_PASS = os.getenv("SOCPI_PASS", "admin123")
 FLASK_SECRET = os.getenv("SOCPI_SECRET", "soc-pi-secure-key-change-me")
 
 # Risky ports (tune as you like)
-RISKY_PORTS_CRITICAL = {"23", "2323", "3389", "5900", "445"}  # telnet, rdp, vnc, smb
-RISKY_PORTS_MEDIUM = {"22", "21", "8080", "8443", "3306", "5432"}  # ssh/ftp/admin/db
+RISKY_PORTS_CRITICAL = frozenset({23, 2323, 3389, 5900, 445})  # telnet, rdp, vnc, smb
+RISKY_PORTS_MEDIUM = frozenset({22, 21, 8080, 8443, 3306, 5432})  # ssh/ftp/admin/db
+MEDIA_PORTS = frozenset({8008, 8009, 1900, 554, 2869})  # cast/dlna/rtsp
+
+# Parsers for per-device / per-line hot paths, compiled once
+_RE_PI_HOST = re.compile(r"\bpi\b", re.ASCII)
+_RE_IW_BSSID = re.compile(r"BSS ([0-9A-Fa-f:]{17})", re.ASCII)
+_RE_IW_SSID = re.compile(r"SSID:\s*(.*)")
+_RE_IW_SIG = re.compile(r"signal:\s*(-?\d+(?:\.\d+)?)", re.ASCII)
+_RE_BT_DEV = re.compile(r"Device ([0-9A-Fa-f:]{17})\s+(.+)")
+_RE_IP_NEIGH = re.compile(r"^(\d+\.\d+\.\d+\.\d+)\s+dev\s+\S+\s+lladdr\s+([0-9a-f:]{17})\s+", re.I | re.ASCII)
+_RE_ARP_A = re.compile(r"\((.*?)\)\s+at\s+([0-9a-f:]{17})", re.I | re.ASCII)
 
 # ----------------------
 # LOGGING & APP
@@ -116,9 +144,27 @@ RISKY_PORTS_MEDIUM = {"22", "21", "8080", "8443", "3306", "5432"}  # ssh/ftp/adm
 logger = logging.getLogger("socpi")
 logger.setLevel(logging.INFO)
 
+
+class RingHandler(logging.Handler):
+    """Keeps the last n formatted log lines in memory for /api/log_tail."""
+    def __init__(self, n: int = 200):
+        super().__init__()
+        self.ring: deque = deque(maxlen=n)
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            self.ring.append(self.format(record))
+        except Exception:
+            self.handleError(record)
+
+
+_log_fmt = logging.Formatter("[%(asctime)s] %(levelname)s: %(message)s")
 _rot = RotatingFileHandler(LOG_FILE, maxBytes=2_000_000, backupCount=3)
-_rot.setFormatter(logging.Formatter("[%(asctime)s] %(levelname)s: %(message)s"))
+_rot.setFormatter(_log_fmt)
+ring_handler = RingHandler(200)
+ring_handler.setFormatter(_log_fmt)
 logger.addHandler(_rot)
+logger.addHandler(ring_handler)
 logger.addHandler(logging.StreamHandler())
 
 app = Flask(__name__)
@@ -140,6 +186,11 @@ scan_status: Dict[str, Any] = {"state": "IDLE", "last_start": "", "last_end": ""
 # Manual scan trigger
 scan_requested = threading.Event()
 
+# JSONL appends (alerts/history) + the in-memory alert ring served by /api/alerts
+jsonl_lock = threading.Lock()
+alerts_lock = threading.Lock()
+recent_alerts: deque = deque(maxlen=RECENT_ALERTS_MAX)
+
 # Quarantine (IPS)
 quarantine_lock = threading.Lock()
 quarantine: Dict[str, dict] = {}  # key -> record
@@ -858,19 +909,102 @@ LOGIN_HTML = r"""
 </body>
 """
 
+# Compiled once at import; routes only render, no per-request source hashing/lookup.
+UI_TPL = app.jinja_env.from_string(HTML)
+LOGIN_TPL = app.jinja_env.from_string(LOGIN_HTML)
+
 # ----------------------
 # UTIL: JSON + TIME
 # ----------------------
+# Reused compact encoder for when orjson is missing (no per-call encoder construction).
+_ENCODER = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False).encode
+
+
+def dumps(data: Any) -> bytes:
+    """Compact UTF-8 JSON; orjson when installed."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return _ENCODER(data).encode("utf-8")
+
+
+def loads(raw: Any) -> Any:
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+
+def ojson(data: Any) -> Response:
+    """JSON response without going through flask.jsonify."""
+    return Response(dumps(data), mimetype="application/json")
+
+
 def load_json(path: Path, default: Any) -> Any:
     try:
-        return json.loads(path.read_text(encoding="utf-8"))
+        return loads(path.read_bytes())
     except Exception:
         return default
 
 
 def save_json(path: Path, data: Any):
     path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    if orjson is not None:
+        path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    else:
+        path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+
+
+def tail_lines(path: Path, n: int, approx_line_bytes: int = 256) -> List[str]:
+    """Last n lines of a file without reading the whole thing."""
+    if n <= 0:
+        return []
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            window = max(n * approx_line_bytes, 4096)
+            while True:
+                start = max(0, size - window)
+                f.seek(start)
+                lines = f.read().decode("utf-8", "replace").splitlines()
+                # first line is likely partial unless we started at offset 0
+                if start == 0 or len(lines) > n:
+                    return lines[-n:] if start == 0 else lines[1:][-n:]
+                window *= 2
+    except OSError:
+        return []
+
+
+def gzip_rotated(src: Path):
+    try:
+        with open(src, "rb") as fi, gzip.open(src.with_name(src.name + ".gz"), "wb") as fo:
+            copyfileobj(fi, fo)
+        src.unlink()
+    except OSError as e:
+        logger.warning(f"Compressing {src} failed: {e}")
+
+
+def append_jsonl(path: Path, rec: Any, keep_tail: int = 0):
+    """
+    Append one record; past JSONL_ROTATE_BYTES the file is renamed aside and gzipped in the background.
+    The last `keep_tail` lines are carried into the fresh file for readers that tail it.
+    """
+    carried: List[str] = []
+    with jsonl_lock:
+        try:
+            if path.stat().st_size > JSONL_ROTATE_BYTES:
+                carried = tail_lines(path, keep_tail)
+                stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+                rolled = path.with_name(f"{path.stem}-{stamp}{path.suffix}")
+                n = 1
+                while rolled.exists() or rolled.with_name(rolled.name + ".gz").exists():
+                    rolled = path.with_name(f"{path.stem}-{stamp}-{n}{path.suffix}")
+                    n += 1
+                path.rename(rolled)
+                threading.Thread(target=gzip_rotated, args=(rolled,), daemon=True).start()
+        except FileNotFoundError:
+            path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "ab") as f:
+            if carried:
+                f.write(("\n".join(carried) + "\n").encode("utf-8"))
+            f.write(dumps(rec) + b"\n")
 
 
 def now_ts() -> str:
@@ -889,22 +1023,27 @@ def emit_event(kind: str, severity: str, title: str, details: Optional[dict] = N
         "details": details or {},
     }
     logger.info(f"EVENT {severity} {kind}: {title} | {evt['details']}")
-    ALERTS_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with open(ALERTS_FILE, "a", encoding="utf-8") as f:
-        f.write(json.dumps(evt) + "\n")
+    with alerts_lock:
+        recent_alerts.append(evt)
+    append_jsonl(ALERTS_FILE, evt)
 
 
-def tail_events(limit: int = 25) -> List[dict]:
-    if not ALERTS_FILE.exists():
-        return []
-    lines = ALERTS_FILE.read_text(encoding="utf-8").splitlines()[-limit:]
-    out = []
-    for ln in reversed(lines):
+def load_recent_alerts():
+    """Seed the alert ring from the tail of ALERTS_FILE so a restart keeps recent history."""
+    evts = []
+    for ln in tail_lines(ALERTS_FILE, RECENT_ALERTS_MAX):
         try:
-            out.append(json.loads(ln))
+            evts.append(loads(ln))
         except Exception:
             pass
-    return out
+    with alerts_lock:
+        recent_alerts.extendleft(reversed(evts))  # older than anything emitted since startup
+
+
+def tail_events(limit: int = 25) -> List[dict]:
+    """Newest first, straight from the in-memory ring."""
+    with alerts_lock:
+        return list(recent_alerts)[-limit:][::-1]
 
 
 # ----------------------
@@ -969,16 +1108,16 @@ def get_vendor(mac: str) -> str:
 # ----------------------
 # DEVICE TYPE + RISK + FINDINGS
 # ----------------------
-def identify_device_type(vendor: str, os_guess: str, hostname: str, open_ports: List[str]) -> str:
+def identify_device_type(vendor: str, os_guess: str, hostname: str, open_ports: List[int]) -> str:
     vendor_u = (vendor or "Unknown").upper()
     os_l = (os_guess or "Unknown").lower()
     hn_l = (hostname or "").lower()
     port_set = set(open_ports)
 
-    if "RASPBERRY" in vendor_u or re.search(r"\bpi\b", hn_l):
+    if "RASPBERRY" in vendor_u or _RE_PI_HOST.search(hn_l):
         return "Raspberry Pi"
     if "APPLE" in vendor_u:
-        if "62078" in port_set:
+        if 62078 in port_set:
             return "iPhone/iPad (Locked)"
         if "darwin" in os_l or "mac os" in os_l or "macos" in os_l:
             return "Mac (iMac/MacBook)"
@@ -986,18 +1125,18 @@ def identify_device_type(vendor: str, os_guess: str, hostname: str, open_ports:
     tv_vendors = ["SAMSUNG", "LG", "SONY", "VIZIO", "PANASONIC", "HISENSE", "TCL"]
     if any(v in vendor_u for v in tv_vendors):
         return "Smart TV"
-    if port_set.intersection({"8008", "8009", "1900", "554", "2869"}):
+    if not MEDIA_PORTS.isdisjoint(port_set):
         return "Smart TV / Media Player"
     if "windows" in os_l:
         return "Windows Device"
     if "linux" in os_l:
-        if "22" in port_set:
+        if 22 in port_set:
             return "Linux Server / SBC"
         return "Linux Device"
     return "Unknown Device"
 
 
-def compute_risk(open_ports: List[str], os_guess: str, state: str, quarantined: bool) -> str:
+def compute_risk(open_ports: List[int], os_guess: str, state: str, quarantined: bool) -> str:
     if quarantined:
         return "CRITICAL"
     if state == "OFFLINE":
@@ -1012,7 +1151,7 @@ def compute_risk(open_ports: List[str], os_guess: str, state: str, quarantined:
     return "LOW"
 
 
-def build_findings_and_recs(open_ports: List[str], services: List[dict], os_guess: str, quarantined: bool) -> Tuple[List[str], List[str]]:
+def build_findings_and_recs(open_ports: List[int], services: List[dict], os_guess: str, quarantined: bool) -> Tuple[List[str], List[str]]:
     findings: List[str] = []
     recs: List[str] = []
     port_set = set(open_ports)
@@ -1021,29 +1160,29 @@ def build_findings_and_recs(open_ports: List[str], services: List[dict], os_gues
         findings.append("Device is quarantined by Pi firewall (iptables).")
         recs.append("If this is a rogue device, also block it at your router/AP for full removal.")
 
-    if "23" in port_set or "2323" in port_set:
+    if 23 in port_set or 2323 in port_set:
         findings.append("Telnet exposed (unencrypted remote access).")
         recs.append("Disable Telnet; use SSH with keys and restrict by firewall.")
-    if "445" in port_set:
+    if 445 in port_set:
         findings.append("SMB exposed (port 445).")
         recs.append("Restrict SMB to trusted subnets; disable SMBv1; patch Windows/Samba.")
-    if "3389" in port_set:
+    if 3389 in port_set:
         findings.append("RDP exposed (port 3389).")
         recs.append("Restrict RDP via firewall/VPN; enable NLA; enforce MFA if possible.")
-    if "5900" in port_set:
+    if 5900 in port_set:
         findings.append("VNC exposed (port 5900).")
         recs.append("Restrict VNC to LAN/VPN; require strong auth; prefer SSH tunneling.")
 
-    if "22" in port_set:
+    if 22 in port_set:
         findings.append("SSH exposed.")
         recs.append("Use key-based auth, disable password auth, limit users, and rate-limit.")
-    if "21" in port_set:
+    if 21 in port_set:
         findings.append("FTP exposed (often plaintext).")
         recs.append("Prefer SFTP/FTPS; disable FTP if not required.")
-    if "3306" in port_set or "5432" in port_set:
+    if 3306 in port_set or 5432 in port_set:
         findings.append("Database port exposed (MySQL/Postgres).")
         recs.append("Bind DB to localhost or trusted subnet; require auth; firewall the port.")
-    if "80" in port_set or "8080" in port_set or "8443" in port_set:
+    if 80 in port_set or 8080 in port_set or 8443 in port_set:
         findings.append("HTTP/admin web port exposed (possible management UI).")
         recs.append("Disable unused admin UIs; enforce auth; patch; restrict access by IP/VLAN.")
 
@@ -1079,6 +1218,20 @@ def run_cmd(cmd: List[str], timeout: int = 120) -> Tuple[int, str, str]:
         return 1, "", str(e)
 
 
+def run_cmd_stream(cmd: List[str]) -> Tuple[subprocess.Popen, Any]:
+    """
+    Start cmd with stdout piped for incremental parsing. stderr is spooled to a
+    temp file so a chatty child can never stall on a full pipe.
+    """
+    err_fp = tempfile.TemporaryFile()
+    try:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=err_fp, bufsize=1 << 16)
+    except Exception:
+        err_fp.close()
+        raise
+    return proc, err_fp
+
+
 # ----------------------
 # IPS: QUARANTINE (iptables)
 # ----------------------
@@ -1170,16 +1323,74 @@ def apply_quarantine_rules_from_file():
 # ----------------------
 # NMAP RUN + PARSE (XML)
 # ----------------------
-def nmap_discovery_xml(cidr: str) -> List[dict]:
-    rc, out, err = run_cmd(["nmap", "-sn", "-oX", "-", cidr], timeout=180)
-    if rc != 0:
-        logger.warning(f"Discovery nmap error code={rc}: {err[:200]}")
-        return []
+def iter_nmap_hosts(source: Any) -> Iterator[Any]:
+    """
+    Yield each <host> of nmap -oX output as soon as it closes, then clear it and
+    detach it from the root, so memory stays at one host however big the scan.
+    A truncated document (nmap killed mid-run) ends the stream after the last
+    complete host instead of discarding the hosts already parsed.
+    """
+    root = None
+    try:
+        if HAVE_LXML:
+            # recover=True already turns a truncated run into "stop after the last host"
+            hosts = ET.iterparse(source, events=("end",), tag="host", resolve_entities=False, no_network=True,
+                                 huge_tree=False, remove_blank_text=True, recover=True)
+            for _, el in hosts:
+                yield el
+                el.clear()
+                while el.getprevious() is not None:
+                    del el.getparent()[0]
+            return
+        for ev, el in ET.iterparse(source, events=("start", "end")):
+            if root is None:
+                root = el  # first start event is <nmaprun>
+            if ev == "end" and el.tag == "host":
+                yield el
+                el.clear()
+                if el in root:
+                    root.remove(el)
+    except ET.ParseError as e:
+        logger.warning(f"nmap XML ended early, keeping hosts parsed so far: {e}")
+
+
+def stream_nmap_hosts(cmd: List[str], timeout: int) -> Iterator[Any]:
+    """
+    Run nmap and yield <host> elements while it is still scanning.
+    Raises TimeoutExpired / CalledProcessError once the output is consumed.
+    """
+    proc, err_fp = run_cmd_stream(cmd)
+    timed_out = threading.Event()
+
+    def _kill():
+        timed_out.set()
+        proc.kill()
 
+    killer = threading.Timer(timeout, _kill)
+    killer.daemon = True
+    killer.start()
+    try:
+        yield from iter_nmap_hosts(proc.stdout)
+        if timed_out.is_set():
+            raise subprocess.TimeoutExpired(cmd, timeout)
+        rc = proc.wait()
+        if rc != 0:
+            err_fp.seek(0)
+            err = err_fp.read().decode("utf-8", "replace")
+            raise subprocess.CalledProcessError(rc, cmd, stderr=err)
+    finally:
+        killer.cancel()
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        proc.stdout.close()
+        err_fp.close()
+
+
+def nmap_discovery_xml(cidr: str) -> List[dict]:
     hosts: List[dict] = []
     try:
-        root = ET.fromstring(out)
-        for h in root.findall("host"):
+        for h in stream_nmap_hosts(["nmap", "-sn", "-oX", "-", cidr], timeout=180):
             status = h.find("status")
             if status is None or status.attrib.get("state") != "up":
                 continue
@@ -1203,6 +1414,12 @@ def nmap_discovery_xml(cidr: str) -> List[dict]:
 
             if ip:
                 hosts.append({"ip": ip, "mac": mac, "vendor": vendor, "hostname": hostname})
+    except subprocess.TimeoutExpired:
+        logger.warning("Discovery nmap timed out")
+        return []
+    except subprocess.CalledProcessError as e:
+        logger.warning(f"Discovery nmap error code={e.returncode}: {e.stderr[:200]}")
+        return []
     except Exception as e:
         logger.error(f"Discovery XML parse failed: {e}")
         return []
@@ -1211,22 +1428,17 @@ def nmap_discovery_xml(cidr: str) -> List[dict]:
 
 def nmap_profile_xml(ip: str) -> dict:
     cmd = ["nmap", "-O", "-sV", "--top-ports", str(NMAP_TOP_PORTS), "-T4", "-oX", "-", ip]
-    rc, out, err = run_cmd(cmd, timeout=240)
-    if rc != 0:
-        logger.warning(f"Profile nmap {ip} error code={rc}: {err[:200]}")
-        return {"mac": None, "vendor": "Unknown", "hostname": "", "os": "Unknown", "ports": [], "services": []}
+    empty = {"mac": None, "vendor": "Unknown", "hostname": "", "os": "Unknown", "ports": [], "services": []}
 
     mac = None
     vendor = "Unknown"
     hostname = ""
     os_guess = "Unknown"
-    open_ports: List[str] = []
+    open_ports: List[int] = []
     services: List[dict] = []
 
     try:
-        root = ET.fromstring(out)
-        h0 = root.find("host")
-        if h0 is not None:
+        for h0 in stream_nmap_hosts(cmd, timeout=240):
             hn = h0.find("hostnames")
             if hn is not None:
                 hne = hn.find("hostname")
@@ -1254,7 +1466,7 @@ def nmap_profile_xml(ip: str) -> dict:
             if ports_el is not None:
                 for p in ports_el.findall("port"):
                     proto = p.attrib.get("protocol", "tcp")
-                    portid = p.attrib.get("portid", "")
+                    portid = int(p.attrib.get("portid", "0"))
                     st = p.find("state")
                     if st is None or st.attrib.get("state") != "open":
                         continue
@@ -1276,6 +1488,12 @@ def nmap_profile_xml(ip: str) -> dict:
                             "extrainfo": extrainfo,
                         }
                     )
+    except subprocess.TimeoutExpired:
+        logger.warning(f"Profile nmap {ip} timed out")
+        return empty
+    except subprocess.CalledProcessError as e:
+        logger.warning(f"Profile nmap {ip} error code={e.returncode}: {e.stderr[:200]}")
+        return empty
     except Exception as e:
         logger.error(f"Profile XML parse failed for {ip}: {e}")
 
@@ -1302,7 +1520,13 @@ def reverse_dns(ip: str) -> str:
 # ----------------------
 def load_baseline() -> Dict[str, dict]:
     data = load_json(BASELINE_FILE, {})
-    return data if isinstance(data, dict) else {}
+    if not isinstance(data, dict):
+        return {}
+    # older baselines stored port numbers as strings
+    for entry in data.values():
+        if isinstance(entry, dict) and entry.get("ports"):
+            entry["ports"] = [int(p) for p in entry["ports"]]
+    return data
 
 
 def save_baseline(b: Dict[str, dict]):
@@ -1364,7 +1588,7 @@ def diff_and_emit_events(key: str, curr: dict, prev: Optional[dict]):
     if prev_ports != curr_ports and curr.get("state") != "OFFLINE":
         added = sorted(curr_ports - prev_ports)
         removed = sorted(prev_ports - curr_ports)
-        sev = "CRITICAL" if set(added) & RISKY_PORTS_CRITICAL else "MEDIUM"
+        sev = "CRITICAL" if not RISKY_PORTS_CRITICAL.isdisjoint(added) else "MEDIUM"
         emit_event(
             kind="PORT_CHANGE",
             severity=sev,
@@ -1418,17 +1642,21 @@ def wifi_scan_iw(iface: str) -> List[dict]:
     signal = None
     for line in out.splitlines():
         line = line.strip()
-        if line.startswith("BSS "):
+        m = _RE_IW_BSSID.match(line)
+        if m:
             if bssid:
                 aps.append({"bssid": bssid, "ssid": ssid or "", "signal": signal or ""})
-            bssid = line.split()[1].split("(")[0]
+            bssid = m.group(1)
             ssid = ""
             signal = ""
-        elif line.startswith("SSID:"):
-            ssid = line.split("SSID:", 1)[1].strip()
-        elif "signal:" in line:
-            parts = line.split("signal:", 1)[1].strip()
-            signal = parts.split()[0] + " dBm" if parts else ""
+            continue
+        m = _RE_IW_SSID.match(line)
+        if m:
+            ssid = m.group(1).strip()
+            continue
+        m = _RE_IW_SIG.search(line)
+        if m:
+            signal = m.group(1) + " dBm"
     if bssid:
         aps.append({"bssid": bssid, "ssid": ssid or "", "signal": signal or ""})
 
@@ -1452,14 +1680,9 @@ def bt_scan_bluetoothctl() -> List[dict]:
 
     devs = []
     for line in out.splitlines():
-        line = line.strip()
-        if not line.startswith("Device "):
-            continue
-        parts = line.split()
-        if len(parts) >= 3:
-            mac = parts[1].strip()
-            name = " ".join(parts[2:]).strip()
-            devs.append({"mac": mac, "name": name})
+        m = _RE_BT_DEV.match(line.strip())
+        if m:
+            devs.append({"mac": m.group(1), "name": m.group(2).strip()})
     return devs
 
 
@@ -1524,11 +1747,7 @@ def ids_arp_monitor():
                 rc, out, _ = run_cmd(["ip", "neigh", "show"], timeout=10)
                 if rc == 0:
                     for line in out.splitlines():
-                        m = re.search(
-                            r"^(\d+\.\d+\.\d+\.\d+)\s+dev\s+\S+\s+lladdr\s+([0-9a-f:]{17})\s+",
-                            line.strip(),
-                            re.I,
-                        )
+                        m = _RE_IP_NEIGH.search(line.strip())
                         if not m:
                             continue
                         ip = m.group(1)
@@ -1545,7 +1764,7 @@ def ids_arp_monitor():
                 rc, out, _ = run_cmd(["arp", "-a"], timeout=10)
                 if rc == 0:
                     for line in out.splitlines():
-                        m = re.search(r"\((.*?)\)\s+at\s+([0-9a-f:]{17})", line, re.I)
+                        m = _RE_ARP_A.search(line)
                         if not m:
                             continue
                         ip = m.group(1)
@@ -1765,19 +1984,16 @@ def background_scanner():
             }
             save_json(SNAPSHOT_FILE, snapshot)
 
-            HISTORY_FILE.parent.mkdir(parents=True, exist_ok=True)
-            with open(HISTORY_FILE, "a", encoding="utf-8") as f:
-                f.write(
-                    json.dumps(
-                        {
-                            "seen": snapshot["counts"]["seen"],
-                            "new": snapshot["counts"]["new"],
-                            "critical": snapshot["counts"]["critical"],
-                            "ts": now.isoformat(),
-                        }
-                    )
-                    + "\n"
-                )
+            append_jsonl(
+                HISTORY_FILE,
+                {
+                    "seen": snapshot["counts"]["seen"],
+                    "new": snapshot["counts"]["new"],
+                    "critical": snapshot["counts"]["critical"],
+                    "ts": now.isoformat(),
+                },
+                keep_tail=HISTORY_POINTS,  # /api/history tails the live file only
+            )
 
         except Exception as e:
             last_err = str(e)[:200]
@@ -1808,7 +2024,7 @@ def login():
         if request.form.get("password") == ADMIN_PASS:
             session["logged_in"] = True
             return redirect(url_for("home"))
-    return render_template_string(LOGIN_HTML)
+    return LOGIN_TPL.render()
 
 
 @app.route("/logout")
@@ -1820,7 +2036,7 @@ def logout():
 @app.route("/")
 @require_login
 def home():
-    return render_template_string(HTML)
+    return UI_TPL.render()
 
 
 @app.route("/api/scan_now", methods=["POST"])
@@ -1829,10 +2045,10 @@ def api_scan_now():
     # If already scanning, do not queue another immediate scan
     with scan_lock:
         if scan_status.get("state") == "SCANNING":
-            return jsonify({"ok": False, "msg": "Scan already running."}), 409
+            return ojson({"ok": False, "msg": "Scan already running."}), 409
 
     scan_requested.set()
-    return jsonify({"ok": True, "msg": "Manual scan requested. Starting ASAP."})
+    return ojson({"ok": True, "msg": "Manual scan requested. Starting ASAP."})
 
 
 @app.route("/api/snapshot")
@@ -1845,21 +2061,19 @@ def api_snapshot():
         "counts": {"seen": 0, "new": 0, "critical": 0},
         "devices": [],
     }
-    return jsonify(load_json(SNAPSHOT_FILE, default))
+    return ojson(load_json(SNAPSHOT_FILE, default))
 
 
 @app.route("/api/history")
 @require_login
 def api_history():
     recs: List[Dict[str, Any]] = []
-    if HISTORY_FILE.exists():
-        lines = HISTORY_FILE.read_text(encoding="utf-8").splitlines()[-50:]
-        for line in lines:
-            try:
-                recs.append(json.loads(line))
-            except Exception:
-                pass
-    return jsonify({"records": recs})
+    for line in tail_lines(HISTORY_FILE, HISTORY_POINTS):
+        try:
+            recs.append(loads(line))
+        except Exception:
+            pass
+    return ojson({"records": recs})
 
 
 @app.route("/api/status")
@@ -1867,7 +2081,7 @@ def api_history():
 def api_status():
     with scan_lock:
         s = dict(scan_status)
-    return jsonify({**s, "scan_interval": SCAN_INTERVAL_SEC, "profile_ttl": PROFILE_TTL_SEC, "offline_after": OFFLINE_AFTER_SEC})
+    return ojson({**s, "scan_interval": SCAN_INTERVAL_SEC, "profile_ttl": PROFILE_TTL_SEC, "offline_after": OFFLINE_AFTER_SEC})
 
 
 @app.route("/api/alerts")
@@ -1881,7 +2095,7 @@ def api_alerts():
         limit = int(request.args.get("limit", limit))
     except Exception:
         pass
-    return jsonify({"events": tail_events(max(1, min(200, limit)))})
+    return ojson({"events": tail_events(max(1, min(200, limit)))})
 
 
 @app.route("/api/radio")
@@ -1890,14 +2104,13 @@ def api_radio():
     with radio_lock:
         w = dict(wifi_state)
         b = dict(bt_state)
-    return jsonify({"wifi": {"enabled": WIFI_ENABLED, **w}, "bt": {"enabled": BT_ENABLED, **b}})
+    return ojson({"wifi": {"enabled": WIFI_ENABLED, **w}, "bt": {"enabled": BT_ENABLED, **b}})
 
 
 @app.route("/api/log_tail")
 @require_login
 def api_log_tail():
-    lines = LOG_FILE.read_text(encoding="utf-8").splitlines()[-30:] if LOG_FILE.exists() else []
-    return jsonify({"lines": lines})
+    return ojson({"lines": list(ring_handler.ring)[-30:]})
 
 
 @app.route("/api/sys_info")
@@ -1909,7 +2122,7 @@ def api_sys_info():
             temp = round(int(f.read().strip()) / 1000.0, 1)
     except Exception:
         pass
-    return jsonify({"cpu": psutil.cpu_percent(interval=0.1), "ram_perc": psutil.virtual_memory().percent, "temp": temp})
+    return ojson({"cpu": psutil.cpu_percent(interval=0.1), "ram_perc": psutil.virtual_memory().percent, "temp": temp})
 
 
 @app.route("/api/export.csv")
@@ -1936,7 +2149,7 @@ def api_export_csv():
                 d.get("state", ""),
                 "YES" if d.get("quarantined") else "NO",
                 d.get("risk", ""),
-                " ".join(d.get("ports", []) or []),
+                " ".join(map(str, d.get("ports", []) or [])),
                 " | ".join(d.get("services", []) or []),
             ]
         )
@@ -1955,7 +2168,7 @@ def api_ips_quarantine():
     reason = (body.get("reason") or "manual").strip()
 
     if not ip and not mac:
-        return jsonify({"ok": False, "msg": "Missing ip/mac"}), 400
+        return ojson({"ok": False, "msg": "Missing ip/mac"}), 400
 
     key = mac.upper() if mac else f"IP:{ip}"
 
@@ -1966,12 +2179,12 @@ def api_ips_quarantine():
             q[key] = {"ts": now_ts(), "ip": "", "mac": mac, "reason": reason, "note": "MAC-only; block at router/AP for full enforcement"}
             save_quarantine(q)
         emit_event("IPS_QUARANTINED", "MEDIUM", f"Quarantine recorded (MAC-only): {mac}", {"mac": mac, "note": "Block at router/AP recommended"})
-        return jsonify({"ok": True, "msg": "Recorded quarantine (MAC-only). Block at router/AP recommended."})
+        return ojson({"ok": True, "msg": "Recorded quarantine (MAC-only). Block at router/AP recommended."})
 
     ok, msg = ips_block_ip(ip)
     if not ok:
         emit_event("IPS_QUARANTINE_FAILED", "MEDIUM", f"Quarantine failed for {ip or mac}", {"msg": msg})
-        return jsonify({"ok": False, "msg": msg}), 400
+        return ojson({"ok": False, "msg": msg}), 400
 
     with quarantine_lock:
         q = load_quarantine()
@@ -1984,7 +2197,7 @@ def api_ips_quarantine():
         title=f"Quarantined {ip} (Pi firewall)",
         details={"ip": ip, "mac": mac, "reason": reason, "note": "To fully remove device, block at router/AP"},
     )
-    return jsonify({"ok": True, "msg": "Quarantined from Pi (iptables DROP)."})
+    return ojson({"ok": True, "msg": "Quarantined from Pi (iptables DROP)."})
 
 
 @app.route("/api/ips/unquarantine", methods=["POST"])
@@ -1995,7 +2208,7 @@ def api_ips_unquarantine():
     mac = (body.get("mac") or "").strip()
 
     if not ip and not mac:
-        return jsonify({"ok": False, "msg": "Missing ip/mac"}), 400
+        return ojson({"ok": False, "msg": "Missing ip/mac"}), 400
 
     key = mac.upper() if mac else f"IP:{ip}"
 
@@ -2010,7 +2223,7 @@ def api_ips_unquarantine():
         save_quarantine(q)
 
     emit_event("IPS_UNQUARANTINED", "INFO", f"Unquarantined {ip or mac}", {"ip": ip, "mac": mac})
-    return jsonify({"ok": ok, "msg": msg})
+    return ojson({"ok": ok, "msg": msg})
 
 
 @app.route("/api/ips/quarantine_list")
@@ -2018,13 +2231,16 @@ def api_ips_unquarantine():
 def api_ips_quarantine_list():
     with quarantine_lock:
         q = load_quarantine()
-    return jsonify({"quarantine": q})
+    return ojson({"quarantine": q})
 
 
 # ----------------------
 # MAIN
 # ----------------------
 if __name__ == "__main__":
+    # carry the previous run's last lines into the in-memory tail
+    ring_handler.ring.extendleft(reversed(tail_lines(LOG_FILE, ring_handler.ring.maxlen)))
+
     if os.geteuid() != 0:
         print("⚠️  WARNING: Not running as root/sudo.")
         print("   Nmap OS detection + MAC vendor visibility + iw scans may be reduced.")
@@ -2040,6 +2256,8 @@ if __name__ == "__main__":
     if os.geteuid() == 0:
         apply_quarantine_rules_from_file()
 
+    load_recent_alerts()
+
     # Start threads
     threading.Thread(target=background_scanner, daemon=True).start()
     threading.Thread(target=ids_arp_monitor, daemon=True).start()